@@ -0,0 +1,230 @@
+"""
+End-to-end API load benchmark.
+
+Runs the FastAPI app in-process against SQLite with offline market-data fakes and
+the SMTP stand-in, seeds synthetic users and portfolios, then drives each endpoint
+with concurrent authenticated requests and reports p50/p99 latency and throughput.
+Exits with status 1 when any endpoint answered with a non-2xx status.
+Needs aiosqlite and httpx; aiosmtpd is used for the SMTP stand-in when installed.
+
+Usage (from the repository root):
+    python benchmarks/bench_api.py --users 20 --trades 200 --requests 500 --concurrency 20
+    python benchmarks/bench_api.py --database stocks.db --compare latest
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import common
+import fakes
+
+# GET endpoints driven by default: name -> path
+ENDPOINTS = {
+    "GET /stocks/all": "/stocks/all",
+    "GET /stocks/all?stream=true": "/stocks/all?stream=true",
+    "GET /stocks/holdings": "/stocks/holdings",
+    "GET /portfolio/summary": "/portfolio/summary",
+    "GET /stocks/stock_tickers": "/stocks/stock_tickers",
+    "GET /market_movers/main_indices": "/market_movers/main_indices",
+    "GET /market_movers/top_gainers": "/market_movers/top_gainers?index=NIFTY%2050",
+    "GET /stocks/{ticker}/intraday": "/stocks/RELIANCE/intraday",
+    "GET /leaderboard": "/leaderboard/?rank_by=holders",
+}
+# Password every synthetic user signs up with
+PASSWORD = "benchmark"
+
+
+def add_missing_columns(path: str):
+    """
+    Add model columns missing from the tables of an older SQLite file (such as stocks.db).
+
+    Only ever applied to the scratch copy; missing columns are added as nullable.
+    """
+    import sqlite3
+    from sqlalchemy.dialects import sqlite
+    import models
+
+    connection = sqlite3.connect(path)
+    try:
+        for table in models.Base.metadata.sorted_tables:
+            existing = {row[1] for row in connection.execute(
+                f'PRAGMA table_info("{table.name}")')}
+            if not existing:
+                continue
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=sqlite.dialect())
+                    connection.execute(
+                        f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def configure_database(database: str) -> str:
+    """
+    Point DATABASE_URL at a scratch SQLite file (a copy of `database` when given).
+
+    Must run before the application modules are imported.
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_api_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    os.environ["MARKET_DATA_WARMUP"] = "0"
+    if database:
+        shutil.copyfile(os.path.join(common.REPO_ROOT, database)
+                        if not os.path.isabs(database) else database, path)
+        add_missing_columns(path)
+    return path
+
+
+async def seed(users: int, trades: int, symbols: list) -> list:
+    """
+    Insert synthetic users with BUY-only portfolios and rebuild the derived tables.
+
+    Returns:
+        List[dict]: The email, user_id and access token of each synthetic user.
+    """
+    import database
+    import hashing
+    import models
+    import user_token
+    from utils import holdings_summary, leaderboard, lot_matching
+
+    rng = random.Random(42)
+    password = hashing.Hash.bcrypt(PASSWORD)
+    run_id = int(time.time())
+    accounts = []
+    async with database.async_session() as db:
+        for n in range(users):
+            user = models.User(username=f"bench{run_id}_{n}",
+                               email=f"bench{run_id}_{n}@example.com", password=password)
+            db.add(user)
+            await db.flush()
+            portfolio = rng.sample(symbols, min(len(symbols), max(trades // 4, 1)))
+            for entry_date in fakes.trade_dates(trades, seed=n):
+                symbol = rng.choice(portfolio)
+                quantity = rng.randint(1, 100)
+                price = round(rng.uniform(50, 5000), 2)
+                db.add(models.TradeEntry(
+                    stock_ticker=symbol, trade_exchange="NSE", trade_entry_date=entry_date,
+                    quantity=quantity, price_per_stock=price, trade_total_price=quantity * price,
+                    target_price=round(price * 1.2, 2), trade_strategy="benchmark",
+                    trade_side="BUY", user_id=user.user_id))
+            accounts.append({"email": user.email, "user_id": user.user_id})
+        await db.commit()
+        await lot_matching.rebuild_positions(db)
+        await holdings_summary.rebuild_summary(db)
+        await leaderboard.rebuild_stats(db)
+
+    for account in accounts:
+        account["token"] = await user_token.create_access_token(data={"sub": account["email"]})
+    return accounts
+
+
+async def drive(client, path: str, accounts: list, requests: int, concurrency: int):
+    """
+    Send `requests` GETs with at most `concurrency` in flight, rotating through the users.
+
+    Returns:
+        tuple: (latencies in seconds, elapsed seconds, {status code: count})
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    async def one(i):
+        headers = {"Authorization": f"Bearer {accounts[i % len(accounts)]['token']}"}
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests)])
+    return latencies, time.perf_counter() - start, statuses
+
+
+async def run(args) -> dict:
+    import httpx
+    import main
+
+    market = fakes.install(universe=args.universe, latency=args.upstream_latency)
+    if args.replay:
+        from utils import market_replay
+        replay = market_replay.start_replay(args.replay, speed=args.replay_speed, fallback=market)
+        print(f"Replaying {replay.duration:.0f}s of recorded market data at {args.replay_speed}x")
+    await main.startup_event()
+    accounts = await seed(args.users, args.trades, market.symbols[:args.symbols])
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        response = await client.post("/login/", data={"username": accounts[0]["email"], "password": PASSWORD})
+        results["POST /login/"] = common.summarize([time.perf_counter() - start])
+        if response.status_code != 200:
+            raise RuntimeError(f"Login failed: {response.text}")
+
+        for name, path in ENDPOINTS.items():
+            if args.endpoints and name not in args.endpoints:
+                continue
+            # Warm the caches so the run measures steady-state serving
+            await drive(client, path, accounts, min(args.concurrency, args.requests), args.concurrency)
+            calls_before = market.calls
+            latencies, elapsed, statuses = await drive(
+                client, path, accounts, args.requests, args.concurrency)
+            results[name] = {**common.summarize(latencies, elapsed), "statuses": statuses,
+                             "upstream_calls": market.calls - calls_before}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database", help="SQLite file to copy as the starting database, e.g. stocks.db")
+    parser.add_argument("--users", type=int, default=10, help="Synthetic users to create")
+    parser.add_argument("--trades", type=int, default=200, help="Trades per synthetic user")
+    parser.add_argument("--symbols", type=int, default=300, help="Distinct symbols portfolios draw from")
+    parser.add_argument("--universe", type=int, default=fakes.DEFAULT_UNIVERSE,
+                        help="Symbols in the fake equity list")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight per endpoint")
+    parser.add_argument("--upstream-latency", type=float, default=0.0,
+                        help="Seconds each fake upstream call blocks")
+    parser.add_argument("--replay", help="Serve quotes, indices and the equity list from a recorded "
+                                         "market-data log (utils/market_replay.py) instead of the fakes")
+    parser.add_argument("--replay-speed", type=float, default=60.0,
+                        help="Recorded seconds replayed per second with --replay")
+    parser.add_argument("--endpoints", nargs="*", help="Only run these endpoint names")
+    parser.add_argument("--compare", help="Baseline run to compare with, or 'latest'")
+    parser.add_argument("--output", help="Write the run to this path instead of benchmarks/results/")
+    args = parser.parse_args()
+
+    database_path = configure_database(args.database)
+    smtp = fakes.start_smtp()
+    baseline = common.load_baseline("api", args.compare) if args.compare else None
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        if smtp is not None:
+            smtp.stop()
+        shutil.rmtree(os.path.dirname(database_path), ignore_errors=True)
+
+    common.print_table(results, baseline)
+    config = {key: value for key, value in vars(args).items()
+              if key not in ("compare", "output")}
+    print(f"Saved {common.save_results('api', config, results, args.output)}")
+    failed = [name for name, summary in results.items() if common.failed_requests(summary)]
+    if failed:
+        print(f"Non-2xx responses from: {', '.join(failed)}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
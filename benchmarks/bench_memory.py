@@ -0,0 +1,128 @@
+"""
+Memory benchmark of the cached NSE equity list.
+
+Compares the per-worker footprint of the former layout (one dict per row from
+``df.to_dict(orient='records')`` plus a symbol index rebuilt on every request) with
+``fetch_stock_info.EquityTable``, and times the company-info lookups that
+``enrich_trades`` does per request. Memory is measured with tracemalloc after the
+source DataFrame has been dropped, so only what the cache keeps alive is counted.
+
+Usage (from the repository root):
+    python benchmarks/bench_memory.py --universe 2000 --lookups 1000 --compare latest
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+import common
+import fakes
+
+
+def equity_frame(universe: int):
+    """
+    Build the equity list DataFrame fetch_nse_stock_info caches, logos included.
+    """
+    market = fakes.FakeMarket(universe)
+    df = market.equity_list()
+    # The logo lookup succeeds for a minority of symbols and is None otherwise
+    df['LogoURL'] = [f'https://logo.clearbit.com/{symbol.lower()}.com' if symbol in market.constituents else None
+                     for symbol in df['SYMBOL']]
+    return df
+
+
+def retained_bytes(universe: int, build) -> tuple:
+    """
+    Return (bytes kept alive, the built object) for a structure built from a fresh frame.
+    """
+    gc.collect()
+    tracemalloc.start()
+    df = equity_frame(universe)
+    baseline = tracemalloc.get_traced_memory()[0]
+    built = build(df)
+    del df
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return retained, built
+
+
+def time_lookups(fn, repeat: int) -> list:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run(args) -> tuple:
+    from utils import fetch_stock_info
+
+    records_bytes, records = retained_bytes(
+        args.universe, lambda df: df.to_dict(orient='records'))
+    table_bytes, table = retained_bytes(
+        args.universe, fetch_stock_info.EquityTable.from_frame)
+    index_bytes = sys.getsizeof({item['SYMBOL']: item for item in records})
+
+    rng = random.Random(3)
+    symbols = rng.sample(table.symbols, min(args.symbols, len(table)))
+    tickers = [rng.choice(symbols) for _ in range(args.lookups)]
+
+    def records_lookups():
+        # The former per-request path: index the records, then one lookup per trade
+        stock_info_dict = {item['SYMBOL']: item for item in records}
+        return [stock_info_dict.get(ticker) for ticker in tickers]
+
+    def table_lookups():
+        # enrich_trades' path: one row per distinct symbol, then one lookup per trade
+        companies = table.rows(tickers)
+        return [companies.get(ticker) for ticker in tickers]
+
+    assert records_lookups() == table_lookups()
+    memory = {
+        "records": {"bytes": records_bytes, "bytes_per_row": round(records_bytes / len(records), 1)},
+        "records per-request index": {"bytes": index_bytes},
+        "EquityTable": {"bytes": table_bytes, "bytes_per_row": round(table_bytes / len(table), 1)},
+    }
+    latency = {
+        f"lookups: records + index x{args.lookups}": common.summarize(time_lookups(records_lookups, args.repeat)),
+        f"lookups: EquityTable x{args.lookups}": common.summarize(time_lookups(table_lookups, args.repeat)),
+    }
+    return memory, latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--universe", type=int, default=fakes.DEFAULT_UNIVERSE,
+                        help="Symbols in the fake equity list")
+    parser.add_argument("--lookups", type=int, default=1000, help="Company-info lookups per request")
+    parser.add_argument("--symbols", type=int, default=200, help="Distinct symbols looked up")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed requests per case")
+    parser.add_argument("--compare", help="Baseline run to compare with, or 'latest'")
+    parser.add_argument("--output", help="Write the run to this path instead of benchmarks/results/")
+    args = parser.parse_args()
+
+    baseline = common.load_baseline("memory", args.compare) if args.compare else None
+    memory, latency = run(args)
+
+    previous = (baseline or {}).get("results", {}).get("memory", {})
+    print(f"{'structure':<44} {'bytes':>12} {'bytes/row':>10} {'vs base':>10}")
+    for name, usage in memory.items():
+        delta = ""
+        if previous.get(name, {}).get("bytes"):
+            delta = f"{usage['bytes'] / previous[name]['bytes'] - 1:+.1%}"
+        print(f"{name:<44} {usage['bytes']:>12,} {usage.get('bytes_per_row', ''):>10} {delta:>10}")
+    saved = memory["records"]["bytes"] + memory["records per-request index"]["bytes"] - memory["EquityTable"]["bytes"]
+    print(f"Saved per worker: {saved:,} bytes\n")
+    common.print_table(latency, {**baseline, "results": baseline["results"].get("latency", {})} if baseline else None)
+
+    config = {key: value for key, value in vars(args).items()
+              if key not in ("compare", "output")}
+    print(f"Saved {common.save_results('memory', config, {'memory': memory, 'latency': latency}, args.output)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
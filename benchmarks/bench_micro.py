@@ -0,0 +1,152 @@
+"""
+Micro-benchmarks for hot paths: serialization, auth and quote merging.
+
+Each case is timed call by call and reported as p50/p99, so regressions in
+``fetch_all_stock``'s enrichment, ``verify_token`` or ``fetch_nse_stock_info`` show up
+without the noise of a full request. Runs offline against a scratch SQLite database.
+
+Usage (from the repository root):
+    python benchmarks/bench_micro.py --trades 1000 --repeat 200 --compare latest
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import common
+import fakes
+
+
+def time_sync(fn, repeat: int) -> list:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def time_async(fn, repeat: int) -> list:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def synthetic_trades(count: int, symbols: list) -> list:
+    """
+    Build detached TradeEntry objects spread over `symbols`.
+    """
+    import models
+
+    rng = random.Random(7)
+    dates = fakes.trade_dates(count)
+    return [models.TradeEntry(
+        trade_id=i + 1, stock_ticker=rng.choice(symbols), trade_exchange="NSE",
+        trade_entry_date=dates[i], quantity=rng.randint(1, 100), price_per_stock=rng.uniform(50, 5000),
+        trade_total_price=None, target_price=None, trade_strategy="benchmark", trade_side="BUY", user_id=1)
+        for i in range(count)]
+
+
+async def run(args) -> dict:
+    from fastapi.encoders import jsonable_encoder
+    from jose import jwt
+    import database
+    import hashing
+    import main
+    import models
+    import user_token
+    from routers import stocks
+    from utils import fetch_stock_info, http_cache, quote_cache
+
+    market = fakes.install(universe=args.universe)
+    await main.startup_event()
+    symbols = market.symbols[:args.symbols]
+    trades = synthetic_trades(args.trades, symbols)
+    results = {}
+
+    # Quote merge: enrichment of a whole portfolio with every quote cached
+    equity_table = await fetch_stock_info.fetch_nse_stock_info()
+    await quote_cache.get_quotes((symbol, "NSE") for symbol in symbols)
+    results[f"quote merge: enrich_trades x{args.trades}"] = common.summarize(
+        await time_async(lambda: stocks.enrich_trades(trades, equity_table), args.repeat))
+    rows = await stocks.enrich_trades(trades, equity_table)
+
+    # Serialization of the enriched listing
+    results[f"serialize: json.dumps x{args.trades}"] = common.summarize(
+        time_sync(lambda: json.dumps(rows, default=str), args.repeat))
+    results[f"serialize: jsonable_encoder+dumps x{args.trades}"] = common.summarize(
+        time_sync(lambda: json.dumps(jsonable_encoder(rows)), args.repeat))
+    results[f"serialize: EncodedPayload tickers x{len(equity_table)}"] = common.summarize(
+        time_sync(lambda: http_cache.EncodedPayload(
+            {"data": [{"ticker": symbol, "company_name": name} for symbol, name in zip(
+                equity_table.column('SYMBOL'), equity_table.column('NAME OF COMPANY'))]}, "bench"),
+            max(args.repeat // 10, 1)))
+
+    # Equity list: cache hit and cold fetch against the fake upstream
+    results["fetch_nse_stock_info: cached"] = common.summarize(
+        await time_async(fetch_stock_info.fetch_nse_stock_info, args.repeat))
+
+    async def cold_fetch():
+        fetch_stock_info.cache["stock_info"] = None
+        await fetch_stock_info.fetch_nse_stock_info()
+    results[f"fetch_nse_stock_info: cold x{args.universe}"] = common.summarize(
+        await time_async(cold_fetch, max(args.repeat // 20, 1)))
+
+    # Auth
+    async with database.async_session() as db:
+        user = models.User(username="bench_micro", email="bench_micro@example.com",
+                           password=hashing.Hash.bcrypt("benchmark"))
+        db.add(user)
+        await db.commit()
+    token = await user_token.create_access_token(data={"sub": user.email})
+    results["auth: create_access_token"] = common.summarize(
+        await time_async(lambda: user_token.create_access_token(data={"sub": user.email}), args.repeat))
+    results["auth: jwt.decode"] = common.summarize(time_sync(
+        lambda: jwt.decode(token, user_token.SECRET_KEY, algorithms=[user_token.ALGORITHM]), args.repeat))
+
+    async def verify():
+        async with database.async_session() as db:
+            await user_token.verify_token(token, Exception("invalid"), db=db)
+    results["auth: verify_token (with user lookup)"] = common.summarize(
+        await time_async(verify, args.repeat))
+    results["auth: bcrypt verify"] = common.summarize(time_sync(
+        lambda: hashing.Hash.verify(user.password, "benchmark"), max(args.repeat // 20, 3)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trades", type=int, default=1000, help="Trades in the enriched portfolio")
+    parser.add_argument("--symbols", type=int, default=200, help="Distinct symbols in the portfolio")
+    parser.add_argument("--universe", type=int, default=fakes.DEFAULT_UNIVERSE,
+                        help="Symbols in the fake equity list")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed calls per case")
+    parser.add_argument("--compare", help="Baseline run to compare with, or 'latest'")
+    parser.add_argument("--output", help="Write the run to this path instead of benchmarks/results/")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench_micro_")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(scratch, 'bench.db')}"
+    os.environ["MARKET_DATA_WARMUP"] = "0"
+    baseline = common.load_baseline("micro", args.compare) if args.compare else None
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    common.print_table(results, baseline)
+    config = {key: value for key, value in vars(args).items()
+              if key not in ("compare", "output")}
+    print(f"Saved {common.save_results('micro', config, results, args.output)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
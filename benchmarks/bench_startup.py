@@ -0,0 +1,112 @@
+"""
+Startup-time benchmark.
+
+Measures what every worker pays on boot: importing the application in a fresh
+interpreter. Reports wall time, peak RSS, the heaviest top-level imports from
+``python -X importtime`` and which market-data libraries were loaded eagerly.
+
+Usage (from the repository root):
+    python benchmarks/bench_startup.py --runs 5 --top 15 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Child script: import the target module and report time, peak RSS and loaded modules
+CHILD_CODE = """
+import resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+print(",".join(sorted(sys.modules)))
+"""
+
+
+def parse_importtime(stderr: str):
+    """
+    Parse ``-X importtime`` output into {root package: cumulative microseconds}.
+
+    A package is charged the largest cumulative time of any of its imports, which is
+    the import that first pulled it (and its dependencies) in.
+    """
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        package = name.strip().split(".")[0]
+        cumulative[package] = max(cumulative.get(package, 0), int(cumulative_us))
+    return cumulative
+
+
+def measure(module: str, env: dict) -> dict:
+    """
+    Import a module in a fresh interpreter and collect timing and memory figures.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE.format(module=module)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    seconds, max_rss_kb, modules = completed.stdout.splitlines()[-3:]
+    return {
+        "seconds": float(seconds),
+        "max_rss_kb": int(max_rss_kb),
+        "modules": modules.split(","),
+        "importtime": parse_importtime(completed.stderr),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="main",
+                        help="Module to import (default: main)")
+    parser.add_argument("--runs", type=int, default=5,
+                        help="Number of fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=15,
+                        help="Number of heaviest imports to list")
+    parser.add_argument("--output", help="Write the summary as JSON to this path")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    from utils.market_data import HEAVY_MODULES
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    runs = [measure(args.module, env) for _ in range(args.runs)]
+    last = runs[-1]
+
+    summary = {
+        "module": args.module,
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "median_seconds": statistics.median(run["seconds"] for run in runs),
+        "max_seconds": max(run["seconds"] for run in runs),
+        "median_max_rss_kb": statistics.median(run["max_rss_kb"] for run in runs),
+        "eager_heavy_modules": [name for name in HEAVY_MODULES if name in last["modules"]],
+        "heaviest_imports_us": dict(sorted(
+            ((name, micros) for name, micros in last["importtime"].items()
+             if name != args.module.split(".")[0]),
+            key=lambda item: item[1], reverse=True)[:args.top]),
+    }
+
+    print(f"import {args.module}: median {summary['median_seconds'] * 1000:.1f} ms, "
+          f"max {summary['max_seconds'] * 1000:.1f} ms, "
+          f"peak RSS {summary['median_max_rss_kb'] / 1024:.1f} MB over {args.runs} runs")
+    print(f"Eagerly loaded market-data modules: "
+          f"{', '.join(summary['eager_heavy_modules']) or 'none'}")
+    print("Heaviest packages (cumulative import time):")
+    for name, micros in summary["heaviest_imports_us"].items():
+        print(f"  {micros / 1000:10.1f} ms  {name}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Shared helpers for the benchmark scripts: percentiles and result files.
+
+Results are written to ``benchmarks/results/<suite>-<timestamp>.json`` (git-ignored)
+so runs on the same machine can be compared with ``--compare``.
+"""
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def summarize(latencies, elapsed: float = None) -> dict:
+    """
+    Summarize latencies in seconds as milliseconds, with throughput when elapsed is given.
+    """
+    samples = np.asarray(latencies, dtype=np.float64) * 1000
+    summary = {
+        "count": int(samples.size),
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4),
+        "max_ms": round(float(samples.max()), 4),
+    }
+    if elapsed:
+        summary["throughput_rps"] = round(samples.size / elapsed, 2)
+    return summary
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(suite: str, config: dict, results: dict, output: str = None) -> str:
+    """
+    Write a run to the results directory (or `output`) and return its path.
+    """
+    run = {
+        "suite": suite,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": config,
+        "results": results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(
+            RESULTS_DIR, f"{suite}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump(run, f, indent=2)
+    return output
+
+
+def load_baseline(suite: str, path: str) -> dict:
+    """
+    Load a previous run; "latest" picks the newest stored run of the suite.
+    """
+    if path == "latest":
+        runs = sorted(glob.glob(os.path.join(RESULTS_DIR, f"{suite}-*.json")))
+        if not runs:
+            return None
+        path = runs[-1]
+    with open(path) as f:
+        return json.load(f)
+
+
+def failed_requests(summary: dict) -> int:
+    """
+    Return the number of non-2xx responses recorded in a summary's "statuses", if any.
+    """
+    return sum(count for status, count in summary.get("statuses", {}).items()
+               if not 200 <= int(status) < 300)
+
+
+def print_table(results: dict, baseline: dict = None):
+    """
+    Print p50/p99/throughput per benchmark, with the p50 change against a baseline run.
+
+    Benchmarks with non-2xx responses are flagged: their latencies do not measure the
+    endpoint serving its result.
+    """
+    previous = (baseline or {}).get("results", {})
+    print(f"{'benchmark':<44} {'p50 ms':>10} {'p99 ms':>10} {'req/s':>10} {'p50 vs base':>12} {'non-2xx':>8}")
+    for name, summary in results.items():
+        delta = ""
+        if name in previous and previous[name].get("p50_ms"):
+            change = summary["p50_ms"] / previous[name]["p50_ms"] - 1
+            delta = f"{change:+.1%}"
+        throughput = summary.get("throughput_rps")
+        failed = failed_requests(summary)
+        print(f"{name:<44} {summary['p50_ms']:>10.3f} {summary['p99_ms']:>10.3f} "
+              f"{'' if throughput is None else f'{throughput:.1f}':>10} {delta:>12} "
+              f"{f'{failed} !' if failed else '':>8}")
+    if baseline:
+        print(f"(baseline: {baseline['timestamp']}, commit {baseline.get('commit')})")
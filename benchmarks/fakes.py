@@ -0,0 +1,270 @@
+"""
+Offline stand-ins for the market-data upstreams and the SMTP server.
+
+Prices and the NIFTY 50 snapshot come from ``data/nse_companies_info.json``; symbols
+beyond the fifty constituents get deterministic synthetic prices, so runs are
+repeatable and never touch the network. ``install()`` registers the fakes through
+``utils.market_data.set_provider``.
+"""
+import json
+import os
+import time
+import types
+import zlib
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_PATH = os.path.join(REPO_ROOT, "data", "nse_companies_info.json")
+
+# Symbols in the synthetic equity list, the NIFTY 50 constituents included
+DEFAULT_UNIVERSE = 2000
+# Requests per second (and burst) the rate governors allow against the fakes
+UNTHROTTLED_RATE = 1e6
+
+
+def _seed(symbol: str) -> int:
+    return zlib.crc32(symbol.encode())
+
+
+def load_snapshot() -> dict:
+    """
+    Load the recorded NSE live_index("NIFTY 50") payload.
+    """
+    with open(SNAPSHOT_PATH) as f:
+        return json.load(f)
+
+
+class FakeMarket:
+    """
+    Deterministic quotes, history and NSE payloads for a synthetic equity universe.
+
+    Args:
+        universe (int): Number of listed symbols, the NIFTY 50 constituents included.
+        latency (float): Seconds every upstream call blocks, like the real network calls.
+    """
+
+    def __init__(self, universe: int = DEFAULT_UNIVERSE, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.snapshot = load_snapshot()
+        self.constituents = {row["symbol"]: row for row in self.snapshot["data"]
+                             if row["symbol"] != self.snapshot["name"]}
+        extra = [f"SYN{i:04d}" for i in range(
+            max(universe - len(self.constituents), 0))]
+        self.symbols = list(self.constituents) + extra
+
+    def _upstream_call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def quote(self, symbol: str) -> tuple:
+        """
+        Return (last price, previous close) of a symbol.
+        """
+        row = self.constituents.get(symbol)
+        if row is not None:
+            return float(row["lastPrice"]), float(row["previousClose"])
+        seed = _seed(symbol)
+        previous_close = 50 + seed % 5000
+        return previous_close * (1 + ((seed >> 8) % 400 - 200) / 10000), float(previous_close)
+
+    # yfinance
+    def Ticker(self, symbol: str):
+        self._upstream_call()
+        last_price, previous_close = self.quote(symbol.split(".")[0])
+        return types.SimpleNamespace(info={"currentPrice": last_price, "previousClose": previous_close})
+
+    def download(self, tickers, start=None, end=None, period=None, **kwargs):
+        import numpy as np
+        import pandas as pd
+        self._upstream_call()
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        if period:
+            # Quote batch: the previous close, then the session in progress at the last price
+            index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=2)
+            quotes = [self.quote(symbol.split(".")[0]) for symbol in tickers]
+            return pd.DataFrame([[quote[1] for quote in quotes], [quote[0] for quote in quotes]], index=index,
+                                columns=pd.MultiIndex.from_product([["Close"], tickers]))
+        index = pd.bdate_range(start, end, inclusive="left")
+        columns = []
+        for symbol in tickers:
+            rng = np.random.default_rng(_seed(symbol))
+            base = self.quote(symbol.split(".")[0])[1]
+            columns.append(
+                base * np.cumprod(1 + rng.normal(0, 0.015, len(index))))
+        data = np.column_stack(columns) if columns else np.empty((len(index), 0))
+        return pd.DataFrame(data, index=index,
+                            columns=pd.MultiIndex.from_product([["Close"], tickers]))
+
+    # nselib.capital_market
+    def equity_list(self):
+        # The columns nselib returns, with deterministic values
+        import pandas as pd
+        self._upstream_call()
+        seeds = [_seed(symbol) for symbol in self.symbols]
+        return pd.DataFrame({
+            "SYMBOL": self.symbols,
+            "NAME OF COMPANY": [self.constituents[symbol]["meta"]["companyName"]
+                                if symbol in self.constituents and "meta" in self.constituents[symbol]
+                                else f"{symbol} Limited" for symbol in self.symbols],
+            " SERIES": ["EQ" if seed % 10 else "BE" for seed in seeds],
+            " DATE OF LISTING": [(datetime(1995, 1, 1) + timedelta(days=seed % 10000)).strftime("%d-%b-%Y")
+                                 for seed in seeds],
+            " FACE VALUE": [(1, 2, 5, 10)[seed % 4] for seed in seeds],
+        })
+
+    def market_watch_all_indices(self):
+        import pandas as pd
+        self._upstream_call()
+        metadata = self.snapshot["metadata"]
+        advance = self.snapshot["advance"]
+        rows = []
+        for name, key, scale in (("NIFTY 50", "BROAD MARKET INDICES", 1.0), ("NIFTY BANK", "BROAD MARKET INDICES", 2.1),
+                                 ("NIFTY IT", "SECTORAL INDICES", 1.5), ("NIFTY AUTO", "SECTORAL INDICES", 0.95),
+                                 ("NIFTY PHARMA", "SECTORAL INDICES", 0.82), ("INDIA VIX", "VOLATILITY", 0.0007)):
+            rows.append({
+                "key": key, "index": name, "last": metadata["last"] * scale,
+                "variation": metadata["change"] * scale, "percentChange": metadata["percChange"] * (1 + _seed(name) % 7 - 3),
+                "open": metadata["open"] * scale, "high": metadata["high"] * scale, "low": metadata["low"] * scale,
+                "previousClose": metadata["previousClose"] * scale, "yearHigh": metadata["yearHigh"] * scale,
+                "yearLow": metadata["yearLow"] * scale, "advances": int(advance["advances"]),
+                "declines": int(advance["declines"]), "unchanged": int(advance["unchanged"]),
+            })
+        return pd.DataFrame(rows)
+
+    # jugaad_data.nse
+    def NSELive(self):
+        return self
+
+    def live_index(self, index: str):
+        self._upstream_call()
+        return self.snapshot
+
+
+# Yahoo Finance quote page scraped for SENSEX by fetch_main_indices
+SENSEX_URL = "https://finance.yahoo.com/quote/%5EBSESN"
+# SENSEX level relative to NIFTY 50 in the fake market
+SENSEX_RATIO = 3.3
+
+
+class FakeResponse:
+    def __init__(self, status_code: int = 404, content: bytes = b""):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode()
+        self.headers = {}
+
+
+def sensex_page(snapshot: dict) -> bytes:
+    """
+    Return the parts of the Yahoo Finance SENSEX quote page that fetch_main_indices reads.
+    """
+    metadata = snapshot["metadata"]
+    fields = {
+        "regularMarketPrice": f"{metadata['last'] * SENSEX_RATIO:,.2f}",
+        "regularMarketChange": f"{metadata['change'] * SENSEX_RATIO:+,.2f}",
+        "regularMarketChangePercent": f"({metadata['percChange']:+.2f}%)",
+    }
+    return "".join(f'<fin-streamer data-field="{field}">{value}</fin-streamer>'
+                   for field, value in fields.items()).encode()
+
+
+class FakeAsyncClient:
+    """
+    Stand-in for httpx.AsyncClient without any I/O: serves the SENSEX quote page and
+    answers every other call (e.g. logo lookups) with a 404.
+    """
+
+    def __init__(self, **kwargs):
+        self.sensex = sensex_page(load_snapshot())
+
+    async def get(self, url, **kwargs):
+        if url == SENSEX_URL:
+            return FakeResponse(200, self.sensex)
+        return FakeResponse()
+
+    async def aclose(self):
+        pass
+
+
+def fake_httpx():
+    """
+    Stand-in for the parts of httpx that utils.http_client uses.
+    """
+    return types.SimpleNamespace(AsyncClient=FakeAsyncClient, TransportError=OSError,
+                                 Timeout=lambda *args, **kwargs: None,
+                                 Limits=lambda *args, **kwargs: None)
+
+
+def install(universe: int = DEFAULT_UNIVERSE, latency: float = 0.0) -> FakeMarket:
+    """
+    Serve every market-data upstream from offline fakes.
+
+    The fakes never throttle, so the rate governors are given unbounded limits and the
+    benchmarks measure the application rather than the configured upstream pacing.
+
+    Args:
+        universe (int, optional): Number of listed symbols. Defaults to DEFAULT_UNIVERSE.
+        latency (float, optional): Seconds every fake upstream call blocks. Defaults to 0.
+
+    Returns:
+        FakeMarket: The fake market, whose ``calls`` counts upstream calls.
+    """
+    from utils import market_data, rate_governor
+
+    rate_governor.DEFAULT_LIMIT = (UNTHROTTLED_RATE, UNTHROTTLED_RATE)
+    rate_governor.UPSTREAM_LIMITS.clear()
+    rate_governor.governors.clear()
+    market = FakeMarket(universe, latency)
+    market_data.set_provider("yfinance", market)
+    market_data.set_provider("nselib.capital_market", market)
+    market_data.set_provider("jugaad_data.nse", market)
+    market_data.set_provider("httpx", fake_httpx())
+    return market
+
+
+class QuietSMTPHandler:
+    """
+    SMTP handler that counts delivered messages instead of printing them.
+    """
+
+    def __init__(self):
+        self.messages = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return '250 Message accepted for delivery'
+
+
+def start_smtp(quiet: bool = True):
+    """
+    Start the ``utils/smtp_server.py`` stand-in on the port the email service uses.
+
+    Args:
+        quiet (bool, optional): Count messages instead of printing them. Defaults to True.
+
+    Returns:
+        Controller: The running aiosmtpd controller (call ``stop()``), or None when
+        aiosmtpd is not installed, in which case emails fail fast and are logged.
+    """
+    try:
+        from aiosmtpd.controller import Controller
+        from utils.smtp_server import CustomSMTPHandler
+    except ImportError:
+        return None
+    from utils import email_service
+
+    handler = QuietSMTPHandler() if quiet else CustomSMTPHandler()
+    controller = Controller(handler, hostname=email_service.SMTP_HOST,
+                            port=email_service.SMTP_PORT)
+    controller.start()
+    return controller
+
+
+def trade_dates(count: int, seed: int = 0):
+    """
+    Return `count` deterministic entry dates spread over the last two years.
+    """
+    today = datetime.now().date()
+    return [today - timedelta(days=1 + (seed * 7919 + i * 104729) % 730) for i in range(count)]
@@ -1,3 +1,4 @@
+import os
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -13,9 +14,10 @@ MYSQL_DATABASE = 'stock_tracker_app'
 Base = declarative_base()
 
 
-# Create MySQL Database URL
-SQLALCHEMY_DATABASE_URL = f"mysql+aiomysql://{MYSQL_USER}:{
-    MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+# Create MySQL Database URL; DATABASE_URL overrides it, e.g. with
+# "sqlite+aiosqlite:///stocks.db" for local runs and benchmarks
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", f"mysql+aiomysql://{MYSQL_USER}:{
+    MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}")
 
 # Create a SQLAlchemy engine that provides a source of connectivity to the database
 engine = create_async_engine(SQLALCHEMY_DATABASE_URL)
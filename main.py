@@ -1,14 +1,27 @@
+import asyncio
+import os
 from starlette.responses import JSONResponse
+from fastapi import status
 from fastapi import FastAPI, HTTPException
 from fastapi import FastAPI
 import models
 import database
-from routers import stocks, user, authentication, market_movers
+from routers import stocks, user, authentication, market_movers, portfolio, watchlist, indicators, admin, leaderboard
 from fastapi.middleware.cors import CORSMiddleware
+from utils import target_alerts, market_data, market_replay, fetch_stock_info, quote_cache, cache_registry, http_client
+from utils import leaderboard as leaderboard_stats
+from utils import indicators as indicator_stats
+
+# Set MARKET_DATA_WARMUP=0 on workers that only serve auth/user traffic; market-data
+# libraries are then imported on first use instead of during startup
+MARKET_DATA_WARMUP = os.getenv("MARKET_DATA_WARMUP", "1") != "0"
 
 # Create FastAPI instance
 app = FastAPI()
 
+# References to long-running startup tasks so they are not garbage collected
+background_tasks = set()
+
 # Configure CORS
 origins = [
     "http://localhost:5174",  # Vite development server
@@ -53,20 +66,89 @@ async def create_tables():
         await conn.run_sync(models.Base.metadata.create_all)
 
 
+async def warm_caches():
+    """
+    Import the market-data libraries, then warm every registered cache (equity list
+    with logos, indices, held and watched quotes), retrying until all of them warmed.
+    The equity list is kept refreshed from then on.
+
+    Returns:
+        None
+    """
+    await market_data.warmup()
+    await cache_registry.warmup()
+    await asyncio.gather(cache_registry.retry_until_ready(),
+                         fetch_stock_info.refresh_stock_info_cache())
+
+
 @app.on_event("startup")
 async def startup_event():
     """
-    Event handler to create tables on application startup.
+    Event handler to create tables and load trade targets on application startup.
 
-    This event handler triggers the creation of database tables on application startup.
+    This event handler triggers the creation of database tables on application startup,
+    indexes every open target price for the target-price alert engine and loads the
+    quote subscriptions of held and watched symbols and the leaderboard counters. Cache
+    warmup, the equity list refresh, the optional quote refresh and the indicators of the
+    NSE equity list run in the background so they do not delay boot; /ready reports when
+    the caches are warm.
 
     Returns:
         None
     """
+    market_replay.install_from_env()
     await create_tables()
+    async with database.async_session() as db:
+        await target_alerts.load_open_targets(db)
+        await quote_cache.load_subscriptions(db)
+        await leaderboard_stats.load(db, backfill=True)
+
+    coros = []
+    if MARKET_DATA_WARMUP:
+        coros.append(warm_caches())
+    else:
+        cache_registry.mark_ready()
+    if quote_cache.REFRESH_INTERVAL > 0:
+        coros.append(quote_cache.refresh_loop())
+    if MARKET_DATA_WARMUP and indicator_stats.UNIVERSE_REFRESH_INTERVAL > 0:
+        coros.append(indicator_stats.refresh_universe_loop())
+    for coro in coros:
+        task = asyncio.create_task(coro)
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Event handler to close the pooled outbound HTTP connections and finish any market-data
+    recording on application shutdown.
+
+    Returns:
+        None
+    """
+    await http_client.close()
+    market_replay.close()
+
+
+@app.get("/ready", tags=["health"])
+async def readiness():
+    """
+    Readiness probe for the load balancer: 200 once this worker's caches are warm, 503 until then.
+
+    Returns:
+        JSONResponse: The warm state of the worker.
+    """
+    return JSONResponse(status_code=status.HTTP_200_OK if cache_registry.warm_state["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+                        content=cache_registry.warm_state)
 
 # Include routers
 app.include_router(authentication.router)
 app.include_router(user.router)
 app.include_router(stocks.router)
 app.include_router(market_movers.router)
+app.include_router(portfolio.router)
+app.include_router(watchlist.router)
+app.include_router(indicators.router)
+app.include_router(admin.router)
+app.include_router(leaderboard.router)
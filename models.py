@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Float, Date
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, Date, DateTime, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 from passlib.context import CryptContext
@@ -22,12 +22,122 @@ class TradeEntry(Base):
     trade_total_price = Column(Float)
     target_price = Column(Float)
     trade_strategy = Column(String(255))  # Adjust length as needed
+    trade_side = Column(String(10), default="BUY")  # BUY or SELL
+    target_hit_at = Column(DateTime)  # UTC time the target price alert fired, None while open
 
     # Create a relationship between TradeEntry and User
     user_id = Column(Integer, ForeignKey('users.user_id'))
     creator = relationship("User", back_populates="trade_entries")
 
 
+class Position(Base):
+    """
+    Model representing the lot-matched position of a user in a stock on an exchange.
+
+    Maintained incrementally from trade entries, with both FIFO and average-cost
+    figures kept side by side.
+    """
+    __tablename__ = "positions"
+    __table_args__ = (UniqueConstraint(
+        'user_id', 'stock_ticker', 'trade_exchange'),)
+
+    position_id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.user_id'), index=True)
+    stock_ticker = Column(String(50))
+    trade_exchange = Column(String(50))
+    quantity = Column(Integer, default=0)  # Open quantity
+    fifo_cost_basis = Column(Float, default=0.0)  # Cost of the open FIFO lots
+    fifo_realized_pnl = Column(Float, default=0.0)
+    avg_cost_basis = Column(Float, default=0.0)  # Open quantity at average cost
+    avg_realized_pnl = Column(Float, default=0.0)
+    open_lots = Column(Text)  # JSON list of open [trade_id, quantity, price] lots
+    last_trade_date = Column(Date)
+    last_trade_id = Column(Integer)
+
+
+class HoldingsSummary(Base):
+    """
+    Model representing the materialized per-user totals of a stock on an exchange.
+
+    Maintained in the same transaction as every trade change, so dashboard totals are
+    one indexed read instead of an aggregation over trade entries.
+    """
+    __tablename__ = "holdings_summary"
+
+    user_id = Column(Integer, ForeignKey('users.user_id'), primary_key=True)
+    stock_ticker = Column(String(50), primary_key=True)
+    trade_exchange = Column(String(50), primary_key=True)
+    total_quantity = Column(Integer, default=0)  # Bought minus sold quantity
+    bought_quantity = Column(Integer, default=0)  # Quantity left in the open buy lots
+    total_cost = Column(Float, default=0.0)  # Average-cost basis of the open quantity
+    average_price = Column(Float)  # Average cost of the open quantity
+    lot_count = Column(Integer, default=0)  # Number of open buy lots
+
+
+class TickerStats(Base):
+    """
+    Model representing the platform-wide holding and trading counters of a stock on an exchange.
+
+    Maintained in the same transaction as every trade change, so the most-held leaderboard
+    never aggregates trade entries on the request path.
+    """
+    __tablename__ = "ticker_stats"
+
+    stock_ticker = Column(String(50), primary_key=True)
+    trade_exchange = Column(String(50), primary_key=True)
+    holder_count = Column(Integer, default=0)  # Users holding a positive quantity
+    held_quantity = Column(Integer, default=0)  # Quantity held by those users
+    trade_count = Column(Integer, default=0)  # Trade entries in the stock
+    # Double precision: a single-precision FLOAT rounds Unix times to minutes
+    activity = Column(Float(53), default=0.0)  # Exponentially decayed count of new trades
+    activity_at = Column(Float(53))  # Unix time the activity was last decayed to
+
+
+class DailyClose(Base):
+    """
+    Model representing the daily closing price of a stock on an exchange.
+    """
+    __tablename__ = "daily_close"
+    __table_args__ = (UniqueConstraint(
+        'stock_ticker', 'trade_exchange', 'close_date'),)
+
+    close_id = Column(Integer, primary_key=True, index=True)
+    stock_ticker = Column(String(50))
+    trade_exchange = Column(String(50))
+    close_date = Column(Date, index=True)
+    close = Column(Float)
+
+
+class Watchlist(Base):
+    """
+    Model representing a named list of stocks a user follows without trading them.
+    """
+    __tablename__ = "watchlists"
+    __table_args__ = (UniqueConstraint('user_id', 'name'),)
+
+    watchlist_id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.user_id'), index=True)
+    name = Column(String(100))
+
+    symbols = relationship("WatchlistSymbol", cascade="all, delete-orphan",
+                           lazy="selectin", order_by="WatchlistSymbol.symbol_id")
+
+
+class WatchlistSymbol(Base):
+    """
+    Model representing a stock on a watchlist.
+    """
+    __tablename__ = "watchlist_symbols"
+    __table_args__ = (UniqueConstraint(
+        'watchlist_id', 'stock_ticker', 'trade_exchange'),)
+
+    symbol_id = Column(Integer, primary_key=True, index=True)
+    watchlist_id = Column(Integer, ForeignKey(
+        'watchlists.watchlist_id'), index=True)
+    stock_ticker = Column(String(50))
+    trade_exchange = Column(String(50), default="NSE")
+
+
 class User(Base):
     """
     Model representing a user.
@@ -38,6 +148,8 @@ class User(Base):
     username = Column(String(50), unique=True, index=True)
     email = Column(String(100), unique=True, index=True)
     password = Column(String(255))  # Store hashed password
+    # Grants the /admin endpoints; set directly in the database
+    is_admin = Column(Boolean, nullable=False, default=False, server_default="0")
 
     # Define relationship with TradeEntry
     trade_entries = relationship("TradeEntry", back_populates="creator")
@@ -30,3 +30,22 @@ async def get_current_user(data: str = Depends(oauth2_scheme), db: Session = Dep
     )
     # Verify token and return token data
     return await user_token.verify_token(data, credentials_exception, db=db)
+
+
+async def get_current_admin(current_user: dict = Depends(get_current_user)):
+    """
+    Get the current user, requiring the admin flag.
+
+    Args:
+        current_user (dict, optional): The current user. Defaults to Depends(get_current_user).
+
+    Raises:
+        HTTPException: If the user is not an admin.
+
+    Returns:
+        dict: The token data of the admin.
+    """
+    if not current_user.get('is_admin'):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Admin privileges required")
+    return current_user
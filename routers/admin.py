@@ -0,0 +1,190 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+import schemas
+import oauth2
+from utils import cache_registry, rate_governor
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"]
+)
+
+
+def get_cache(name: str) -> cache_registry.RegisteredCache:
+    """
+    Return a registered cache by name.
+
+    Raises:
+        HTTPException: If no cache is registered under the name.
+    """
+    try:
+        return cache_registry.get(name)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Unknown cache '{name}', expected one of {', '.join(cache_registry.caches)}")
+
+
+@router.get("/caches")
+async def list_caches(current_user: schemas.User = Depends(oauth2.get_current_admin)):
+    """
+    List every application cache with its entries, sizes, ages and hit rate.
+
+    Sizes count items (equity list rows, index count, cached date ranges), not bytes.
+
+    Args:
+        current_user (schemas.User, optional): The current admin. Defaults to Depends(oauth2.get_current_admin).
+
+    Returns:
+        dict: The caches and the warm state of this worker.
+
+    Example:
+    {
+        "warm": {"ready": true, "started_at": "2024-01-02T03:45:00+00:00", "errors": {}, ...},
+        "caches": [{"name": "quotes", "entries": [{"key": "INFY:NSE", "size": 1, "age_seconds": 3.2}],
+                    "entry_count": 1, "total_size": 1, "hits": 120, "misses": 8, "hit_rate": 0.9375,
+                    "refreshable": true}]
+    }
+    """
+    return {'warm': cache_registry.warm_state,
+            'caches': [cache.describe() for cache in cache_registry.caches.values()]}
+
+
+@router.get("/caches/{name}")
+async def get_cache_info(name: str, current_user: schemas.User = Depends(oauth2.get_current_admin)):
+    """
+    Describe one cache.
+
+    Args:
+        name (str): The cache name.
+        current_user (schemas.User, optional): The current admin. Defaults to Depends(oauth2.get_current_admin).
+
+    Raises:
+        HTTPException: If the cache is unknown.
+
+    Returns:
+        dict: The entries, sizes, ages and hit rate of the cache.
+    """
+    return get_cache(name).describe()
+
+
+@router.post("/caches/{name}/refresh")
+async def refresh_cache(name: str, key: Optional[str] = None, current_user: schemas.User = Depends(oauth2.get_current_admin)):
+    """
+    Force a refetch of one cache entry, or of every entry when no key is given.
+
+    Entries keep being served until their refetch completes.
+
+    Args:
+        name (str): The cache name.
+        key (str, optional): The entry key as listed by /admin/caches. Defaults to every entry.
+        current_user (schemas.User, optional): The current admin. Defaults to Depends(oauth2.get_current_admin).
+
+    Raises:
+        HTTPException: If the cache or key is unknown, the cache cannot be refreshed, or the refetch fails.
+
+    Returns:
+        dict: The refreshed keys and the cache after the refresh.
+    """
+    cache = get_cache(name)
+    if cache.refresh is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Cache '{name}' is recomputed on demand and can only be evicted")
+    keys = [key] if key is not None else list(cache.entries())
+    for entry_key in keys:
+        try:
+            await cache.refresh(entry_key)
+        except KeyError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f"Unknown key '{entry_key}' in cache '{name}'")
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY,
+                                detail=f"Failed to refresh '{entry_key}' in cache '{name}': {e}")
+    return {'refreshed': keys, 'cache': cache.describe()}
+
+
+@router.delete("/caches/{name}")
+async def evict_cache(name: str, key: Optional[str] = None, current_user: schemas.User = Depends(oauth2.get_current_admin)):
+    """
+    Evict one cache entry, or every entry when no key is given.
+
+    Args:
+        name (str): The cache name.
+        key (str, optional): The entry key as listed by /admin/caches. Defaults to every entry.
+        current_user (schemas.User, optional): The current admin. Defaults to Depends(oauth2.get_current_admin).
+
+    Raises:
+        HTTPException: If the cache is unknown, or the key is given and not cached.
+
+    Returns:
+        dict: The evicted keys.
+    """
+    cache = get_cache(name)
+    if key is not None:
+        if not cache.evict(key):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f"Key '{key}' is not cached in '{name}'")
+        return {'evicted': [key]}
+    keys = [entry_key for entry_key in list(cache.entries()) if cache.evict(entry_key)]
+    return {'evicted': keys}
+
+
+@router.post("/warmup")
+async def warmup(current_user: schemas.User = Depends(oauth2.get_current_admin)):
+    """
+    Warm the equity list (with logos), the indices snapshot and the quotes of every
+    held and watched symbol.
+
+    Args:
+        current_user (schemas.User, optional): The current admin. Defaults to Depends(oauth2.get_current_admin).
+
+    Returns:
+        dict: The warm state, with the error of each cache that failed to warm.
+    """
+    return await cache_registry.warmup()
+
+
+@router.get("/upstreams")
+async def list_upstreams(current_user: schemas.User = Depends(oauth2.get_current_admin)):
+    """
+    List the rate governor of every upstream host this worker has called.
+
+    Args:
+        current_user (schemas.User, optional): The current admin. Defaults to Depends(oauth2.get_current_admin).
+
+    Returns:
+        dict: The circuit state, adapted rate and request counters of each host.
+
+    Example:
+    {
+        "upstreams": [{"host": "finance.yahoo.com", "state": "closed", "rate": 5.0, "max_rate": 5.0,
+                       "burst": 10, "tokens": 8.5, "consecutive_failures": 0, "retry_in_seconds": null,
+                       "paused_for_seconds": 0.0, "requests": 412, "successes": 409, "failures": 3,
+                       "throttled": 2, "rejected": 0, "circuit_opened": 0, "waited_seconds": 12.4}]
+    }
+    """
+    return {'upstreams': [upstream.describe() for upstream in rate_governor.governors.values()]}
+
+
+@router.post("/upstreams/{host}/reset")
+async def reset_upstream(host: str, current_user: schemas.User = Depends(oauth2.get_current_admin)):
+    """
+    Close the circuit of an upstream host and restore its full rate, e.g. once an outage is over.
+
+    Args:
+        host (str): The upstream host as listed by /admin/upstreams.
+        current_user (schemas.User, optional): The current admin. Defaults to Depends(oauth2.get_current_admin).
+
+    Raises:
+        HTTPException: If no governor exists for the host.
+
+    Returns:
+        dict: The governor after the reset.
+    """
+    upstream = rate_governor.governors.get(host)
+    if upstream is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Unknown upstream '{host}', expected one of {', '.join(rate_governor.governors)}")
+    upstream.reset()
+    return upstream.describe()
@@ -0,0 +1,110 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+import models
+import schemas
+import database
+import oauth2
+from utils import indicators
+
+router = APIRouter(
+    prefix="/indicators",
+    tags=["indicators"]
+)
+
+# Symbol sets a screen can run over
+SCREEN_SCOPES = ("held", "all")
+
+
+@router.get("/screen")
+async def screen_indicators(conditions: List[str] = Query(...), scope: str = "held", db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Find the symbols whose latest daily indicators satisfy every condition.
+
+    Args:
+        conditions (List[str]): Conditions such as "rsi<30" or "close>sma_50".
+        scope (str, optional): "held" screens the current user's holdings, "all" every NSE
+            listed equity as of its last background refresh. Defaults to "held".
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Raises:
+        HTTPException: If a condition or the scope is invalid, or the indicators of the NSE
+            equity list have not been computed yet.
+
+    Returns:
+        dict: The matching symbols with their latest indicator values, and for scope "all"
+        the date the universe was last refreshed.
+
+    Example:
+    {
+        "scope": "held", "conditions": ["rsi<30"],
+        "data": [{"stock_ticker": "INFY", "trade_exchange": "NSE", "as_of": "2024-06-28", "close": 1450.2,
+                  "rsi": 27.4, "sma_20": 1502.3, "sma_50": 1530.8, "macd": -12.1, ...}]
+    }
+    """
+    if scope not in SCREEN_SCOPES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Invalid scope '{scope}', expected one of {', '.join(SCREEN_SCOPES)}")
+    try:
+        parsed = [indicators.parse_condition(condition)
+                  for condition in conditions]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+    if scope == "held":
+        result = await db.execute(select(
+            models.HoldingsSummary.stock_ticker, models.HoldingsSummary.trade_exchange
+        ).where(models.HoldingsSummary.user_id == current_user.get('user_id'),
+                models.HoldingsSummary.total_quantity > 0))
+        keys = [tuple(row) for row in result]
+        await indicators.refresh(db, keys)
+        return {"scope": scope, "conditions": conditions, "data": indicators.screen(parsed, keys)}
+
+    # The universe is kept current by indicators.refresh_universe_loop and screened as it stands
+    if indicators.universe["as_of"] is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="The indicators of the NSE equity list are not ready yet")
+    return {"scope": scope, "conditions": conditions, "as_of": indicators.universe["as_of"].isoformat(),
+            "data": indicators.screen(parsed, indicators.universe["keys"])}
+
+
+@router.get("/{stock_ticker}")
+async def get_indicators(stock_ticker: str, exchange: str = "NSE", points: int = Query(1, ge=1, le=500), db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get SMA, EMA, RSI, MACD and Bollinger bands of a stock from stored daily closes.
+
+    Args:
+        stock_ticker (str): The stock ticker.
+        exchange (str, optional): The exchange. Defaults to "NSE".
+        points (int, optional): The number of most recent daily values to return. Defaults to 1.
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Raises:
+        HTTPException: If there is no price history for the stock.
+
+    Returns:
+        dict: The latest indicator values, plus the last `points` daily values when points > 1.
+
+    Example:
+    {
+        "stock_ticker": "INFY", "trade_exchange": "NSE",
+        "latest": {"as_of": "2024-06-28", "close": 1450.2, "sma_20": 1502.3, "sma_50": 1530.8, "ema_12": 1480.1,
+                   "ema_26": 1492.2, "macd": -12.1, "macd_signal": -8.4, "macd_histogram": -3.7, "rsi": 27.4,
+                   "bollinger_upper": 1580.0, "bollinger_middle": 1502.3, "bollinger_lower": 1424.6}
+    }
+    """
+    key = (stock_ticker.upper(), exchange.upper())
+    await indicators.refresh(db, [key])
+    latest = indicators.latest(key)
+    if latest is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"No price history for stock_ticker '{key[0]}'")
+
+    response = {"stock_ticker": key[0], "trade_exchange": key[1], "latest": latest}
+    if points > 1:
+        response["series"] = await indicators.series(db, key, points)
+    return response
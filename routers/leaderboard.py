@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+import schemas
+import database
+import oauth2
+from utils import leaderboard
+
+router = APIRouter(
+    prefix="/leaderboard",
+    tags=["leaderboard"]
+)
+
+
+@router.get("/")
+async def get_leaderboard(rank_by: str = "holders", limit: int = Query(20, ge=1, le=100), db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get the most-held and most-traded tickers across the platform.
+
+    Served from incrementally maintained counters, never from an aggregation over trade entries.
+
+    Args:
+        rank_by (str, optional): "holders" (users holding the ticker), "quantity" (quantity held
+            across users) or "activity" (recent trades, decaying with a 7-day half-life).
+            Defaults to "holders".
+        limit (int, optional): The number of tickers to return. Defaults to 20.
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Raises:
+        HTTPException: If rank_by is invalid.
+
+    Returns:
+        dict: The ranked tickers with their counters.
+
+    Example:
+    {
+        "rank_by": "holders",
+        "data": [{"rank": 1, "stock_ticker": "RELIANCE", "trade_exchange": "NSE", "holder_count": 42,
+                  "held_quantity": 3150, "trade_count": 97, "activity": 6.8125}]
+    }
+    """
+    try:
+        data = await leaderboard.top(db, rank_by, limit)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Invalid rank_by '{rank_by}', expected one of {', '.join(leaderboard.RANKINGS)}")
+    return {'rank_by': rank_by, 'data': data}
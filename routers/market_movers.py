@@ -2,7 +2,8 @@ from operator import index
 import oauth2
 import asyncio
 import schemas
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from utils import market_movers_utils
 
 router = APIRouter(
@@ -42,3 +43,130 @@ async def get_main_indices(current_user: schemas.User = Depends(oauth2.get_curre
 
     # Return the fetched indices
     return indices_info
+
+
+async def _fetch_movers(fetcher, index: str, limit: int):
+    # Shared wrapper that turns unexpected ranking failures into a 500
+    try:
+        movers = await fetcher(index=index, limit=limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail="Failed to rank market movers") from e
+    return {"index": index.upper(), "data": movers}
+
+
+@router.get("/top_gainers")
+async def get_top_gainers(index: str = market_movers_utils.DEFAULT_MOVERS_INDEX, limit: int = Query(10, ge=1, le=100), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get the top gainers of an index by percentage change.
+
+    Parameters:
+    - index: The NSE index whose constituents are ranked. Defaults to NIFTY 500.
+    - limit: The number of stocks to return.
+    - current_user: The current authenticated user.
+
+    Returns:
+    - A dictionary with the index name and the ranked stocks.
+
+    Example:
+    {
+        "index": "NIFTY 50",
+        "data": [{"symbol": "TATAMOTORS", "last_price": 950.1, "change": 20.3, "change_percent": 2.18,
+                  "volume": 12000000.0, "year_high": 1065.6, "year_high_distance_percent": 10.84}]
+    }
+    """
+    return await _fetch_movers(market_movers_utils.fetch_top_gainers, index, limit)
+
+
+@router.get("/top_losers")
+async def get_top_losers(index: str = market_movers_utils.DEFAULT_MOVERS_INDEX, limit: int = Query(10, ge=1, le=100), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get the top losers of an index by percentage change.
+
+    Parameters:
+    - index: The NSE index whose constituents are ranked. Defaults to NIFTY 500.
+    - limit: The number of stocks to return.
+    - current_user: The current authenticated user.
+
+    Returns:
+    - A dictionary with the index name and the ranked stocks.
+    """
+    return await _fetch_movers(market_movers_utils.fetch_top_losers, index, limit)
+
+
+@router.get("/most_active")
+async def get_most_active(index: str = market_movers_utils.DEFAULT_MOVERS_INDEX, limit: int = Query(10, ge=1, le=100), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get the most active stocks of an index by traded volume.
+
+    Parameters:
+    - index: The NSE index whose constituents are ranked. Defaults to NIFTY 500.
+    - limit: The number of stocks to return.
+    - current_user: The current authenticated user.
+
+    Returns:
+    - A dictionary with the index name and the ranked stocks.
+    """
+    return await _fetch_movers(market_movers_utils.fetch_most_active, index, limit)
+
+
+@router.get("/near_52_week_high")
+async def get_near_52_week_high(index: str = market_movers_utils.DEFAULT_MOVERS_INDEX, limit: int = Query(10, ge=1, le=100), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get the stocks of an index trading closest to their 52-week high.
+
+    Parameters:
+    - index: The NSE index whose constituents are ranked. Defaults to NIFTY 500.
+    - limit: The number of stocks to return.
+    - current_user: The current authenticated user.
+
+    Returns:
+    - A dictionary with the index name and the ranked stocks.
+    """
+    return await _fetch_movers(market_movers_utils.fetch_near_52_week_high, index, limit)
+
+
+@router.get("/indices")
+async def get_indices(names: List[str] = Query(default=[]), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get live values of NSE indices from the shared all-indices snapshot.
+
+    Parameters:
+    - names: The index names to return. Returns every index when empty.
+    - current_user: The current authenticated user.
+
+    Returns:
+    - A dictionary with the index name as the key and the index info as the value.
+
+    Example:
+    {
+        "NIFTY IT": {"category": "SECTORAL INDICES", "value": 35120.4, "change": 210.5, "change_percent": 0.6,
+                     "open": 34950.0, "high": 35200.1, "low": 34900.2, "previous_close": 34909.9,
+                     "year_high": 38000.0, "year_low": 30000.0, "advances": 7, "declines": 3, "unchanged": 0}
+    }
+    """
+    if not names:
+        return await market_movers_utils.fetch_all_indices()
+    return await market_movers_utils.fetch_indices(names, fields=None)
+
+
+@router.get("/sector_heatmap")
+async def get_sector_heatmap(current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get the sectoral indices ordered from best to worst performer.
+
+    Parameters:
+    - current_user: The current authenticated user.
+
+    Returns:
+    - A dictionary with the sectors ordered by percentage change.
+
+    Example:
+    {
+        "data": [{"index": "NIFTY IT", "value": 35120.4, "change": 210.5, "change_percent": 0.6,
+                  "advances": 7, "declines": 3, "unchanged": 0}]
+    }
+    """
+    return {"data": await market_movers_utils.fetch_sector_heatmap()}
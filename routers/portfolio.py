@@ -0,0 +1,94 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+import schemas
+import database
+import oauth2
+from utils import equity_curve, holdings_summary, portfolio_risk
+
+router = APIRouter(
+    prefix="/portfolio",
+    tags=["portfolio"]
+)
+
+
+@router.get("/equity_curve")
+async def get_equity_curve(start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get the daily value and returns of the current user's portfolio over a date range.
+
+    Args:
+        start (date, optional): The first date. Defaults to the first trade date.
+        end (date, optional): The last date. Defaults to today.
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Raises:
+        HTTPException: If start is after end.
+
+    Returns:
+        dict: Columnar arrays of dates, portfolio value, net invested amount, daily return and cumulative return.
+
+    Example:
+    {
+        "start": "2024-01-01", "end": "2024-01-03",
+        "dates": ["2024-01-01", "2024-01-02", "2024-01-03"],
+        "value": [10000.0, 10120.0, 10080.0], "invested": [10000.0, 10000.0, 10000.0],
+        "daily_return": [0.0, 0.012, -0.003953], "cumulative_return": [0.0, 0.012, 0.008]
+    }
+    """
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="start must not be after end")
+    return await equity_curve.get_equity_curve(db, current_user.get('user_id'), start, end)
+
+
+@router.get("/summary")
+async def get_summary(db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get the materialized per-holding totals of the current user's portfolio.
+
+    Args:
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Returns:
+        dict: Per open (stock_ticker, trade_exchange) quantity, cost basis, average cost and open lot count, plus portfolio totals.
+
+    Example:
+    {
+        "holdings": [{"stock_ticker": "INFY", "trade_exchange": "NSE", "total_quantity": 15, "total_cost": 2100.0,
+                      "average_price": 140.0, "lot_count": 2}],
+        "totals": {"holdings": 1, "total_cost": 2100.0, "lot_count": 2}
+    }
+    """
+    return await holdings_summary.get_summary(db, current_user.get('user_id'))
+
+
+@router.get("/risk")
+async def get_risk(window: int = Query(portfolio_risk.TRADING_DAYS, ge=20, le=5 * portfolio_risk.TRADING_DAYS), db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get risk analytics of the current user's open holdings from stored daily closes.
+
+    Args:
+        window (int, optional): The number of daily returns used. Defaults to one year of sessions.
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Returns:
+        dict: Annualized volatility, beta against NIFTY 50 and historical VaR of the portfolio,
+        the same figures per holding and the correlation matrix of the holdings.
+
+    Example:
+    {
+        "as_of": "2024-06-28", "observations": 252, "window": 252, "benchmark": "NIFTY 50",
+        "portfolio": {"market_value": 152000.0, "annualized_volatility": 0.182, "benchmark_volatility": 0.121,
+                      "beta": 1.08, "value_at_risk": {"95%": {"return": 0.0171, "amount": 2599.2},
+                                                      "99%": {"return": 0.0268, "amount": 4073.6}}},
+        "holdings": [{"stock_ticker": "INFY", "trade_exchange": "NSE", "weight": 0.55,
+                      "annualized_volatility": 0.231, "beta": 0.94}],
+        "correlation": {"symbols": ["INFY", "TCS"], "matrix": [[1.0, 0.71], [0.71, 1.0]]}
+    }
+    """
+    return await portfolio_risk.get_portfolio_risk(db, current_user.get('user_id'), window)
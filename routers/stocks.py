@@ -1,27 +1,34 @@
 from fastapi import HTTPException
-from fastapi.responses import JSONResponse
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import asyncio
 import models
 import schemas
 import database
 import oauth2
-from utils import fetch_live_stock_info, object_as_dict, fetch_stock_info
+from utils import fetch_live_stock_info, object_as_dict, fetch_stock_info, http_cache, intraday, lot_matching, portfolio_cache, quote_cache, request_budget, target_alerts, trade_events, trade_export
 from sqlalchemy.future import select
 from sqlalchemy import delete
-from utils.fetch_live_stock_info import fetch_latest_price
 
 router = APIRouter(
     prefix="/stocks",
     tags=["stocks"]
 )
 
+# Maximum number of trade_ids accepted by a bulk request
+MAX_BULK_TRADES = 1000
+# Trades read from the server-side cursor per chunk of a streamed listing
+STREAM_BATCH_SIZE = 500
+# Quote fields of a trade row whose symbol has no quote at all
+EMPTY_QUOTE = {'last_price': None, 'current_price': None, 'price_change': None,
+               'percentage_change': None, 'stale': True, 'as_of': None}
+
 
 async def fetch_live_data(db: Session, stock_data: models.TradeEntry):
     """
-    Fetch live stock data asynchronously for a given stock.
+    Fetch live stock data asynchronously for a given stock from the shared quote cache.
 
     Args:
         db (Session): The database session.
@@ -30,67 +37,317 @@ async def fetch_live_data(db: Session, stock_data: models.TradeEntry):
     Returns:
         Any: The live stock data.
     """
-    live_data = await fetch_latest_price(
-        stock_ticker=stock_data.stock_ticker, exchange=stock_data.trade_exchange)
+    live_data = await quote_cache.get_quote(
+        stock_ticker=stock_data.stock_ticker, exchange=stock_data.trade_exchange,
+        deadline=request_budget.Deadline())
     return live_data
 
 
-async def fetch_all_stock(db: Session, current_user: schemas.User):
+def normalize_trade_request(request: schemas.NewStock):
+    """
+    Upper-case the identifiers of a trade request and validate its trade side.
+
+    Args:
+        request (schemas.NewStock): The trade request.
+
+    Raises:
+        HTTPException: If the trade side is not BUY or SELL.
+    """
+    request.stock_ticker = request.stock_ticker.upper()
+    request.trade_exchange = request.trade_exchange.upper()
+    request.trade_side = request.trade_side.upper()
+    if request.trade_side not in lot_matching.TRADE_SIDES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Invalid trade_side '{request.trade_side}', expected one of {', '.join(lot_matching.TRADE_SIDES)}")
+
+
+def prepare_trades(trades, equity_table) -> list:
+    """
+    Pair each trade with its quote key and company info, ready for merge_quotes.
+
+    Args:
+        trades (List[models.TradeEntry]): The trades.
+        equity_table (fetch_stock_info.EquityTable): Company info looked up by symbol.
+
+    Returns:
+        List[tuple]: (trade dict, quote key, company info or None) per trade.
+    """
+    # Company info materialized once per distinct symbol, however many trades the user has in it
+    companies = equity_table.rows(stock_data.stock_ticker for stock_data in trades)
+    return [(object_as_dict.object_as_dict(stock_data),
+             quote_cache.quote_key(stock_data.stock_ticker, stock_data.trade_exchange),
+             companies.get(stock_data.stock_ticker))
+            for stock_data in trades]
+
+
+def merge_quotes(rows, quotes: dict) -> list:
+    """
+    Build the enriched trade dictionaries from prepared rows and their quotes.
+
+    Args:
+        rows (List[tuple]): The rows returned by prepare_trades.
+        quotes (dict): The quotes returned by quote_cache.get_quotes.
+
+    Returns:
+        List: A list of dictionaries containing the stock data and the latest stock price.
+    """
+    results = []
+    for stock_data_dict, key, matching_stock_info in rows:
+        live_data = quotes.get(key)
+        stock_data_dict = {**stock_data_dict, **(live_data if live_data is not None else EMPTY_QUOTE)}
+        if matching_stock_info:
+            stock_data_dict.update(matching_stock_info)
+        results.append(stock_data_dict)
+    return results
+
+
+async def enrich_trades(trades, equity_table, deadline: request_budget.Deadline = None) -> list:
+    """
+    Convert trades into dictionaries with the latest stock price and the company info appended.
+
+    Quotes that miss the deadline are filled from the last known quote, and every row
+    carries "stale" and "as_of" so the client can tell live prices from fallbacks.
+
+    Args:
+        trades (List[models.TradeEntry]): The trades.
+        equity_table (fetch_stock_info.EquityTable): Company info looked up by symbol.
+        deadline (request_budget.Deadline, optional): The request's deadline. Defaults to
+            waiting for every quote.
+
+    Returns:
+        List: A list of dictionaries containing the stock data and the latest stock price.
+    """
+    rows = prepare_trades(trades, equity_table)
+    # One quote per distinct symbol, however many trades the user has in it
+    quotes = await quote_cache.get_quotes((key for _, key, _ in rows), deadline)
+    return merge_quotes(rows, quotes)
+
+
+async def fetch_equity_table(deadline: request_budget.Deadline = None) -> fetch_stock_info.EquityTable:
+    """
+    Get the equity list within the request's deadline.
+
+    When the equity list cannot be fetched in time, the last cached list (possibly
+    expired) is used, or no company info at all if it was never fetched. The fetch
+    itself keeps running and refreshes the cache for later requests.
+
+    Args:
+        deadline (request_budget.Deadline, optional): The request's deadline. Defaults to
+            waiting for the fetch.
+
+    Returns:
+        fetch_stock_info.EquityTable: Company info looked up by symbol.
+    """
+    try:
+        return await request_budget.within(
+            deadline, asyncio.shield(fetch_stock_info.fetch_nse_stock_info()))
+    except Exception as e:
+        print(f"Serving the cached equity list, the fetch failed or timed out: {e!r}")
+        return fetch_stock_info.cache["stock_info"] or fetch_stock_info.EquityTable({})
+
+
+async def fetch_all_stock(db: Session, current_user: schemas.User, deadline: request_budget.Deadline = None):
     """
     Fetch all stock data for the current user and append the latest stock price.
 
+    Upstream calls are bounded by the deadline; rows whose quote misses it are served
+    from the last known quote and tagged "stale": True with its "as_of" time.
+
     Args:
         db (Session): The database session.
         current_user (schemas.User): The current user.
+        deadline (request_budget.Deadline, optional): The request's deadline. Defaults to
+            waiting for every upstream call.
 
     Returns:
         List: A list of dictionaries containing the stock data and the latest stock price.
     """
-    final_results = []
-    try:
-        all_stock_data = await db.execute(select(models.TradeEntry).where(models.TradeEntry.user_id == current_user.get('user_id')))
-        all_stock_data = all_stock_data.scalars().all()
+    all_stock_data = await db.execute(select(models.TradeEntry).where(models.TradeEntry.user_id == current_user.get('user_id')))
+    all_stock_data = all_stock_data.scalars().all()
 
-        tasks = [fetch_live_data(db, stock_data)
-                 for stock_data in all_stock_data]
-        live_data_results = await asyncio.gather(*tasks)
-        # print(live_data_results)
+    equity_table = await fetch_equity_table(deadline)
 
-        stock_info = await fetch_stock_info.fetch_nse_stock_info()
+    return await enrich_trades(all_stock_data, equity_table, deadline)
 
-        stock_info_dict = {item['SYMBOL']: item for item in stock_info}
 
-        for i, stock_data in enumerate(all_stock_data):
-            stock_data_dict = object_as_dict.object_as_dict(stock_data)
-            if live_data_results[i] is not None:
-                stock_data_dict.update(live_data_results[i])
+async def fetch_portfolio_payload(db: Session, user_id: int, deadline: request_budget.Deadline = None) -> http_cache.EncodedPayload:
+    """
+    Get the encoded /stocks/all response of a user from the per-user portfolio cache.
 
-            matching_stock_info = stock_info_dict.get(stock_data.stock_ticker)
-            if matching_stock_info:
-                stock_data_dict.update(matching_stock_info)
+    The trades and their company info are re-read only after a trade change of the
+    user, an equity list refresh or portfolio_cache.TRADES_TTL. Otherwise, when none of
+    the portfolio's quotes changed and all are fresh, the cached payload is served as
+    is; when some did, only the quotes are merged again.
 
-            final_results.append(stock_data_dict)
+    Args:
+        db (Session): The database session.
+        user_id (int): The user.
+        deadline (request_budget.Deadline, optional): The request's deadline. Defaults to
+            waiting for every upstream call.
 
-        return final_results
-    except Exception as e:
-        print(f"An error occurred while fetching stock data: {e}")
-        return None
+    Returns:
+        http_cache.EncodedPayload: The enriched trades, encoded.
+    """
+    entry = portfolio_cache.get(user_id, fetch_stock_info.cache["version"])
+    if entry is None:
+        trades_version = portfolio_cache.trades_version(user_id)
+        all_stock_data = await db.execute(select(models.TradeEntry).where(models.TradeEntry.user_id == user_id))
+        equity_table = await fetch_equity_table(deadline)
+        entry = portfolio_cache.store(user_id, portfolio_cache.PortfolioEntry(
+            trades_version, fetch_stock_info.cache["version"],
+            prepare_trades(all_stock_data.scalars().all(), equity_table)))
+
+    payload = portfolio_cache.cached_payload(entry)
+    if payload is None:
+        quotes = await quote_cache.get_quotes(entry.keys, deadline)
+        payload = portfolio_cache.set_payload(entry, http_cache.EncodedPayload(merge_quotes(entry.rows, quotes)))
+    return payload
+
+
+async def stream_all_stock(user_id: int, deadline: request_budget.Deadline = None):
+    """
+    Yield the JSON array of a user's enriched trades batch by batch.
+
+    Trades are read from a server-side cursor, so the opening bytes reach the client
+    before the whole portfolio has been loaded and enriched. Opens its own session,
+    because the body is produced after the request's dependencies have been closed.
+
+    Args:
+        user_id (int): The user whose trades are listed.
+        deadline (request_budget.Deadline, optional): The request's deadline, shared by
+            every batch. Defaults to waiting for every upstream call.
+
+    Yields:
+        bytes: Chunks of the JSON array.
+    """
+    yield b"["
+    equity_table = await fetch_equity_table(deadline)
+
+    separator = ""
+    async with database.async_session() as db:
+        trades = await db.stream_scalars(
+            select(models.TradeEntry)
+            .where(models.TradeEntry.user_id == user_id)
+            .order_by(models.TradeEntry.trade_id)
+            .execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for partition in trades.partitions():
+            rows = await enrich_trades(partition, equity_table, deadline)
+            yield (separator + ",".join(http_cache.encode(row) for row in rows)).encode()
+            separator = ","
+    yield b"]"
 
 
 @router.get("/all")
-async def get_all_stock(db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+async def get_all_stock(request: Request, stream: bool = False, budget: float = Query(request_budget.DEFAULT_BUDGET, gt=0, le=30), db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
     """
     Fetch all stock data from the TradeEntry table for the current user and append the latest stock price.
 
+    Repeated requests are served from the user's cached portfolio while neither their
+    trades nor the portfolio's quotes changed, with an ETag for conditional requests.
+
     Args:
+        request (Request): The incoming request, for If-None-Match and Accept-Encoding.
+        stream (bool, optional): Stream the JSON array as trades are enriched instead of
+            building it in memory first. Defaults to False.
+        budget (float, optional): Seconds to wait on upstream market data before answering
+            with the last known quotes tagged "stale". Defaults to REQUEST_BUDGET_SECONDS.
         db (Session, optional): The database session. Defaults to Depends(database.get_db).
         current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
 
     Returns:
-        List: A list of dictionaries containing the stock data and the latest stock price.
+        List: A list of dictionaries containing the stock data and the latest stock price,
+        or 304 Not Modified.
     """
-    final_results = await fetch_all_stock(db, current_user)
-    return final_results
+    deadline = request_budget.Deadline(budget)
+    if stream:
+        return StreamingResponse(stream_all_stock(current_user.get('user_id'), deadline), media_type="application/json")
+    payload = await fetch_portfolio_payload(db, current_user.get('user_id'), deadline)
+    return http_cache.conditional_response(request, payload)
+
+
+@router.get("/export")
+async def export_stock(format: str = "csv", include_quotes: bool = False, current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Download the current user's trades as CSV, Parquet or XLSX.
+
+    Rows are read from a server-side cursor in batches and encoded as they arrive,
+    so memory stays flat however many trades are exported.
+
+    Args:
+        format (str, optional): "csv", "parquet" or "xlsx". Defaults to "csv".
+        include_quotes (bool, optional): Add the latest cached quote of each stock. Defaults to False.
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Raises:
+        HTTPException: If the format is unknown or its library is not installed.
+
+    Returns:
+        StreamingResponse: The export as an attachment.
+    """
+    export_format = format.lower()
+    try:
+        trade_export.check_format(export_format)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    except ImportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"{export_format} export is not available: {e.name} is not installed") from e
+
+    return StreamingResponse(
+        trade_export.export_trades(
+            current_user.get('user_id'), export_format, include_quotes),
+        media_type=trade_export.EXPORT_FORMATS[export_format][0],
+        headers={"Content-Disposition": f'attachment; filename="trades.{export_format}"'})
+
+
+@router.get("/holdings", response_model=List[schemas.ShowPosition])
+async def get_holdings(cost_method: str = lot_matching.FIFO, include_closed: bool = False, db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get the lot-matched positions of the current user with realized and unrealized P&L.
+
+    Positions are read from the precomputed positions table rather than replayed from trades.
+
+    Args:
+        cost_method (str, optional): FIFO or AVERAGE. Defaults to FIFO.
+        include_closed (bool, optional): Include positions that are fully sold. Defaults to False.
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Raises:
+        HTTPException: If the cost method is unknown.
+
+    Returns:
+        List: A list of positions with cost basis, realized P&L and, when a quote is available, unrealized P&L.
+    """
+    cost_method = cost_method.upper()
+    if cost_method not in lot_matching.COST_METHODS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Invalid cost_method '{cost_method}', expected one of {', '.join(lot_matching.COST_METHODS)}")
+
+    query = select(models.Position).where(
+        models.Position.user_id == current_user.get('user_id'))
+    if not include_closed:
+        query = query.where(models.Position.quantity != 0)
+    positions = await db.execute(query)
+    positions = positions.scalars().all()
+
+    open_positions = [position for position in positions if position.quantity]
+    quotes = await quote_cache.get_quotes(((position.stock_ticker, position.trade_exchange)
+                                           for position in open_positions), request_budget.Deadline())
+    position_quotes = {}
+    for position in open_positions:
+        quote = quotes.get(quote_cache.quote_key(
+            position.stock_ticker, position.trade_exchange))
+        if quote is not None:
+            position_quotes[position.position_id] = quote
+
+    views = []
+    for position in positions:
+        quote = position_quotes.get(position.position_id, {})
+        views.append({**lot_matching.position_view(position, cost_method, quote.get('last_price')),
+                      'stale': quote.get('stale'), 'as_of': quote.get('as_of')})
+    return views
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
@@ -104,24 +361,24 @@ async def create_new_stock(request: schemas.NewStock, db: Session = Depends(data
         current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
 
     Raises:
-        HTTPException: If the stock entry already exists.
+        HTTPException: If the stock entry already exists, or a sell exceeds the open quantity.
 
     Returns:
         dict: A message indicating the stock entry was created successfully.
     """
-    stock_info = await db.execute(select(models.TradeEntry).where(models.TradeEntry.stock_ticker == request.stock_ticker, models.TradeEntry.trade_entry_date == request.trade_entry_date))
+    normalize_trade_request(request)
+    stock_info = await db.execute(select(models.TradeEntry).where(models.TradeEntry.stock_ticker == request.stock_ticker, models.TradeEntry.trade_entry_date == request.trade_entry_date, models.TradeEntry.trade_side == request.trade_side, models.TradeEntry.user_id == current_user.get('user_id')))
     stock_info = stock_info.scalar()
 
     if stock_info:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail=f"Stock entry with stock_ticker '{request.stock_ticker}' and trade_entry_date '{request.trade_entry_date}' already exists")
 
-    request.stock_ticker = request.stock_ticker.upper()
-    request.trade_exchange = request.trade_exchange.upper()
     new_stock = models.TradeEntry(
         **request.dict(), user_id=current_user.get('user_id'))
     db.add(new_stock)
-    await db.commit()
+    await db.flush()
+    await trade_events.commit(db, [], [trade_events.snapshot(new_stock)])
     return {"data": f"Stock entry with stock_ticker '{request.stock_ticker}' and trade_entry_date '{request.trade_entry_date}' created successfully"}
 
 
@@ -157,19 +414,50 @@ async def get_stock(stock_ticker: str, db: Session = Depends(database.get_db), c
     return final_results
 
 
+@router.get("/{stock_ticker}/intraday")
+async def get_intraday(stock_ticker: str, exchange: str = "NSE", points: int = Query(100, ge=3, le=1000), since: Optional[int] = None, current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get a downsampled intraday price series of a stock for sparkline charts.
+
+    The series is built from the prices the app has already observed, so it never
+    calls the upstream; symbols nobody has quoted yet return empty lists.
+
+    Args:
+        stock_ticker (str): The stock ticker.
+        exchange (str, optional): The exchange. Defaults to "NSE".
+        points (int, optional): The maximum number of points, chosen by LTTB. Defaults to 100.
+        since (int, optional): Only ticks at or after these epoch milliseconds.
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Returns:
+        dict: Columnar epoch-millisecond timestamps and prices.
+
+    Example:
+    {
+        "stock_ticker": "INFY", "trade_exchange": "NSE",
+        "t": [1719546300000, 1719546315000, 1719546330000], "p": [1450.2, 1451.05, 1449.8]
+    }
+    """
+    series = intraday.sparkline(stock_ticker, exchange, points, since)
+    return {"stock_ticker": stock_ticker.upper(), "trade_exchange": exchange.upper(), **series}
+
+
 @router.get("/stock_tickers")
-async def get_stock_tickers(current_user: schemas.User = Depends(oauth2.get_current_user)):
+async def get_stock_tickers(request: Request, current_user: schemas.User = Depends(oauth2.get_current_user)):
     """
     Retrieve stock tickers.
 
     This endpoint fetches stock information from the NSE (National Stock Exchange)
     and returns a list of stock tickers and their corresponding company names.
+    The payload is encoded and compressed once per equity list refresh and carries an
+    ETag, so clients sending a matching If-None-Match get an empty 304 response.
 
     Parameters:
+    - request: The incoming request, used for If-None-Match and Accept-Encoding.
     - current_user: The current authenticated user.
 
     Returns:
-    - A dictionary containing the list of stock tickers and company names.
+    - A dictionary containing the list of stock tickers and company names, or 304 Not Modified.
 
     Example:
     {
@@ -186,13 +474,151 @@ async def get_stock_tickers(current_user: schemas.User = Depends(oauth2.get_curr
         raise HTTPException(status_code=404, detail="No stock info found")
 
     try:
-        stocks = [{"ticker": stock['SYMBOL'],
-                   "company_name": stock['NAME OF COMPANY']} for stock in stock_info]
+        payload = fetch_stock_info.stock_tickers_payload()
     except KeyError:
         raise HTTPException(
             status_code=500, detail="Invalid stock info format")
 
-    return {"data": stocks}
+    return http_cache.conditional_response(request, payload)
+
+
+def bulk_trade_conditions(user_id: int, trade_ids, trade_filter: schemas.TradeFilter):
+    """
+    Build the WHERE conditions selecting a user's trades by id list and/or filter.
+
+    Args:
+        user_id (int): The owner every selected trade must belong to.
+        trade_ids (List[int], optional): The trade ids to select.
+        trade_filter (schemas.TradeFilter, optional): Field filters to select by.
+
+    Raises:
+        HTTPException: If neither trade_ids nor a non-empty filter is given, or too many ids are given.
+
+    Returns:
+        List: SQLAlchemy conditions, always including the ownership check.
+    """
+    filters = trade_filter.dict(exclude_none=True) if trade_filter else {}
+    if trade_ids is None and not filters:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Provide trade_ids or a non-empty filter")
+    if trade_ids is not None and len(trade_ids) > MAX_BULK_TRADES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"At most {MAX_BULK_TRADES} trade_ids can be changed per request")
+
+    conditions = [models.TradeEntry.user_id == user_id]
+    if trade_ids is not None:
+        conditions.append(models.TradeEntry.trade_id.in_(trade_ids))
+    for field in ('stock_ticker', 'trade_exchange', 'trade_side'):
+        if field in filters:
+            conditions.append(getattr(models.TradeEntry, field)
+                              == filters[field].upper())
+    if 'trade_strategy' in filters:
+        conditions.append(models.TradeEntry.trade_strategy ==
+                          filters['trade_strategy'])
+    if 'entry_date_from' in filters:
+        conditions.append(models.TradeEntry.trade_entry_date >=
+                          filters['entry_date_from'])
+    if 'entry_date_to' in filters:
+        conditions.append(models.TradeEntry.trade_entry_date <=
+                          filters['entry_date_to'])
+    return conditions
+
+
+def bulk_results(trade_ids, matched_ids, status_text: str):
+    """
+    Build per-id results: every requested id, or every matched id for filter-only requests.
+    """
+    if trade_ids is None:
+        return [{"trade_id": trade_id, "status": status_text} for trade_id in sorted(matched_ids)]
+    return [{"trade_id": trade_id, "status": status_text if trade_id in matched_ids else "not_found"}
+            for trade_id in dict.fromkeys(trade_ids)]
+
+
+@router.put("/bulk", response_model=List[schemas.BulkTradeResult])
+async def bulk_update_stock(request: schemas.BulkTradeUpdate, db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Apply the same changes to many of the current user's trades in one transaction.
+
+    Trades are selected by trade_ids and/or filter, always restricted to the current user.
+    Ids that do not exist or belong to another user are reported as not_found.
+
+    Args:
+        request (schemas.BulkTradeUpdate): The trade selection and the fields to change.
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Raises:
+        HTTPException: If the selection or changes are invalid, or the changes leave a sell unmatched.
+
+    Returns:
+        List: Per trade_id results with status "updated" or "not_found".
+    """
+    conditions = bulk_trade_conditions(
+        current_user.get('user_id'), request.trade_ids, request.filter)
+    changes = request.changes.dict(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="No changes provided")
+    # Every trade column is required, so an explicit null can never be stored
+    null_fields = [field for field, value in changes.items() if value is None]
+    if null_fields:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Fields cannot be set to null: {', '.join(null_fields)}")
+    for field in ('stock_ticker', 'trade_exchange', 'trade_side'):
+        if changes.get(field) is not None:
+            changes[field] = changes[field].upper()
+    if 'trade_side' in changes and changes['trade_side'] not in lot_matching.TRADE_SIDES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Invalid trade_side '{changes['trade_side']}', expected one of {', '.join(lot_matching.TRADE_SIDES)}")
+
+    stock_info = await db.execute(select(models.TradeEntry).where(*conditions).with_for_update())
+    old_trades = [trade_events.snapshot(trade)
+                  for trade in stock_info.scalars().all()]
+    matched_ids = {trade['trade_id'] for trade in old_trades}
+    if any(target_alerts.rearms(trade, changes) for trade in old_trades):
+        changes['target_hit_at'] = None
+
+    if matched_ids:
+        await db.execute(models.TradeEntry.__table__.update().where(
+            models.TradeEntry.trade_id.in_(matched_ids),
+            models.TradeEntry.user_id == current_user.get('user_id')).values(**changes))
+        await trade_events.commit(db, old_trades, [{**trade, **changes} for trade in old_trades])
+    return bulk_results(request.trade_ids, matched_ids, "updated")
+
+
+@router.post("/bulk_delete", response_model=List[schemas.BulkTradeResult])
+async def bulk_delete_stock(request: schemas.BulkTradeDelete, db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Delete many of the current user's trades in one transaction.
+
+    Trades are selected by trade_ids and/or filter, always restricted to the current user.
+    Ids that do not exist or belong to another user are reported as not_found.
+
+    Args:
+        request (schemas.BulkTradeDelete): The trade selection.
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Raises:
+        HTTPException: If the selection is invalid, or deleting the trades leaves a sell unmatched.
+
+    Returns:
+        List: Per trade_id results with status "deleted" or "not_found".
+    """
+    conditions = bulk_trade_conditions(
+        current_user.get('user_id'), request.trade_ids, request.filter)
+
+    stock_info = await db.execute(select(models.TradeEntry).where(*conditions).with_for_update())
+    old_trades = [trade_events.snapshot(trade)
+                  for trade in stock_info.scalars().all()]
+    matched_ids = {trade['trade_id'] for trade in old_trades}
+
+    if matched_ids:
+        await db.execute(delete(models.TradeEntry).where(
+            models.TradeEntry.trade_id.in_(matched_ids),
+            models.TradeEntry.user_id == current_user.get('user_id')))
+        await trade_events.commit(db, old_trades, [])
+    return bulk_results(request.trade_ids, matched_ids, "deleted")
 
 
 @router.delete("/{trade_id}", response_class=JSONResponse, status_code=status.HTTP_200_OK)
@@ -205,18 +631,23 @@ async def delete_stock(trade_id: int, db: Session = Depends(database.get_db), cu
         db (Session, optional): The database session. Defaults to Depends(database.get_db).
         current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
 
+    Raises:
+        HTTPException: If the trade is not found, or deleting it leaves a sell unmatched.
+
     Returns:
         JSONResponse: HTTP 200 OK response with a success message.
     """
-    result = await db.execute(delete(models.TradeEntry).where(models.TradeEntry.trade_id == trade_id))
-    await db.commit()
-
-    if result.rowcount:
-        return {"message": f"Successfully deleted {result.rowcount} entries for trade_id {trade_id}"}
-    else:
+    stock_info = await db.execute(select(models.TradeEntry).where(models.TradeEntry.trade_id == trade_id, models.TradeEntry.user_id == current_user.get('user_id')))
+    stock_info = stock_info.scalars().first()
+    if not stock_info:
         raise HTTPException(
             status_code=404, detail="No entries found for the provided stock ticker")
 
+    old_trades = [trade_events.snapshot(stock_info)]
+    result = await db.execute(delete(models.TradeEntry).where(models.TradeEntry.trade_id == trade_id, models.TradeEntry.user_id == current_user.get('user_id')))
+    await trade_events.commit(db, old_trades, [])
+    return {"message": f"Successfully deleted {result.rowcount} entries for trade_id {trade_id}"}
+
 
 @router.put("/{trade_id}", status_code=status.HTTP_202_ACCEPTED)
 async def update_stock(trade_id: int, request: schemas.NewStock, db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
@@ -230,16 +661,22 @@ async def update_stock(trade_id: int, request: schemas.NewStock, db: Session = D
         current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
 
     Raises:
-        HTTPException: If the stock with the specified stock_ticker is not found.
+        HTTPException: If the stock with the specified stock_ticker is not found, or the update leaves a sell unmatched.
 
     Returns:
         dict: A message indicating the stock was updated successfully.
     """
-    stock_info = await db.execute(models.TradeEntry.__table__.select().where(models.TradeEntry.trade_id == trade_id))
-    stock_info = stock_info.scalar()
+    stock_info = await db.execute(select(models.TradeEntry).where(models.TradeEntry.trade_id == trade_id, models.TradeEntry.user_id == current_user.get('user_id')))
+    stock_info = stock_info.scalars().first()
     if not stock_info:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"Stock with stock_ticker '{trade_id}' not found")
-    await db.execute(models.TradeEntry.__table__.update().where(models.TradeEntry.trade_id == trade_id).values(**request.dict()))
-    await db.commit()
+
+    normalize_trade_request(request)
+    old_trades = [trade_events.snapshot(stock_info)]
+    changes = request.dict()
+    if target_alerts.rearms(old_trades[0], changes):
+        changes['target_hit_at'] = None
+    await db.execute(models.TradeEntry.__table__.update().where(models.TradeEntry.trade_id == trade_id, models.TradeEntry.user_id == current_user.get('user_id')).values(**changes))
+    await trade_events.commit(db, old_trades, [{**old_trades[0], **changes}])
     return {"data": f"Stock with stock_ticker '{trade_id}' updated successfully"}
@@ -0,0 +1,220 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+import models
+import schemas
+import database
+import oauth2
+from utils import quote_cache, request_budget
+
+router = APIRouter(
+    prefix="/watchlists",
+    tags=["watchlists"]
+)
+
+# Maximum number of symbols on one watchlist
+MAX_WATCHLIST_SYMBOLS = 100
+
+
+def symbol_keys(symbols) -> list:
+    # Distinct upper-cased (stock_ticker, trade_exchange) pairs, in request order
+    return list(dict.fromkeys(quote_cache.quote_key(symbol.stock_ticker, symbol.trade_exchange)
+                              for symbol in symbols))
+
+
+async def get_user_watchlist(db: Session, watchlist_id: int, user_id: int) -> models.Watchlist:
+    """
+    Load a watchlist owned by the user.
+
+    Raises:
+        HTTPException: If the user has no watchlist with this id.
+    """
+    result = await db.execute(select(models.Watchlist).where(
+        models.Watchlist.watchlist_id == watchlist_id, models.Watchlist.user_id == user_id))
+    watchlist = result.scalars().first()
+    if not watchlist:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Watchlist with id {watchlist_id} not found")
+    return watchlist
+
+
+@router.get("/", response_model=List[schemas.ShowWatchlist])
+async def get_watchlists(db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get every watchlist of the current user.
+
+    Args:
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Returns:
+        List[schemas.ShowWatchlist]: The watchlists with their symbols.
+    """
+    result = await db.execute(select(models.Watchlist).where(
+        models.Watchlist.user_id == current_user.get('user_id')).order_by(models.Watchlist.watchlist_id))
+    return result.scalars().all()
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.ShowWatchlist)
+async def create_watchlist(request: schemas.NewWatchlist, db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Create a watchlist for the current user.
+
+    Args:
+        request (schemas.NewWatchlist): The watchlist name and its initial symbols.
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Raises:
+        HTTPException: If the name is taken or there are too many symbols.
+
+    Returns:
+        schemas.ShowWatchlist: The created watchlist.
+    """
+    user_id = current_user.get('user_id')
+    keys = symbol_keys(request.symbols)
+    if len(keys) > MAX_WATCHLIST_SYMBOLS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"A watchlist holds at most {MAX_WATCHLIST_SYMBOLS} symbols")
+    existing = await db.execute(select(models.Watchlist.watchlist_id).where(
+        models.Watchlist.user_id == user_id, models.Watchlist.name == request.name))
+    if existing.first():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Watchlist '{request.name}' already exists")
+
+    watchlist = models.Watchlist(user_id=user_id, name=request.name, symbols=[
+        models.WatchlistSymbol(stock_ticker=ticker, trade_exchange=exchange) for ticker, exchange in keys])
+    db.add(watchlist)
+    await db.commit()
+    quote_cache.subscribe(user_id, keys)
+    return watchlist
+
+
+@router.get("/{watchlist_id}")
+async def get_watchlist(watchlist_id: int, db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Get a watchlist with the latest price of each symbol.
+
+    Quotes come from the shared quote cache, so each distinct symbol is fetched
+    upstream at most once per refresh however many users watch or hold it. Quotes
+    that miss the request budget are served from the last known value tagged "stale".
+
+    Args:
+        watchlist_id (int): The watchlist id.
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Returns:
+        dict: The watchlist with each symbol's quote merged in.
+
+    Example:
+    {
+        "watchlist_id": 1, "name": "Banks",
+        "symbols": [{"stock_ticker": "HDFCBANK", "trade_exchange": "NSE", "last_price": 1650.5,
+                     "current_price": "₹1650.50", "price_change": "+12.30", "percentage_change": "+0.75%"}]
+    }
+    """
+    watchlist = await get_user_watchlist(db, watchlist_id, current_user.get('user_id'))
+    keys = [(symbol.stock_ticker, symbol.trade_exchange)
+            for symbol in watchlist.symbols]
+    quotes = await quote_cache.get_quotes(keys, request_budget.Deadline())
+
+    symbols = []
+    for stock_ticker, exchange in keys:
+        symbol = {'stock_ticker': stock_ticker, 'trade_exchange': exchange}
+        quote = quotes.get(quote_cache.quote_key(stock_ticker, exchange))
+        if quote is not None:
+            symbol.update(quote)
+        symbols.append(symbol)
+    return {'watchlist_id': watchlist.watchlist_id, 'name': watchlist.name, 'symbols': symbols}
+
+
+@router.post("/{watchlist_id}/symbols", response_model=schemas.ShowWatchlist)
+async def add_watchlist_symbols(watchlist_id: int, request: List[schemas.WatchlistSymbol], db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Add symbols to a watchlist, ignoring those already on it.
+
+    Args:
+        watchlist_id (int): The watchlist id.
+        request (List[schemas.WatchlistSymbol]): The symbols to add.
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Raises:
+        HTTPException: If the watchlist is not found or would hold too many symbols.
+
+    Returns:
+        schemas.ShowWatchlist: The updated watchlist.
+    """
+    user_id = current_user.get('user_id')
+    watchlist = await get_user_watchlist(db, watchlist_id, user_id)
+    present = set(symbol_keys(watchlist.symbols))
+    keys = [key for key in symbol_keys(request) if key not in present]
+    if len(present) + len(keys) > MAX_WATCHLIST_SYMBOLS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"A watchlist holds at most {MAX_WATCHLIST_SYMBOLS} symbols")
+
+    watchlist.symbols.extend(models.WatchlistSymbol(stock_ticker=ticker, trade_exchange=exchange)
+                             for ticker, exchange in keys)
+    await db.commit()
+    quote_cache.subscribe(user_id, keys)
+    return watchlist
+
+
+@router.delete("/{watchlist_id}/symbols/{stock_ticker}", response_model=schemas.ShowWatchlist)
+async def remove_watchlist_symbol(watchlist_id: int, stock_ticker: str, trade_exchange: str = "NSE", db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Remove a symbol from a watchlist.
+
+    Args:
+        watchlist_id (int): The watchlist id.
+        stock_ticker (str): The stock ticker to remove.
+        trade_exchange (str, optional): The exchange of the stock. Defaults to "NSE".
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Raises:
+        HTTPException: If the watchlist or the symbol is not found.
+
+    Returns:
+        schemas.ShowWatchlist: The updated watchlist.
+    """
+    user_id = current_user.get('user_id')
+    watchlist = await get_user_watchlist(db, watchlist_id, user_id)
+    key = quote_cache.quote_key(stock_ticker, trade_exchange)
+    symbol = next((symbol for symbol in watchlist.symbols
+                   if quote_cache.quote_key(symbol.stock_ticker, symbol.trade_exchange) == key), None)
+    if symbol is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Stock '{key[0]}' is not on watchlist {watchlist_id}")
+
+    watchlist.symbols.remove(symbol)
+    await db.commit()
+    quote_cache.unsubscribe(user_id, [key])
+    return watchlist
+
+
+@router.delete("/{watchlist_id}", status_code=status.HTTP_200_OK)
+async def delete_watchlist(watchlist_id: int, db: Session = Depends(database.get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """
+    Delete a watchlist and its symbols.
+
+    Args:
+        watchlist_id (int): The watchlist id.
+        db (Session, optional): The database session. Defaults to Depends(database.get_db).
+        current_user (schemas.User, optional): The current user. Defaults to Depends(oauth2.get_current_user).
+
+    Raises:
+        HTTPException: If the watchlist is not found.
+
+    Returns:
+        dict: A message confirming the deletion.
+    """
+    user_id = current_user.get('user_id')
+    watchlist = await get_user_watchlist(db, watchlist_id, user_id)
+    keys = symbol_keys(watchlist.symbols)
+    await db.delete(watchlist)
+    await db.commit()
+    quote_cache.unsubscribe(user_id, keys)
+    return {"message": f"Watchlist with id {watchlist_id} deleted successfully"}
@@ -17,9 +17,47 @@ class NewStock(BaseModel):
     trade_total_price: float
     target_price: float
     trade_strategy: str
+    trade_side: str = "BUY"
     # user_id: int
 
 
+class TradeUpdate(BaseModel):
+    stock_ticker: Optional[str] = None
+    trade_exchange: Optional[str] = None
+    trade_entry_date: Optional[date] = None
+    quantity: Optional[int] = None
+    price_per_stock: Optional[float] = None
+    trade_total_price: Optional[float] = None
+    target_price: Optional[float] = None
+    trade_strategy: Optional[str] = None
+    trade_side: Optional[str] = None
+
+
+class TradeFilter(BaseModel):
+    stock_ticker: Optional[str] = None
+    trade_exchange: Optional[str] = None
+    trade_strategy: Optional[str] = None
+    trade_side: Optional[str] = None
+    entry_date_from: Optional[date] = None
+    entry_date_to: Optional[date] = None
+
+
+class BulkTradeUpdate(BaseModel):
+    trade_ids: Optional[List[int]] = None
+    filter: Optional[TradeFilter] = None
+    changes: TradeUpdate
+
+
+class BulkTradeDelete(BaseModel):
+    trade_ids: Optional[List[int]] = None
+    filter: Optional[TradeFilter] = None
+
+
+class BulkTradeResult(BaseModel):
+    trade_id: int
+    status: str
+
+
 # This below class will be used in get method to return only elements in the class
 
 
@@ -32,6 +70,40 @@ class ShowStocksInfo(BaseModel):
         orm_mode = True
 
 
+class ShowPosition(BaseModel):
+    stock_ticker: str
+    trade_exchange: str
+    cost_method: str
+    quantity: int
+    average_price: Optional[float] = None
+    cost_basis: float
+    realized_pnl: float
+    last_price: Optional[float] = None
+    market_value: Optional[float] = None
+    unrealized_pnl: Optional[float] = None
+    stale: Optional[bool] = None
+    as_of: Optional[str] = None
+
+
+class WatchlistSymbol(BaseModel):
+    stock_ticker: str
+    trade_exchange: str = "NSE"
+
+
+class NewWatchlist(BaseModel):
+    name: str
+    symbols: List[WatchlistSymbol] = []
+
+
+class ShowWatchlist(BaseModel):
+    watchlist_id: int
+    name: str
+    symbols: List[WatchlistSymbol] = []
+
+    class Config():
+        orm_mode = True
+
+
 class User(BaseModel):
     username: str
     email: str
@@ -74,3 +146,4 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: Optional[str] = None
     user_id: Optional[int] = None
+    is_admin: bool = False
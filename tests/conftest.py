@@ -0,0 +1,57 @@
+"""
+Fixtures running the application against a scratch SQLite database with every
+market-data upstream served from the benchmark fakes.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# The engine is created when `database` is imported, so this must come first
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='tests_'), 'tests.db')}"
+os.environ["MARKET_DATA_WARMUP"] = "0"
+
+PASSWORD = "password"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from benchmarks import fakes
+    import main
+
+    fakes.install(universe=50)
+    main.MARKET_DATA_WARMUP = False
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def headers(client, request):
+    """
+    Sign up a fresh user for the test and return its authorization headers.
+    """
+    email = f"{request.node.name.lower()}@example.com"
+    response = client.post("/signup/", json={"username": request.node.name, "email": email,
+                                             "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    token = client.post("/login/", data={"username": email, "password": PASSWORD}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def new_trade():
+    """
+    Return a builder of /stocks/ request bodies for trades on NSE.
+    """
+    def build(stock_ticker: str, quantity: int, price: float, trade_side: str = "BUY",
+              trade_entry_date: str = "2024-01-02", target_price: float = 0) -> dict:
+        return {"stock_ticker": stock_ticker, "trade_exchange": "NSE", "trade_entry_date": trade_entry_date,
+                "quantity": quantity, "price_per_stock": price, "trade_total_price": quantity * price,
+                "target_price": target_price, "trade_strategy": "swing", "trade_side": trade_side}
+    return build
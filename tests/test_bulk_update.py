@@ -0,0 +1,39 @@
+def summary_of(client, headers, stock_ticker: str) -> dict:
+    holdings = client.get("/portfolio/summary", headers=headers).json()["holdings"]
+    return next(holding for holding in holdings if holding["stock_ticker"] == stock_ticker)
+
+
+def test_bulk_update_rejects_null_quantity(client, headers, new_trade):
+    assert client.post("/stocks/", json=new_trade("INFY", 10, 100), headers=headers).status_code == 201
+
+    response = client.put("/stocks/bulk", json={"filter": {"stock_ticker": "INFY"},
+                                                "changes": {"quantity": None}}, headers=headers)
+
+    assert response.status_code == 400
+    assert "quantity" in response.json()["message"]
+    holding = summary_of(client, headers, "INFY")
+    assert holding["total_quantity"] == 10
+    assert holding["lot_count"] == 1
+
+
+def test_bulk_update_rejects_null_stock_ticker(client, headers, new_trade):
+    assert client.post("/stocks/", json=new_trade("TCS", 5, 200), headers=headers).status_code == 201
+
+    response = client.put("/stocks/bulk", json={"filter": {"stock_ticker": "TCS"},
+                                                "changes": {"stock_ticker": None, "target_price": 250}},
+                          headers=headers)
+
+    assert response.status_code == 400
+    assert "stock_ticker" in response.json()["message"]
+    assert summary_of(client, headers, "TCS")["total_quantity"] == 5
+
+
+def test_bulk_update_applies_non_null_changes(client, headers, new_trade):
+    assert client.post("/stocks/", json=new_trade("WIPRO", 4, 50), headers=headers).status_code == 201
+
+    response = client.put("/stocks/bulk", json={"filter": {"stock_ticker": "WIPRO"},
+                                                "changes": {"quantity": 6}}, headers=headers)
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()] == ["updated"]
+    assert summary_of(client, headers, "WIPRO")["total_quantity"] == 6
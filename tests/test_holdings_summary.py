@@ -0,0 +1,26 @@
+def test_partial_sell_lowers_cost_at_average_cost(client, headers, new_trade):
+    client.post("/stocks/", json=new_trade("INFY", 10, 100, trade_entry_date="2024-01-02"), headers=headers)
+    client.post("/stocks/", json=new_trade("INFY", 10, 200, trade_entry_date="2024-01-03"), headers=headers)
+    client.post("/stocks/", json=new_trade("INFY", 5, 300, trade_side="SELL", trade_entry_date="2024-01-04"),
+                headers=headers)
+
+    summary = client.get("/portfolio/summary", headers=headers).json()
+
+    [holding] = summary["holdings"]
+    assert holding["total_quantity"] == 15
+    assert holding["total_cost"] == 2250.0
+    assert holding["average_price"] == 150.0
+    assert holding["lot_count"] == 2
+    assert summary["totals"] == {"holdings": 1, "total_cost": 2250.0, "lot_count": 2}
+
+
+def test_closed_holding_is_left_out_of_totals(client, headers, new_trade):
+    client.post("/stocks/", json=new_trade("TCS", 10, 100, trade_entry_date="2024-01-02"), headers=headers)
+    client.post("/stocks/", json=new_trade("WIPRO", 4, 50, trade_entry_date="2024-01-02"), headers=headers)
+    client.post("/stocks/", json=new_trade("TCS", 10, 120, trade_side="SELL", trade_entry_date="2024-01-05"),
+                headers=headers)
+
+    summary = client.get("/portfolio/summary", headers=headers).json()
+
+    assert [holding["stock_ticker"] for holding in summary["holdings"]] == ["WIPRO"]
+    assert summary["totals"] == {"holdings": 1, "total_cost": 200.0, "lot_count": 1}
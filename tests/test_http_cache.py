@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from utils import http_cache
+
+
+def reject_constant(name):
+    pytest.fail(f"{name} is not valid JSON")
+
+
+def test_non_finite_floats_are_encoded_as_null():
+    payload = http_cache.EncodedPayload([{"last_price": float("nan"), "change": float("inf"),
+                                          "closes": (1.5, float("-inf")), "as_of": "2024-01-02"}])
+
+    assert json.loads(payload.body, parse_constant=reject_constant) == [
+        {"last_price": None, "change": None, "closes": [1.5, None], "as_of": "2024-01-02"}]
+
+
+def test_finite_payloads_are_encoded_as_is():
+    assert http_cache.encode({"price": 1.25, "quantity": 3}) == '{"price":1.25,"quantity":3}'
+
+
+def test_etag_is_weak_and_matches_either_form(client, headers):
+    response = client.get("/stocks/all", headers=headers)
+    etag = response.headers["etag"]
+
+    assert etag.startswith('W/"')
+    for if_none_match in (etag, etag[2:]):
+        revalidated = client.get("/stocks/all", headers={**headers, "If-None-Match": if_none_match})
+        assert revalidated.status_code == 304
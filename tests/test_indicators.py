@@ -0,0 +1,39 @@
+import pytest
+
+from utils import fetch_stock_info, indicators
+
+
+@pytest.fixture
+def universe(monkeypatch):
+    # Each test starts with no background refresh of the universe done yet
+    monkeypatch.setattr(indicators, "universe", {"keys": [], "as_of": None})
+
+
+def test_screening_all_before_the_universe_is_ready(client, headers, universe):
+    response = client.get("/indicators/screen", params={"conditions": "close>0", "scope": "all"}, headers=headers)
+
+    assert response.status_code == 503
+
+
+def test_screening_all_covers_the_nse_equity_list(client, headers, universe):
+    client.portal.call(indicators.refresh_universe)
+
+    response = client.get("/indicators/screen", params={"conditions": "close>0", "scope": "all"}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["as_of"] == indicators.universe["as_of"].isoformat()
+    screened = {row["stock_ticker"] for row in response.json()["data"]}
+    listed = set(fetch_stock_info.cache["stock_info"].column("SYMBOL"))
+    assert listed and screened == listed
+
+
+def test_screening_all_does_not_sync_closes(client, headers, universe, monkeypatch):
+    client.portal.call(indicators.refresh_universe)
+
+    async def no_sync(*args, **kwargs):
+        raise AssertionError("universe screens must not sync closes")
+    monkeypatch.setattr(indicators, "refresh", no_sync)
+
+    response = client.get("/indicators/screen", params={"conditions": "close>0", "scope": "all"}, headers=headers)
+
+    assert response.status_code == 200
@@ -0,0 +1,73 @@
+import numpy as np
+
+from utils import intraday
+
+
+def test_ring_keeps_the_latest_ticks_in_time_order_after_wrapping():
+    ring = intraday.TickRing(size=8)
+    for tick in range(20):
+        ring.append(1000 + tick, float(tick))
+
+    timestamps, prices = ring.series()
+
+    assert len(ring) == 8
+    assert timestamps.tolist() == list(range(1012, 1020))
+    assert prices.tolist() == [float(tick) for tick in range(12, 20)]
+
+
+def test_ring_ignores_ticks_that_are_not_newer():
+    ring = intraday.TickRing(size=4)
+    ring.append(1000, 1.0)
+    ring.append(1000, 2.0)
+    ring.append(999, 3.0)
+
+    assert ring.series()[1].tolist() == [1.0]
+
+
+def test_series_since_filters_on_the_wrapped_ring():
+    ring = intraday.TickRing(size=8)
+    for tick in range(11):
+        ring.append(1000 + tick * 10, float(tick))
+
+    timestamps, _ = ring.series(since=1075)
+
+    assert timestamps.tolist() == [1080, 1090, 1100]
+    assert ring.series(since=2000)[0].tolist() == []
+
+
+def test_lttb_keeps_the_endpoints_and_one_point_per_bucket():
+    x = np.arange(1000, dtype=np.int64)
+    y = np.sin(x / 25.0)
+    y[500] = 10.0
+
+    sampled_x, sampled_y = intraday.lttb(x, y, 50)
+
+    assert len(sampled_x) == 50
+    assert sampled_x[0] == 0 and sampled_x[-1] == 999
+    assert np.all(np.diff(sampled_x) > 0)
+    # Every bucket between the endpoints contributes exactly one point from its own range
+    edges = np.linspace(1, len(x) - 1, 50 - 1).astype(np.int64)
+    assert all(start <= kept < end for kept, start, end in zip(sampled_x[1:-1], edges[:-1], edges[1:]))
+    assert 10.0 in sampled_y
+
+
+def test_lttb_returns_short_series_unchanged():
+    x = np.arange(10, dtype=np.int64)
+    y = x * 2.0
+
+    for threshold in (10, 11, 2):
+        sampled_x, sampled_y = intraday.lttb(x, y, threshold)
+        assert sampled_x is x and sampled_y is y
+
+
+def test_intraday_endpoint_downsamples_recorded_ticks(client, headers):
+    for tick in range(intraday.RING_SIZE + 100):
+        intraday.record("SPARKTEST", "NSE", 100.0 + tick % 7, timestamp=1_700_000_000_000 + tick * 1000)
+
+    response = client.get("/stocks/sparktest/intraday", params={"points": 20}, headers=headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["t"]) == len(body["p"]) == 20
+    assert body["t"][0] == 1_700_000_000_000 + 100 * 1000
+    assert body["t"][-1] == 1_700_000_000_000 + (intraday.RING_SIZE + 99) * 1000
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+import database
+import models
+from utils import leaderboard
+
+
+def ranking_of(client, headers, stock_ticker: str) -> dict:
+    data = client.get("/leaderboard/", params={"rank_by": "holders", "limit": 100}, headers=headers).json()["data"]
+    return next((row for row in data if row["stock_ticker"] == stock_ticker), None)
+
+
+def test_first_trades_of_a_new_ticker_by_two_users(client, headers, new_trade):
+    other = client.post("/signup/", json={"username": "other", "email": "other@example.com", "password": "password"})
+    assert other.status_code == 200
+    token = client.post("/login/", data={"username": "other@example.com", "password": "password"}).json()["access_token"]
+
+    assert client.post("/stocks/", json=new_trade("ZOMATO", 10, 100), headers=headers).status_code == 201
+    assert client.post("/stocks/", json=new_trade("ZOMATO", 5, 110),
+                       headers={"Authorization": f"Bearer {token}"}).status_code == 201
+
+    row = ranking_of(client, headers, "ZOMATO")
+    assert (row["holder_count"], row["held_quantity"], row["trade_count"]) == (2, 15, 2)
+    assert row["activity"] == 2.0
+
+
+def test_selling_out_and_deleting_trades_removes_the_ticker(client, headers, new_trade):
+    client.post("/stocks/", json=new_trade("PAYTM", 10, 100), headers=headers)
+    client.post("/stocks/", json=new_trade("PAYTM", 10, 120, trade_side="SELL", trade_entry_date="2024-01-03"),
+                headers=headers)
+    row = ranking_of(client, headers, "PAYTM")
+    assert row is None
+
+    response = client.post("/stocks/bulk_delete", json={"filter": {"stock_ticker": "PAYTM"}}, headers=headers)
+    assert response.status_code == 200
+
+    assert ("PAYTM", "NSE") not in leaderboard.stats
+
+
+async def age_activity(stock_ticker: str, seconds: float):
+    async with database.async_session() as db:
+        await db.execute(update(models.TickerStats).where(models.TickerStats.stock_ticker == stock_ticker)
+                         .values(activity_at=models.TickerStats.activity_at - seconds))
+        await db.commit()
+
+
+async def stored_activity(stock_ticker: str) -> tuple:
+    async with database.async_session() as db:
+        row = (await db.execute(select(models.TickerStats).where(
+            models.TickerStats.stock_ticker == stock_ticker))).scalars().one()
+        return row.activity, row.activity_at
+
+
+def test_activity_is_decayed_when_written(client, headers, new_trade):
+    for day in ("2024-01-02", "2024-01-03"):
+        client.post("/stocks/", json=new_trade("TITAN", 10, 100, trade_entry_date=day), headers=headers)
+    client.portal.call(age_activity, "TITAN", leaderboard.ACTIVITY_HALF_LIFE)
+
+    response = client.post("/stocks/", json=new_trade("TITAN", 10, 100, trade_entry_date="2024-01-04"),
+                           headers=headers)
+
+    assert response.status_code == 201
+
+    activity, activity_at = client.portal.call(stored_activity, "TITAN")
+    # The two older trades count for one after a half-life, plus the new trade
+    assert activity == pytest.approx(2.0, abs=1e-3)
+    assert activity_at == pytest.approx(time.time(), abs=60)
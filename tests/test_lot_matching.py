@@ -0,0 +1,103 @@
+from datetime import date
+
+import pytest
+from sqlalchemy.future import select
+
+import database
+import models
+from utils import lot_matching
+
+
+def trade(trade_id: int, day: int, quantity: int, price: float, trade_side: str = "BUY") -> dict:
+    return {"trade_id": trade_id, "user_id": 1, "stock_ticker": "INFY", "trade_exchange": "NSE",
+            "trade_entry_date": date(2024, 1, day), "quantity": quantity, "price_per_stock": price,
+            "trade_side": trade_side}
+
+
+def test_fifo_and_average_cost_realize_different_pnl():
+    state = lot_matching.match_trades([trade(1, 2, 10, 100), trade(2, 3, 10, 200), trade(3, 4, 15, 300, "SELL")])
+
+    assert state.quantity == 5
+    # FIFO sells the whole first lot and half of the second
+    assert state.fifo_realized_pnl == 10 * 200 + 5 * 100
+    assert state.fifo_cost_basis == 5 * 200
+    assert list(state.open_lots) == [[2, 5, 200]]
+    # Average cost sells at the running average of 150
+    assert state.avg_realized_pnl == 15 * 150
+    assert state.avg_cost_basis == 5 * 150
+
+
+def test_partial_sell_consumes_part_of_the_oldest_lot():
+    state = lot_matching.match_trades([trade(1, 2, 10, 100), trade(2, 3, 10, 200), trade(3, 4, 3, 90, "SELL")])
+
+    assert list(state.open_lots) == [[1, 7, 100], [2, 10, 200]]
+    assert state.fifo_realized_pnl == 3 * -10
+    assert state.fifo_cost_basis == 7 * 100 + 10 * 200
+
+
+def test_trades_are_matched_in_entry_date_order():
+    trades = [trade(1, 2, 10, 100), trade(2, 3, 10, 200), trade(3, 4, 15, 300, "SELL")]
+
+    state = lot_matching.match_trades(reversed(trades))
+
+    assert (state.quantity, state.fifo_realized_pnl) == (5, 2500)
+    assert not state.follows(trade(4, 3, 1, 100))
+    assert state.follows(trade(4, 5, 1, 100))
+
+
+def test_sell_larger_than_the_open_quantity_is_rejected():
+    with pytest.raises(lot_matching.LotMatchingError):
+        lot_matching.match_trades([trade(1, 2, 5, 100), trade(2, 3, 6, 120, "SELL")])
+
+
+async def trade_id_of(stock_ticker: str, trade_entry_date: str) -> int:
+    async with database.async_session() as db:
+        result = await db.execute(select(models.TradeEntry.trade_id).where(
+            models.TradeEntry.stock_ticker == stock_ticker,
+            models.TradeEntry.trade_entry_date == date.fromisoformat(trade_entry_date)))
+        return result.scalar()
+
+
+def holding(client, headers, stock_ticker: str) -> dict:
+    positions = client.get("/stocks/holdings", params={"include_closed": True}, headers=headers).json()
+    return next(position for position in positions if position["stock_ticker"] == stock_ticker)
+
+
+def test_changing_a_trade_in_the_middle_of_the_history_replays_the_position(client, headers, new_trade):
+    client.post("/stocks/", json=new_trade("LT", 10, 100, trade_entry_date="2024-01-02"), headers=headers)
+    client.post("/stocks/", json=new_trade("LT", 10, 200, trade_entry_date="2024-01-04"), headers=headers)
+    client.post("/stocks/", json=new_trade("LT", 15, 300, trade_side="SELL", trade_entry_date="2024-01-05"),
+                headers=headers)
+
+    # A buy dated before the sell is matched as if it had been entered in order
+    client.post("/stocks/", json=new_trade("LT", 10, 50, trade_entry_date="2024-01-03"), headers=headers)
+    position = holding(client, headers, "LT")
+    assert (position["quantity"], position["realized_pnl"], position["cost_basis"]) == (15, 3250, 2250)
+
+    middle = client.portal.call(trade_id_of, "LT", "2024-01-03")
+    response = client.put(f"/stocks/{middle}", json=new_trade("LT", 10, 150, trade_entry_date="2024-01-03"),
+                          headers=headers)
+    assert response.status_code == 202
+    position = holding(client, headers, "LT")
+    assert (position["quantity"], position["realized_pnl"], position["cost_basis"]) == (15, 2750, 2750)
+
+    assert client.delete(f"/stocks/{middle}", headers=headers).status_code == 200
+    position = holding(client, headers, "LT")
+    assert (position["quantity"], position["realized_pnl"], position["cost_basis"]) == (5, 2500, 1000)
+
+
+def test_change_leaving_a_sell_unmatched_is_rejected(client, headers, new_trade):
+    client.post("/stocks/", json=new_trade("ONGC", 10, 100, trade_entry_date="2024-01-02"), headers=headers)
+    client.post("/stocks/", json=new_trade("ONGC", 5, 120, trade_entry_date="2024-01-03"), headers=headers)
+    client.post("/stocks/", json=new_trade("ONGC", 12, 130, trade_side="SELL", trade_entry_date="2024-01-04"),
+                headers=headers)
+
+    oversell = client.post("/stocks/", json=new_trade("ONGC", 4, 130, trade_side="SELL",
+                                                      trade_entry_date="2024-01-05"), headers=headers)
+    first = client.portal.call(trade_id_of, "ONGC", "2024-01-02")
+    deleted = client.delete(f"/stocks/{first}", headers=headers)
+
+    assert oversell.status_code == 400
+    assert deleted.status_code == 400
+    position = holding(client, headers, "ONGC")
+    assert (position["quantity"], position["realized_pnl"]) == (3, 12 * 130 - 10 * 100 - 2 * 120)
@@ -0,0 +1,35 @@
+import time
+
+from utils import quote_cache, quote_router
+
+
+def test_unquotable_symbol_does_not_force_a_remerge(client, headers, new_trade, monkeypatch):
+    client.post("/stocks/", json=new_trade("RELIANCE", 10, 2500), headers=headers)
+    client.post("/stocks/", json={**new_trade("GOLD", 1, 60000), "trade_exchange": "MCX"}, headers=headers)
+
+    first = client.get("/stocks/all", headers=headers)
+    assert first.status_code == 200
+    assert quote_cache.is_unavailable(("GOLD", "MCX"))
+
+    async def no_upstream(keys):
+        raise AssertionError(f"quotes of {keys} fetched again")
+    monkeypatch.setattr(quote_router, "fetch_quotes", no_upstream)
+
+    second = client.get("/stocks/all", headers=headers)
+    assert second.status_code == 200
+    assert second.content == first.content
+    gold = next(row for row in second.json() if row["stock_ticker"] == "GOLD")
+    assert gold["current_price"] is None
+
+
+def test_streamed_portfolio_encodes_non_finite_prices_as_null(client, headers, new_trade):
+    client.post("/stocks/", json=new_trade("NTPC", 10, 300), headers=headers)
+    quote_cache.quotes[("NTPC", "NSE")] = (
+        time.monotonic(), {**quote_router.build_quote("NTPC", "NSE", None, None), "last_price": float("nan")},
+        "2024-01-02T10:00:00+00:00")
+
+    response = client.get("/stocks/all", params={"stream": True}, headers=headers)
+
+    assert response.status_code == 200
+    assert "NaN" not in response.text
+    assert response.json()[0]["last_price"] is None
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from utils import portfolio_risk, price_history
+
+KEYS = (("INFY", "NSE"), ("TCS", "NSE"))
+LENGTH = 20
+
+
+class FakeCloses:
+    """
+    Daily closes served in place of the price store, up to `last`, with `missing`
+    (date, column) closes not stored yet.
+    """
+
+    def __init__(self, last: date):
+        self.last = last
+        self.missing = set()
+        self.complete = True
+
+    async def sync_closes(self, db, keys, start, end=None):
+        await asyncio.sleep(0)
+        return self.complete
+
+    async def load_closes(self, db, keys, start, end):
+        await asyncio.sleep(0)
+        dates = np.arange(np.datetime64(start), np.datetime64(min(end, self.last)) + 1)
+        days = dates.astype(float)
+        closes = np.column_stack([100 + np.sin(days + column) * 5 for column in range(len(keys))])
+        for day, column in self.missing:
+            closes[dates == np.datetime64(day), column] = np.nan
+        return dates, closes
+
+
+@pytest.fixture
+def closes(monkeypatch):
+    fake = FakeCloses(date.today() - timedelta(days=3))
+    monkeypatch.setattr(price_history, "sync_closes", fake.sync_closes)
+    monkeypatch.setattr(price_history, "load_closes", fake.load_closes)
+    portfolio_risk.windows.clear()
+    portfolio_risk.window_locks.clear()
+    yield fake
+    portfolio_risk.windows.clear()
+    portfolio_risk.window_locks.clear()
+
+
+def rebuilt() -> portfolio_risk.ReturnWindow:
+    # The window as a fresh load would build it from the closes now stored
+    portfolio_risk.windows.clear()
+    return asyncio.run(portfolio_risk._load_window(None, KEYS, LENGTH))
+
+
+def assert_same_window(window, expected):
+    np.testing.assert_array_equal(window.dates, expected.dates)
+    np.testing.assert_allclose(window.returns, expected.returns)
+    np.testing.assert_allclose(window.sums, expected.sums)
+    np.testing.assert_allclose(window.cross, expected.cross, atol=1e-12)
+
+
+def test_concurrent_loads_of_a_stale_window_extend_it_once(closes):
+    window = asyncio.run(portfolio_risk._load_window(None, KEYS, LENGTH))
+    window.checked_on = None
+    closes.last += timedelta(days=3)
+
+    async def load_twice():
+        return await asyncio.gather(portfolio_risk._load_window(None, KEYS, LENGTH),
+                                    portfolio_risk._load_window(None, KEYS, LENGTH))
+    first, second = asyncio.run(load_twice())
+
+    assert first is second is window
+    assert len(np.unique(window.dates)) == len(window.dates)
+    assert window.dates[-1] == np.datetime64(closes.last)
+    assert_same_window(window, rebuilt())
+
+
+def test_window_built_from_a_failed_sync_picks_up_late_closes(closes):
+    closes.missing = {(closes.last, 1)}
+    closes.complete = False
+    window = asyncio.run(portfolio_risk._load_window(None, KEYS, LENGTH))
+    assert window.checked_on is None
+
+    # The next sync stores the close that was missing
+    closes.missing = set()
+    closes.complete = True
+    window = asyncio.run(portfolio_risk._load_window(None, KEYS, LENGTH))
+
+    assert window.checked_on == date.today()
+    assert_same_window(window, rebuilt())
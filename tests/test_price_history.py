@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+import database
+import models
+from utils import price_history
+
+KEY = ("TESTSYNC", "NSE")
+
+
+async def sync_while_another_sync_stores(monkeypatch, closes) -> bool:
+    async def concurrent_sync(governor, download, keys, start, end):
+        # Another request stores the same bars after this sync read the stored ranges
+        async with database.async_session() as other:
+            other.add_all([models.DailyClose(stock_ticker=KEY[0], trade_exchange=KEY[1], close_date=close_date,
+                                             close=close) for close_date, close in closes])
+            await other.commit()
+        return {KEY: closes}
+    monkeypatch.setattr(price_history.rate_governor, "call", concurrent_sync)
+
+    async with database.async_session() as db:
+        return await price_history.sync_closes(db, [KEY], closes[0][0], closes[-1][0])
+
+
+async def stored_closes() -> int:
+    async with database.async_session() as db:
+        return (await db.execute(select(func.count()).select_from(models.DailyClose).where(
+            models.DailyClose.stock_ticker == KEY[0]))).scalar()
+
+
+def test_concurrent_syncs_of_a_symbol_store_each_close_once(client, monkeypatch):
+    start = date.today() - timedelta(days=10)
+    closes = [(start + timedelta(days=day), 3000.0 + day) for day in range(5)]
+    price_history.synced.pop(KEY, None)
+
+    assert client.portal.call(sync_while_another_sync_stores, monkeypatch, closes)
+
+    assert client.portal.call(stored_closes) == len(closes)
@@ -0,0 +1,70 @@
+import asyncio
+
+from sqlalchemy.future import select
+
+import database
+import models
+from utils import target_alerts
+
+
+async def trade_of(stock_ticker: str) -> models.TradeEntry:
+    async with database.async_session() as db:
+        result = await db.execute(select(models.TradeEntry).where(models.TradeEntry.stock_ticker == stock_ticker))
+        return result.scalars().first()
+
+
+async def fire_and_record(stock_ticker: str, price: float):
+    return await target_alerts.record_hits(target_alerts.engine.process_tick(stock_ticker, price))
+
+
+async def reload_targets():
+    async with database.async_session() as db:
+        await target_alerts.load_open_targets(db)
+
+
+def test_fired_target_is_recorded_once_and_not_reloaded(client, headers, new_trade):
+    client.post("/stocks/", json=new_trade("HDFCBANK", 10, 100, target_price=150), headers=headers)
+    trade = client.portal.call(trade_of, "HDFCBANK")
+    assert trade.trade_id in target_alerts.engine._open
+
+    recorded = client.portal.call(fire_and_record, "HDFCBANK", 160.0)
+
+    assert [alert.trade_id for alert in recorded] == [trade.trade_id]
+    assert client.portal.call(trade_of, "HDFCBANK").target_hit_at is not None
+    # Another worker seeing the same tick does not record (or notify) it again
+    assert client.portal.call(target_alerts.record_hits, recorded) == []
+    client.portal.call(reload_targets)
+    assert trade.trade_id not in target_alerts.engine._open
+
+
+def test_changing_the_target_rearms_it(client, headers, new_trade):
+    client.post("/stocks/", json=new_trade("ITC", 10, 100, target_price=150), headers=headers)
+    trade = client.portal.call(trade_of, "ITC")
+    client.portal.call(fire_and_record, "ITC", 160.0)
+
+    response = client.put(f"/stocks/{trade.trade_id}", json=new_trade("ITC", 10, 100, target_price=200),
+                          headers=headers)
+
+    assert response.status_code == 202
+    assert client.portal.call(trade_of, "ITC").target_hit_at is None
+    assert target_alerts.engine._open[trade.trade_id].target_price == 200
+
+
+async def dispatch_and_wait(alerts):
+    target_alerts.engine.dispatch(alerts)
+    await asyncio.gather(*target_alerts.engine._pending)
+
+
+def test_dispatch_records_hits_before_any_hook_runs(client, headers, new_trade, monkeypatch):
+    notified = []
+    # No email hook: recording must not depend on which hooks are registered
+    monkeypatch.setattr(target_alerts.engine, "_hooks", [notified.extend])
+    client.post("/stocks/", json=new_trade("BHEL", 10, 100, target_price=150), headers=headers)
+    trade = client.portal.call(trade_of, "BHEL")
+
+    alerts = target_alerts.engine.process_tick("BHEL", 155.0)
+    client.portal.call(dispatch_and_wait, alerts)
+    client.portal.call(dispatch_and_wait, alerts)
+
+    assert [alert.trade_id for alert in notified] == [trade.trade_id]
+    assert client.portal.call(trade_of, "BHEL").target_hit_at is not None
@@ -0,0 +1,41 @@
+import csv
+import io
+from datetime import datetime
+
+import pytest
+
+from utils import quote_cache, quote_router, target_alerts
+
+
+def test_export_only_reads_cached_quotes(client, headers, new_trade, monkeypatch):
+    client.post("/stocks/", json=new_trade("SBIN", 10, 500), headers=headers)
+    client.post("/stocks/", json=new_trade("BPCL", 5, 300), headers=headers)
+    quote_cache.quotes.pop(("BPCL", "NSE"), None)
+    quote_cache.quotes[("SBIN", "NSE")] = (0.0, quote_router.build_quote("SBIN", "NSE", 510.0, 500.0),
+                                           "2024-01-02T10:00:00+00:00")
+
+    async def no_upstream(keys):
+        raise AssertionError("exports must not fetch quotes")
+    monkeypatch.setattr(quote_router, "fetch_quotes", no_upstream)
+
+    response = client.get("/stocks/export", params={"include_quotes": True}, headers=headers)
+
+    assert response.status_code == 200
+    rows = {row["stock_ticker"]: row for row in csv.DictReader(io.StringIO(response.text))}
+    assert rows["SBIN"]["last_price"] == "510.0"
+    assert rows["SBIN"]["current_price"] == "₹510.00"
+    assert rows["BPCL"]["last_price"] == ""
+
+
+def test_parquet_export_of_a_fired_target(client, headers, new_trade):
+    pq = pytest.importorskip("pyarrow.parquet")
+    client.post("/stocks/", json=new_trade("COALINDIA", 10, 400, target_price=450), headers=headers)
+    fired = target_alerts.engine.process_tick("COALINDIA", 460.0)
+    assert client.portal.call(target_alerts.record_hits, fired)
+
+    response = client.get("/stocks/export", params={"format": "parquet"}, headers=headers)
+
+    assert response.status_code == 200
+    rows = pq.read_table(io.BytesIO(response.content)).to_pylist()
+    assert [row["stock_ticker"] for row in rows] == ["COALINDIA"]
+    assert isinstance(rows[0]["target_hit_at"], datetime)
@@ -66,7 +66,8 @@ async def verify_token(token: str, credentials_exception, db: Session = Depends(
         if email is None:
             raise credentials_exception
         # Create token data object and return
-        token_data = dict(schemas.TokenData(email=email, user_id=user.user_id))
+        token_data = dict(schemas.TokenData(
+            email=email, user_id=user.user_id, is_admin=bool(user.is_admin)))
         return token_data
     except JWTError:
         raise credentials_exception
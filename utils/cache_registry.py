@@ -0,0 +1,129 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+# Seconds between startup warmup attempts while some cache failed to warm
+WARMUP_RETRY_INTERVAL = 30
+
+# Registered caches by name, in registration order
+caches = {}
+# Outcome of the latest warmup; the readiness probe reports ready once every cache warmed
+warm_state = {
+    "ready": False,
+    "started_at": None,
+    "finished_at": None,
+    "duration_seconds": None,
+    "errors": {}
+}
+
+
+class RegisteredCache:
+    """
+    An application cache exposed to the admin endpoints.
+
+    The owning module supplies callbacks over its own storage, so caches keep their
+    data structures and only report through this interface.
+
+    Args:
+        name (str): The name the cache is addressed by.
+        entries (Callable[[], dict]): Returns {key: (size, age in seconds or None)}.
+        evict (Callable[[str], bool]): Drops one entry by key, returning whether it existed.
+        refresh (Callable[[str], Awaitable], optional): Refetches one entry by key.
+        warm (Callable[[], Awaitable], optional): Fills the cache before traffic is served.
+    """
+
+    def __init__(self, name: str, entries, evict, refresh=None, warm=None):
+        self.name = name
+        self.entries = entries
+        self.evict = evict
+        self.refresh = refresh
+        self.warm = warm
+        self.hits = 0
+        self.misses = 0
+
+    def describe(self) -> dict:
+        """
+        Return the entries, sizes, ages and hit rate of the cache.
+        """
+        entries = self.entries()
+        lookups = self.hits + self.misses
+        return {
+            'name': self.name,
+            'entries': [{'key': key, 'size': size, 'age_seconds': None if age is None else round(age, 3)}
+                        for key, (size, age) in entries.items()],
+            'entry_count': len(entries),
+            'total_size': sum(size for size, _ in entries.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'refreshable': self.refresh is not None,
+        }
+
+
+def register(name: str, entries, evict, refresh=None, warm=None) -> RegisteredCache:
+    """
+    Register a cache with the admin endpoints; see RegisteredCache for the callbacks.
+
+    Returns:
+        RegisteredCache: The registration, whose hits and misses the owner counts.
+    """
+    caches[name] = RegisteredCache(name, entries, evict, refresh, warm)
+    return caches[name]
+
+
+def hit(name: str):
+    caches[name].hits += 1
+
+
+def miss(name: str):
+    caches[name].misses += 1
+
+
+def get(name: str) -> RegisteredCache:
+    """
+    Return a registered cache.
+
+    Raises:
+        KeyError: If no cache is registered under the name.
+    """
+    return caches[name]
+
+
+async def warmup() -> dict:
+    """
+    Warm every registered cache concurrently and record whether all of them succeeded.
+
+    Returns:
+        dict: The warm state, with the error of each cache that failed to warm.
+    """
+    warm_state["started_at"] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    started = time.monotonic()
+    warmers = [cache for cache in caches.values() if cache.warm is not None]
+    results = await asyncio.gather(*[cache.warm() for cache in warmers], return_exceptions=True)
+
+    errors = {}
+    for cache, result in zip(warmers, results):
+        if isinstance(result, Exception):
+            print(f"An error occurred while warming the {cache.name} cache: {result!r}")
+            errors[cache.name] = repr(result)
+    warm_state["errors"] = errors
+    warm_state["ready"] = warm_state["ready"] or not errors
+    warm_state["finished_at"] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    warm_state["duration_seconds"] = round(time.monotonic() - started, 3)
+    return dict(warm_state)
+
+
+async def retry_until_ready(interval: int = WARMUP_RETRY_INTERVAL):
+    """
+    Repeat the warmup until every cache has warmed once, e.g. after an upstream blip at boot.
+    """
+    while not warm_state["ready"]:
+        await asyncio.sleep(interval)
+        await warmup()
+
+
+def mark_ready():
+    """
+    Report ready without warming, for workers that do not serve market data.
+    """
+    warm_state["ready"] = True
@@ -27,3 +27,21 @@ async def send_registration_email(to_email: str, username: str):
         print("Email sent successfully")
     except Exception as e:
         print(f"Failed to send email: {e}")
+
+
+async def send_target_alert_email(to_email: str, username: str, alert):
+    message = EmailMessage()
+    message["From"] = SMTP_USER
+    message["To"] = to_email
+    message["Subject"] = f"Target price reached for {alert.stock_ticker}"
+    message.set_content(
+        f"Hello {username},\n\n{alert.stock_ticker} traded at {alert.triggered_price:.2f}, "
+        f"reaching your target price of {alert.target_price:.2f} "
+        f"(entry price {alert.entry_price}).")
+
+    try:
+        # Sent from the event loop that evaluates price ticks, so it must not block
+        await aiosmtplib.send(message, hostname=SMTP_HOST, port=SMTP_PORT)
+        print("Email sent successfully")
+    except Exception as e:
+        print(f"Failed to send email: {e}")
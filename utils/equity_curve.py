@@ -0,0 +1,151 @@
+import time
+from datetime import date
+import numpy as np
+from sqlalchemy.future import select
+import models
+from utils import cache_registry, price_history
+
+# Seconds a computed curve is served from cache (daily closes change once a day)
+CACHE_TTL = 15 * 60
+# Date ranges cached per user before the oldest is evicted
+MAX_RANGES_PER_USER = 8
+
+# Cache of computed curves: user_id -> {(start, end): (computed_at, curve)}
+cache = {}
+
+
+def invalidate(user_id: int):
+    """
+    Drop every cached curve of a user, e.g. after one of their trades changed.
+    """
+    cache.pop(user_id, None)
+
+
+def forward_fill(closes: np.ndarray) -> np.ndarray:
+    """
+    Carry the last known close forward over missing bars, column by column.
+    """
+    rows = np.where(np.isnan(closes), 0, np.arange(closes.shape[0])[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return closes[rows, np.arange(closes.shape[1])]
+
+
+def compute_equity_curve(dates, closes, trade_dates, trade_columns, quantities, cash_flows) -> dict:
+    """
+    Compute daily portfolio value and time-weighted returns.
+
+    Holdings are built by scattering each trade's signed quantity onto the first
+    session on or after its entry date and taking a cumulative sum down the dates,
+    so the whole curve is one (dates x symbols) holdings x prices product.
+
+    Args:
+        dates (np.ndarray): Session dates (datetime64[D]), ascending.
+        closes (np.ndarray): Closes per (date, symbol), NaN where missing.
+        trade_dates (np.ndarray): Entry date of each trade (datetime64[D]).
+        trade_columns (np.ndarray): Symbol column of each trade.
+        quantities (np.ndarray): Signed quantity of each trade (sells negative).
+        cash_flows (np.ndarray): Signed cash invested by each trade (sells negative).
+
+    Returns:
+        dict: Columnar arrays of dates, value, invested, daily_return and cumulative_return.
+    """
+    rows = np.searchsorted(dates, trade_dates, side='left')
+    in_range = rows < len(dates)
+    rows, columns = rows[in_range], trade_columns[in_range]
+
+    holdings = np.zeros(closes.shape)
+    np.add.at(holdings, (rows, columns), quantities[in_range])
+    np.cumsum(holdings, axis=0, out=holdings)
+
+    value = np.einsum('ij,ij->i', holdings,
+                      np.nan_to_num(forward_fill(closes)))
+    flows = np.bincount(rows, weights=cash_flows[in_range], minlength=len(dates))
+    invested = np.cumsum(flows)
+
+    # Time-weighted daily return: strip the day's cash flows out of the value change
+    previous = np.concatenate(([0.0], value[:-1]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily_return = np.where(
+            previous > 0, (value - previous - flows) / previous, 0.0)
+    cumulative_return = np.cumprod(1 + daily_return) - 1
+
+    return {
+        'dates': np.datetime_as_string(dates, unit='D').tolist(),
+        'value': np.round(value, 2).tolist(),
+        'invested': np.round(invested, 2).tolist(),
+        'daily_return': np.round(daily_return, 6).tolist(),
+        'cumulative_return': np.round(cumulative_return, 6).tolist(),
+    }
+
+
+async def get_equity_curve(db, user_id: int, start: date = None, end: date = None) -> dict:
+    """
+    Get the daily equity curve of a user, served from cache while fresh.
+
+    Args:
+        db (Session): The database session.
+        user_id (int): The user whose trades make up the portfolio.
+        start (date, optional): The first date. Defaults to the first trade date.
+        end (date, optional): The last date. Defaults to today.
+
+    Returns:
+        dict: The curve as columnar arrays, plus the resolved start and end dates.
+    """
+    user_cache = cache.setdefault(user_id, {})
+    cached = user_cache.get((start, end))
+    if cached is not None and time.monotonic() - cached[0] < CACHE_TTL:
+        cache_registry.hit("equity_curves")
+        return cached[1]
+    cache_registry.miss("equity_curves")
+
+    result = await db.execute(select(
+        models.TradeEntry.stock_ticker, models.TradeEntry.trade_exchange, models.TradeEntry.trade_entry_date,
+        models.TradeEntry.quantity, models.TradeEntry.price_per_stock, models.TradeEntry.trade_side
+    ).where(models.TradeEntry.user_id == user_id))
+    trades = result.all()
+
+    curve_start = start or min(
+        (trade.trade_entry_date for trade in trades), default=date.today())
+    curve_end = end or date.today()
+    curve = {'start': curve_start.isoformat(), 'end': curve_end.isoformat(), 'dates': [],
+             'value': [], 'invested': [], 'daily_return': [], 'cumulative_return': []}
+
+    if trades and curve_start <= curve_end:
+        keys = sorted({(trade.stock_ticker, trade.trade_exchange)
+                      for trade in trades})
+        await price_history.sync_closes(db, keys, curve_start, curve_end)
+        dates, closes = await price_history.load_closes(db, keys, curve_start, curve_end)
+
+        if len(dates):
+            columns = {key: i for i, key in enumerate(keys)}
+            signs = np.array([-1.0 if (trade.trade_side or 'BUY') == 'SELL' else 1.0
+                              for trade in trades])
+            quantities = signs * \
+                np.array([trade.quantity or 0 for trade in trades], dtype=np.float64)
+            prices = np.array([trade.price_per_stock or 0.0 for trade in trades])
+            curve.update(compute_equity_curve(
+                dates, closes,
+                np.array([trade.trade_entry_date for trade in trades],
+                         dtype='datetime64[D]'),
+                np.array([columns[(trade.stock_ticker, trade.trade_exchange)]
+                         for trade in trades]),
+                quantities, quantities * prices))
+
+    if len(user_cache) >= MAX_RANGES_PER_USER:
+        user_cache.pop(next(iter(user_cache)))
+    user_cache[(start, end)] = (time.monotonic(), curve)
+    return curve
+
+
+def _cache_entries() -> dict:
+    # One entry per user: the number of cached ranges and the age of the newest
+    now = time.monotonic()
+    return {str(user_id): (len(ranges), now - max(computed_at for computed_at, _ in ranges.values()))
+            for user_id, ranges in cache.items() if ranges}
+
+
+def _evict(key: str) -> bool:
+    return cache.pop(int(key), None) is not None if key.isdigit() else False
+
+
+cache_registry.register("equity_curves", _cache_entries, _evict)
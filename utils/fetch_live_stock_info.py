@@ -4,16 +4,7 @@
 # # print(data)
 
 # print(dir(nselib))
-import yfinance as yf
-from bs4 import BeautifulSoup
-import requests
-from jugaad_data.nse import NSELive
-import json
-import aiohttp
-import asyncio
-from nselib import capital_market
-
-nse_live_connection = NSELive()
+from utils import market_data, market_movers_utils, quote_router, rate_governor
 
 
 # def fetch_live_stock_info(symbol: str):
@@ -53,34 +44,14 @@ async def fetch_latest_price(stock_ticker, exchange="NSE"):
     exchange (str): The exchange where the stock is listed.
 
     Returns:
-    dict: A dictionary containing the current price, change in price, and percentage change.
+    dict: A dictionary containing the numeric last price and the formatted current price, change in price, and percentage change.
     """
-    symbol = f"{stock_ticker}.NS"
-    stock = yf.Ticker(symbol)
-    info = stock.info
-
-    current_price = info.get('currentPrice')
-    previous_close = info.get('previousClose')
-
-    if current_price is not None and previous_close is not None:
-        price_change = current_price - previous_close
-        percentage_change = (price_change / previous_close) * 100
-
-        current_price_str = f"₹{current_price:.2f}"
-        price_change_str = f"{'+' if price_change >
-                              0 else ''}{price_change:.2f}"
-        percentage_change_str = f"{
-            '+' if percentage_change > 0 else ''}{percentage_change:.2f}%"
-    else:
-        current_price_str = None
-        price_change_str = None
-        percentage_change_str = None
-
-    return {
-        'current_price': current_price_str,
-        'price_change': price_change_str,
-        'percentage_change': percentage_change_str
-    }
+    symbol = quote_router.yahoo_symbol(stock_ticker, exchange)
+    stock = market_data.yfinance().Ticker(symbol)
+    # .info is a blocking HTTP call; run it off the event loop, paced by Yahoo's governor
+    info = await rate_governor.call(rate_governor.YAHOO, lambda: stock.info)
+
+    return quote_router.build_quote(stock_ticker, exchange, info.get('currentPrice'), info.get('previousClose'))
 
 # Example usage
 # Fetch info for Reliance Industries Ltd. on NSE
@@ -89,20 +60,6 @@ async def fetch_latest_price(stock_ticker, exchange="NSE"):
 
 
 async def fetch_indices():
-    indices_data = capital_market.market_watch_all_indices()
-
-    # Filter the data for the required indices
+    # Filter the cached all-indices snapshot for the required indices
     required_indices = ['NIFTY 50', 'INDIA VIX', 'NIFTY BANK']
-    filtered_data = indices_data[indices_data['index'].isin(required_indices)]
-
-    indices_info = {}
-
-    for _, row in filtered_data.iterrows():
-        index_info = {
-            'value': row['last'],
-            'change': row['variation'],
-            'change_percent': row['percentChange']
-        }
-        indices_info[row['index']] = index_info
-
-    return indices_info
+    return await market_movers_utils.fetch_indices(required_indices)
@@ -1,58 +1,241 @@
-from nselib import capital_market
-import httpx
-import pandas as pd
 import asyncio
+import hashlib
+import json
+import array
+import sys
+from utils import cache_registry, http_cache, http_client, market_data, rate_governor
 
-# Cache for storing stock info
+# Seconds the equity list is served from cache before it is refetched (24 hours)
+STOCK_INFO_TTL = 24 * 60 * 60
+
+# Cache for storing stock info; "stock_info" holds the EquityTable of the equity list
 cache = {
     "stock_info": None,
-    "last_fetched": None
+    "last_fetched": None,
+    # Content digest of the cached equity list, changes only when a refresh changes the data
+    "version": None
+}
+# Serializes refreshes, so concurrent cache misses share one equity list and logo fetch
+# instead of each queueing thousands of logo lookups behind the rate governor
+stock_info_lock = asyncio.Lock()
+
+# Columns with at most this share of distinct values are stored as codes into a category list
+CATEGORICAL_RATIO = 0.5
+# Most distinct values a coded column can hold (16-bit codes)
+MAX_CATEGORIES = 2 ** 15 - 1
+
+
+class EquityTable:
+    """
+    Compact, read-only table of the NSE equity list.
+
+    Columns are stored once for all rows instead of as one dict per row:
+    low-cardinality columns (series, face value, missing logos) as 16-bit codes into a
+    tuple of distinct values, and the rest as lists of interned strings. A symbol -> row
+    index is built once per refresh, so lookups are O(1) and only the requested rows
+    are materialized as dicts.
+    """
+    __slots__ = ("names", "columns", "symbols", "index")
+
+    def __init__(self, columns: dict, symbol_column: str = "SYMBOL"):
+        """
+        Args:
+            columns (dict): {column name: list of values}, every list one entry per row.
+            symbol_column (str, optional): The column rows are looked up by. Defaults to "SYMBOL".
+        """
+        self.names = tuple(sys.intern(str(name)) for name in columns)
+        self.columns = tuple(self._encode(values) for values in columns.values())
+        self.symbols = list(columns.get(symbol_column, []))
+        self.index = {symbol: row for row, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_frame(cls, df) -> "EquityTable":
+        """
+        Build the table from the equity_list() DataFrame.
+        """
+        return cls({name: [sys.intern(value) if isinstance(value, str) else value
+                           for value in df[name].tolist()] for name in df.columns})
+
+    @staticmethod
+    def _encode(values: list):
+        # (codes, categories) for low-cardinality columns, the values as they are otherwise
+        categories = {}
+        codes = [categories.setdefault(value, len(categories)) for value in values]
+        if len(categories) > len(values) * CATEGORICAL_RATIO or len(categories) > MAX_CATEGORIES:
+            return values
+        return (array.array('h', codes), tuple(categories))
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def row(self, row: int) -> dict:
+        """
+        Materialize one row as {column name: value}.
+        """
+        return {name: column[1][column[0][row]] if type(column) is tuple else column[row]
+                for name, column in zip(self.names, self.columns)}
+
+    def get(self, symbol: str, default=None):
+        """
+        Return the row of a symbol as a dict, or default if the symbol is not listed.
+        """
+        row = self.index.get(symbol)
+        return default if row is None else self.row(row)
+
+    def rows(self, symbols) -> dict:
+        """
+        Return {symbol: row dict} for the listed symbols among `symbols`, one dict per distinct symbol.
+        """
+        index = self.index
+        return {symbol: self.row(index[symbol]) for symbol in dict.fromkeys(symbols) if symbol in index}
+
+    def column(self, name: str) -> list:
+        """
+        Return every value of a column.
+
+        Raises:
+            KeyError: If the table has no such column.
+        """
+        if name not in self.names:
+            raise KeyError(name)
+        column = self.columns[self.names.index(name)]
+        if type(column) is tuple:
+            return [column[1][code] for code in column[0]]
+        return list(column)
+
+    def records(self):
+        """
+        Yield every row as a dict, in equity list order.
+        """
+        for row in range(len(self)):
+            yield self.row(row)
+
+
+# Pre-encoded /stocks/stock_tickers payload for the current cache version
+stock_tickers_cache = {
+    "version": None,
+    "payload": None
 }
 
 
-async def get_company_logo(symbol):
+async def get_company_logo(symbol, fallback=None):
+    # The logo URL, None when there is no logo, or fallback when the lookup failed
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f'https://logo.clearbit.com/{symbol.lower()}.com')
-            if response.status_code == 200:
-                return f'https://logo.clearbit.com/{symbol.lower()}.com'
-            else:
-                return None
+        # Bulk lookup: queue behind the governor rather than fail fast
+        response = await http_client.get(f'https://logo.clearbit.com/{symbol.lower()}.com', max_wait=None)
+        if response.status_code == 200:
+            return f'https://logo.clearbit.com/{symbol.lower()}.com'
+        elif response.status_code == 404:
+            return None
+        else:
+            return fallback
     except Exception:
-        return None
+        return fallback
+
+
+def _is_cached() -> bool:
+    return cache["stock_info"] is not None and \
+        asyncio.get_event_loop().time() - cache["last_fetched"] < STOCK_INFO_TTL
 
 
-async def fetch_nse_stock_info():
+async def fetch_nse_stock_info(force: bool = False):
     # If cache is valid, return cached data
-    if cache["stock_info"] is not None:
+    if not force and _is_cached():
+        cache_registry.hit("equity_list")
         return cache["stock_info"]
 
+    async with stock_info_lock:
+        # Another caller may have refreshed the cache while this one waited
+        if not force and _is_cached():
+            cache_registry.hit("equity_list")
+            return cache["stock_info"]
+        cache_registry.miss("equity_list")
+        return await _fetch_nse_stock_info()
+
+
+async def _fetch_nse_stock_info():
     # Get the list of all stock codes and company names
-    equity_list = capital_market.equity_list()
+    equity_list = await rate_governor.call(rate_governor.NSE, lambda: market_data.capital_market().equity_list())
 
     # Convert stock codes to a DataFrame
     df = equity_list
 
-    # Fetch company logos asynchronously
+    # Fetch company logos asynchronously, keeping the cached logo of symbols whose lookup
+    # failed (e.g. while the logo host is throttling us)
+    previous = cache["stock_info"]
+
     async def fetch_logo(symbol):
-        logo = await get_company_logo(symbol)
+        fallback = (previous.get(symbol) or {}).get('LogoURL') if previous is not None else None
+        logo = await get_company_logo(symbol, fallback)
         return logo
 
     logos = await asyncio.gather(*[fetch_logo(symbol) for symbol in df['SYMBOL']])
     df['LogoURL'] = logos
 
     # Cache the data
-    cache["stock_info"] = df.to_dict(orient='records')
+    cache["stock_info"] = EquityTable.from_frame(df)
     cache["last_fetched"] = asyncio.get_event_loop().time()
+    cache["version"] = hashlib.sha1(json.dumps(
+        list(cache["stock_info"].records()), sort_keys=True, default=str).encode()).hexdigest()[:16]
 
     return cache["stock_info"]
 
 
 async def refresh_stock_info_cache():
     while True:
-        await fetch_nse_stock_info()
+        try:
+            await fetch_nse_stock_info()
+        except Exception as e:
+            print(f"An error occurred while refreshing stock info: {e}")
         # Refresh every 24 hours (86400 seconds)
-        await asyncio.sleep(24 * 60 * 60)
+        await asyncio.sleep(STOCK_INFO_TTL)
+
+
+def stock_tickers_payload() -> http_cache.EncodedPayload:
+    """
+    Return the ticker list payload, encoded once per equity list refresh.
+
+    Call after fetch_nse_stock_info() has populated the cache.
+
+    Raises:
+        KeyError: If the cached equity list is missing the SYMBOL or NAME OF COMPANY columns.
+
+    Returns:
+        http_cache.EncodedPayload: The pre-encoded {"data": [{"ticker", "company_name"}, ...]} payload.
+    """
+    if stock_tickers_cache["version"] != cache["version"] or stock_tickers_cache["payload"] is None:
+        table = cache["stock_info"]
+        stocks = [{"ticker": symbol, "company_name": name}
+                  for symbol, name in zip(table.column('SYMBOL'), table.column('NAME OF COMPANY'))]
+        stock_tickers_cache["payload"] = http_cache.EncodedPayload(
+            {"data": stocks}, f"tickers-{cache['version']}")
+        stock_tickers_cache["version"] = cache["version"]
+    return stock_tickers_cache["payload"]
+
+
+def _cache_entries() -> dict:
+    if cache["stock_info"] is None:
+        return {}
+    return {"stock_info": (len(cache["stock_info"]), asyncio.get_event_loop().time() - cache["last_fetched"])}
+
+
+def _evict(key: str) -> bool:
+    if key != "stock_info" or cache["stock_info"] is None:
+        return False
+    cache.update(stock_info=None, last_fetched=None, version=None)
+    stock_tickers_cache.update(version=None, payload=None)
+    return True
+
+
+async def _refresh(key: str):
+    if key != "stock_info":
+        raise KeyError(key)
+    await fetch_nse_stock_info(force=True)
+
 
-# Start the cache refresh task
-asyncio.create_task(refresh_stock_info_cache())
+# The equity list, company logos included
+cache_registry.register("equity_list", _cache_entries, _evict, _refresh,
+                        warm=fetch_nse_stock_info)
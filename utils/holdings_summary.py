@@ -0,0 +1,138 @@
+import asyncio
+import json
+from sqlalchemy import delete
+from sqlalchemy.future import select
+import models
+import database
+from utils import lot_matching
+
+SUMMARY_FIELDS = ('total_quantity', 'bought_quantity', 'total_cost', 'lot_count')
+
+
+def position_summary(position: models.Position) -> dict:
+    """
+    Return the holdings summary figures of a lot-matched position.
+
+    Sold shares leave the cost at their average cost, so the cost is the average-cost
+    basis of the open quantity and the lots are the FIFO lots still open.
+    """
+    open_lots = json.loads(position.open_lots or "[]")
+    return {'total_quantity': position.quantity or 0,
+            'bought_quantity': sum(lot[1] for lot in open_lots),
+            'total_cost': position.avg_cost_basis or 0.0,
+            'lot_count': len(open_lots)}
+
+
+def _set_average_price(summary: models.HoldingsSummary):
+    summary.average_price = summary.total_cost / \
+        summary.bought_quantity if summary.bought_quantity else None
+
+
+async def apply_changes(db, positions: dict):
+    """
+    Bring the holdings summary rows of the positions touched by a trade change up to date.
+
+    Must run in the same transaction as the change, after lot_matching.sync_positions.
+    Each affected summary row is read once by primary key and overwritten with the
+    figures of its position; rows of positions that were closed are removed.
+
+    Args:
+        db (Session): The database session.
+        positions (dict): {(user_id, stock_ticker, trade_exchange): models.Position} as
+            returned by lot_matching.sync_positions.
+
+    Returns:
+        dict: {(user_id, stock_ticker, trade_exchange): (old total_quantity, new total_quantity)}
+        for every summary row the change adjusted.
+    """
+    quantities = {}
+    for key, position in positions.items():
+        values = position_summary(position)
+        summary = await db.get(models.HoldingsSummary, key, with_for_update=True)
+        if summary is None and values['total_quantity'] == 0:
+            continue
+        if summary is None:
+            summary = models.HoldingsSummary(user_id=key[0], stock_ticker=key[1], trade_exchange=key[2],
+                                             **dict.fromkeys(SUMMARY_FIELDS, 0))
+            db.add(summary)
+        quantities[key] = (summary.total_quantity or 0, values['total_quantity'])
+        if values['total_quantity'] == 0:
+            if summary in db.new:
+                db.expunge(summary)
+            else:
+                await db.delete(summary)
+            continue
+        for field, value in values.items():
+            setattr(summary, field, value)
+        _set_average_price(summary)
+    return quantities
+
+
+async def get_summary(db, user_id: int):
+    """
+    Read the open holdings summary rows of a user with portfolio-wide totals.
+
+    Returns:
+        dict: {"holdings": [...], "totals": {...}}
+    """
+    result = await db.execute(select(models.HoldingsSummary).where(
+        models.HoldingsSummary.user_id == user_id, models.HoldingsSummary.total_quantity > 0))
+    holdings = [{
+        'stock_ticker': summary.stock_ticker,
+        'trade_exchange': summary.trade_exchange,
+        'total_quantity': summary.total_quantity,
+        'total_cost': summary.total_cost,
+        'average_price': summary.average_price,
+        'lot_count': summary.lot_count,
+    } for summary in result.scalars().all()]
+    return {
+        'holdings': holdings,
+        'totals': {
+            'holdings': len(holdings),
+            'total_cost': sum(holding['total_cost'] for holding in holdings),
+            'lot_count': sum(holding['lot_count'] for holding in holdings),
+        },
+    }
+
+
+async def rebuild_summary(db, user_id: int = None) -> int:
+    """
+    Rebuild holdings summary rows from the open positions.
+
+    The positions must be current, see lot_matching.rebuild_positions.
+
+    Args:
+        db (Session): The database session.
+        user_id (int, optional): Only rebuild the rows of this user.
+
+    Returns:
+        int: The number of summary rows written.
+    """
+    query = select(models.Position).where(models.Position.quantity > 0)
+    clear = delete(models.HoldingsSummary)
+    if user_id is not None:
+        query = query.where(models.Position.user_id == user_id)
+        clear = clear.where(models.HoldingsSummary.user_id == user_id)
+
+    positions = (await db.execute(query)).scalars().all()
+    await db.execute(clear)
+    for position in positions:
+        summary = models.HoldingsSummary(
+            user_id=position.user_id, stock_ticker=position.stock_ticker,
+            trade_exchange=position.trade_exchange, **position_summary(position))
+        _set_average_price(summary)
+        db.add(summary)
+    await db.commit()
+    return len(positions)
+
+
+async def _rebuild_all():
+    async with database.async_session() as db:
+        await lot_matching.rebuild_positions(db)
+        count = await rebuild_summary(db)
+    print(f"Rebuilt {count} holdings summary rows")
+
+
+if __name__ == '__main__':
+    # Rebuild the positions and holdings summary from trade_entry: python -m utils.holdings_summary
+    asyncio.run(_rebuild_all())
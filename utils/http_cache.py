@@ -0,0 +1,115 @@
+import gzip
+import hashlib
+import json
+import math
+from fastapi import Request, Response, status
+
+# Brotli is optional; without it clients that accept gzip still get compressed bytes
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Payloads smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+
+def finite(content):
+    """
+    Return a copy of a JSON-like value with NaN and infinite floats replaced by None.
+    """
+    if isinstance(content, float):
+        return content if math.isfinite(content) else None
+    if isinstance(content, dict):
+        return {key: finite(value) for key, value in content.items()}
+    if isinstance(content, (list, tuple)):
+        return [finite(value) for value in content]
+    return content
+
+
+def encode(content) -> str:
+    """
+    Encode a value as compact JSON, with null for NaN and infinite floats, which JSON
+    cannot represent.
+    """
+    try:
+        return json.dumps(content, separators=(',', ':'), default=str, allow_nan=False)
+    except ValueError:
+        # Only payloads that actually hold a non-finite float pay for the copy
+        return json.dumps(finite(content), separators=(',', ':'), default=str, allow_nan=False)
+
+
+class EncodedPayload:
+    """
+    A JSON payload encoded and compressed once, served with a weak ETag.
+
+    Build one per data refresh and reuse it for every request, so the server never
+    re-serializes or re-compresses unchanged data. Without a version, the ETag is a
+    digest of the encoded body. The ETag is weak because the identity, gzip and br
+    representations share it while their bytes differ.
+    """
+    __slots__ = ("etag", "body", "gzip", "br")
+
+    def __init__(self, content, version: str = None):
+        self.body = encode(content).encode()
+        self.etag = f'W/"{version or hashlib.sha1(self.body).hexdigest()[:16]}"'
+        self.gzip = None
+        self.br = None
+        if len(self.body) >= MIN_COMPRESS_SIZE:
+            self.gzip = gzip.compress(self.body, compresslevel=6)
+            if brotli is not None:
+                self.br = brotli.compress(self.body)
+
+
+def accepted_encodings(request: Request) -> set:
+    """
+    Return the content codings the client accepts, ignoring those with q=0.
+    """
+    encodings = set()
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if coding:
+            encodings.add(coding.lower())
+    return encodings
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or opaque in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+
+def conditional_response(request: Request, payload: EncodedPayload, cache_control: str = "private, no-cache") -> Response:
+    """
+    Serve a pre-encoded payload, answering 304 Not Modified when the client's copy is current.
+
+    Args:
+        request (Request): The incoming request.
+        payload (EncodedPayload): The pre-encoded payload.
+        cache_control (str, optional): The Cache-Control header. Defaults to revalidating on every use.
+
+    Returns:
+        Response: A 304 response, or the brotli, gzip or identity encoded body.
+    """
+    headers = {"ETag": payload.etag, "Cache-Control": cache_control,
+               "Vary": "Accept-Encoding"}
+    if etag_matches(request, payload.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    encodings = accepted_encodings(request)
+    body = payload.body
+    if payload.br is not None and "br" in encodings:
+        body = payload.br
+        headers["Content-Encoding"] = "br"
+    elif payload.gzip is not None and ("gzip" in encodings or "*" in encodings):
+        body = payload.gzip
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,114 @@
+import asyncio
+import importlib.util
+from urllib.parse import urlsplit
+from utils import market_data, rate_governor
+
+# Connections kept open per upstream host; requests beyond this wait for a free connection
+MAX_CONNECTIONS_PER_HOST = 10
+# Seconds an idle keep-alive connection is kept before it is closed
+KEEPALIVE_EXPIRY = 60
+# Seconds to establish a connection, to wait for each read/write, and to wait for a free
+# pooled connection (generous, since bulk fetches such as logos queue on the pool)
+CONNECT_TIMEOUT = 5.0
+REQUEST_TIMEOUT = 10.0
+POOL_TIMEOUT = 60.0
+# Retries of a failed GET, with exponential backoff starting at RETRY_BACKOFF seconds
+RETRIES = 2
+RETRY_BACKOFF = 0.25
+# Statuses that are worth retrying; anything else is returned to the caller as is
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# HTTP/2 needs the optional h2 package; without it connections stay on HTTP/1.1
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# One pooled client per upstream (scheme, host), created on first use
+clients = {}
+
+
+def _retry_after(response) -> float:
+    # Seconds asked for by a Retry-After header in seconds form, 0 when absent or a date
+    try:
+        return max(float(response.headers.get("Retry-After", 0)), 0.0)
+    except ValueError:
+        return 0.0
+
+
+def _client_for(url: str):
+    # The pooled client of the URL's host, so each host gets its own connection limit
+    parts = urlsplit(url)
+    origin = (parts.scheme, parts.netloc)
+    client = clients.get(origin)
+    if client is None:
+        httpx = market_data.load("httpx")
+        client = httpx.AsyncClient(
+            http2=HTTP2,
+            follow_redirects=True,
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT, pool=POOL_TIMEOUT),
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS_PER_HOST,
+                                max_keepalive_connections=MAX_CONNECTIONS_PER_HOST,
+                                keepalive_expiry=KEEPALIVE_EXPIRY))
+        clients[origin] = client
+    return client
+
+
+async def get(url: str, retries: int = RETRIES, max_wait: float = rate_governor.MAX_WAIT, **kwargs):
+    """
+    Send a GET over the pooled, keep-alive client of the URL's host.
+
+    Every attempt passes the host's rate governor, which slows down on 429s and
+    failures and fails fast while the host's circuit is open. Connection errors,
+    timeouts and RETRY_STATUSES responses are retried with exponential backoff (or
+    after Retry-After); the last response is returned whatever its status.
+
+    Args:
+        url (str): The URL.
+        retries (int, optional): Retries after the first attempt. Defaults to RETRIES.
+        max_wait (float, optional): Seconds to queue for the governor, or None to wait as
+            long as needed. Defaults to rate_governor.MAX_WAIT.
+        **kwargs: Passed to httpx.AsyncClient.get, e.g. headers or params.
+
+    Raises:
+        httpx.TransportError: If the last attempt failed to connect or timed out.
+        rate_governor.UpstreamUnavailable: If the host's circuit is open or it is throttled
+            beyond max_wait.
+
+    Returns:
+        httpx.Response: The response.
+    """
+    client = _client_for(url)
+    upstream = rate_governor.governor(urlsplit(url).netloc)
+    transport_error = market_data.load("httpx").TransportError
+    for attempt in range(retries + 1):
+        await upstream.acquire(max_wait)
+        try:
+            response = await client.get(url, **kwargs)
+        except transport_error:
+            upstream.failed()
+            if attempt == retries:
+                raise
+        except BaseException:
+            upstream.abandoned()
+            raise
+        else:
+            if response.status_code == 429:
+                upstream.failed(throttled=True)
+                upstream.pause(_retry_after(response))
+            elif response.status_code >= 500:
+                upstream.failed()
+            else:
+                upstream.succeeded()
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+async def close():
+    """
+    Close every pooled client and its connections; called on application shutdown.
+    """
+    pooled = list(clients.values())
+    clients.clear()
+    for client in pooled:
+        try:
+            await client.aclose()
+        except Exception as e:
+            print(f"An error occurred while closing an HTTP client: {e}")
@@ -0,0 +1,384 @@
+import asyncio
+import operator
+import os
+import re
+from collections import deque
+from datetime import date, timedelta
+import math
+import numpy as np
+from sqlalchemy import tuple_
+from sqlalchemy.future import select
+import models
+import database
+from utils import fetch_stock_info, price_history
+
+# Indicator periods
+SMA_PERIODS = (20, 50)
+EMA_FAST = 12
+EMA_SLOW = 26
+MACD_SIGNAL = 9
+RSI_PERIOD = 14
+BOLLINGER_PERIOD = 20
+BOLLINGER_WIDTH = 2
+# Calendar days of history loaded for a symbol seen for the first time, so the
+# exponential indicators have converged by the latest bar
+WARMUP_DAYS = 300
+# Seconds between background refreshes of the NSE equity list's indicators; 0 disables
+# the loop. Closes are synced at most once a day per symbol, so only the first refresh
+# of each day downloads history
+UNIVERSE_REFRESH_INTERVAL = int(os.getenv("INDICATOR_UNIVERSE_REFRESH_INTERVAL", "3600"))
+
+# Indicator values kept per symbol, in the column order of the screening arrays
+FIELDS = ('close', 'sma_20', 'sma_50', 'ema_12', 'ema_26', 'macd', 'macd_signal',
+          'macd_histogram', 'rsi', 'bollinger_upper', 'bollinger_middle', 'bollinger_lower')
+
+# Comparison operators accepted by screen conditions such as "rsi<30" or "close>sma_50"
+OPERATORS = {'<=': operator.le, '>=': operator.ge,
+             '<': operator.lt, '>': operator.gt, '=': operator.eq}
+CONDITION = re.compile(r'^\s*(\w+)\s*(<=|>=|<|>|=)\s*([\w.+-]+)\s*$')
+
+
+class _RollingMean:
+    """
+    Mean (and optionally standard deviation) of the last `period` values in O(1) per value.
+    """
+    __slots__ = ("period", "window", "total", "total_squares")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.total_squares = 0.0
+
+    def push(self, value: float):
+        if len(self.window) == self.period:
+            leaving = self.window[0]
+            self.total -= leaving
+            self.total_squares -= leaving * leaving
+        self.window.append(value)
+        self.total += value
+        self.total_squares += value * value
+
+    def mean(self):
+        return self.total / self.period if len(self.window) == self.period else None
+
+    def std(self):
+        if len(self.window) < self.period:
+            return None
+        mean = self.total / self.period
+        return math.sqrt(max(self.total_squares / self.period - mean * mean, 0.0))
+
+
+class _Ema:
+    """
+    Exponential moving average seeded with the first value (pandas ewm(adjust=False)).
+
+    Reports a value once `period` values have been seen.
+    """
+    __slots__ = ("period", "alpha", "value", "count")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.value = None
+        self.count = 0
+
+    def push(self, value: float):
+        self.value = value if self.value is None else self.value + \
+            self.alpha * (value - self.value)
+        self.count += 1
+
+    def current(self):
+        return self.value if self.count >= self.period else None
+
+
+class IndicatorState:
+    """
+    Rolling indicator state of one symbol.
+
+    Every new bar updates SMA, EMA, MACD, RSI (Wilder smoothing) and Bollinger bands
+    in constant time, so bars are never replayed once they have been applied.
+    """
+    __slots__ = ("last_date", "close", "sma", "bollinger", "ema_fast", "ema_slow",
+                 "signal", "rsi_count", "avg_gain", "avg_loss")
+
+    def __init__(self):
+        self.last_date = None
+        self.close = None
+        self.sma = {period: _RollingMean(period) for period in SMA_PERIODS}
+        self.bollinger = self.sma.get(
+            BOLLINGER_PERIOD) or _RollingMean(BOLLINGER_PERIOD)
+        self.ema_fast = _Ema(EMA_FAST)
+        self.ema_slow = _Ema(EMA_SLOW)
+        self.signal = _Ema(MACD_SIGNAL)
+        self.rsi_count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def update(self, bar_date, close: float):
+        """
+        Apply one bar. Bars on or before the last applied bar are ignored.
+        """
+        if self.last_date is not None and bar_date <= self.last_date:
+            return
+        if self.close is not None:
+            change = close - self.close
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            self.rsi_count += 1
+            if self.rsi_count <= RSI_PERIOD:
+                # Seed with the simple average of the first RSI_PERIOD changes
+                self.avg_gain += gain / RSI_PERIOD
+                self.avg_loss += loss / RSI_PERIOD
+            else:
+                self.avg_gain += (gain - self.avg_gain) / RSI_PERIOD
+                self.avg_loss += (loss - self.avg_loss) / RSI_PERIOD
+
+        for mean in self.sma.values():
+            mean.push(close)
+        if BOLLINGER_PERIOD not in self.sma:
+            self.bollinger.push(close)
+        self.ema_fast.push(close)
+        self.ema_slow.push(close)
+        if self.ema_slow.current() is not None:
+            self.signal.push(self.ema_fast.value - self.ema_slow.value)
+        self.close = close
+        self.last_date = bar_date
+
+    def rsi(self):
+        if self.rsi_count < RSI_PERIOD:
+            return None
+        if self.avg_loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
+    def values(self) -> dict:
+        """
+        Return the current value of every indicator, None while it is warming up.
+        """
+        ema_fast, ema_slow = self.ema_fast.current(), self.ema_slow.current()
+        macd = ema_fast - ema_slow if ema_fast is not None and ema_slow is not None else None
+        signal = self.signal.current()
+        middle, std = self.bollinger.mean(), self.bollinger.std()
+        values = {'close': self.close, 'ema_12': ema_fast, 'ema_26': ema_slow, 'macd': macd,
+                  'macd_signal': signal,
+                  'macd_histogram': macd - signal if macd is not None and signal is not None else None,
+                  'rsi': self.rsi(), 'bollinger_middle': middle,
+                  'bollinger_upper': middle + BOLLINGER_WIDTH * std if middle is not None else None,
+                  'bollinger_lower': middle - BOLLINGER_WIDTH * std if middle is not None else None}
+        for period, mean in self.sma.items():
+            values[f'sma_{period}'] = mean.mean()
+        return values
+
+
+class IndicatorTable:
+    """
+    Latest indicator values of every tracked symbol as one (symbols x FIELDS) array.
+
+    Rows are written whenever a symbol's state advances, so a cross-symbol screen is
+    a handful of vectorized comparisons over the whole table.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.keys = []
+        self.rows = {}
+        self.values = np.full((capacity, len(FIELDS)), np.nan)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def write(self, key, state: IndicatorState):
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = len(self.keys)
+            self.keys.append(key)
+            if row == len(self.values):
+                self.values = np.vstack(
+                    [self.values, np.full(self.values.shape, np.nan)])
+        values = state.values()
+        self.values[row] = [np.nan if values[field]
+                            is None else values[field] for field in FIELDS]
+
+    def screen(self, conditions, keys=None) -> list:
+        """
+        Return the symbols whose latest indicators satisfy every condition.
+
+        Args:
+            conditions (List[tuple]): (field, operator, field name or number) conditions.
+            keys (Iterable[tuple], optional): Only consider these (stock_ticker, exchange) pairs.
+
+        Returns:
+            List[int]: The matching rows.
+        """
+        count = len(self.keys)
+        values = self.values[:count]
+        mask = np.ones(count, dtype=bool)
+        if keys is not None:
+            mask[:] = False
+            mask[[self.rows[key] for key in keys if key in self.rows]] = True
+        for field, compare, operand in conditions:
+            right = values[:, FIELDS.index(operand)] if isinstance(
+                operand, str) else operand
+            with np.errstate(invalid='ignore'):
+                mask &= compare(values[:, FIELDS.index(field)], right)
+        return np.flatnonzero(mask).tolist()
+
+
+# Rolling state per (stock_ticker, trade_exchange) and the screening table built from it
+states = {}
+table = IndicatorTable()
+# The NSE equity list screened by scope "all" and the date its indicators were last
+# refreshed, None until the first refresh completes
+universe = {"keys": [], "as_of": None}
+
+
+def parse_condition(condition: str) -> tuple:
+    """
+    Parse a screen condition such as "rsi<30" or "close>sma_50".
+
+    Raises:
+        ValueError: If the condition is malformed or names an unknown field.
+    """
+    match = CONDITION.match(condition)
+    if not match:
+        raise ValueError(f"Invalid condition '{condition}'")
+    field, symbol, operand = match.groups()
+    if field not in FIELDS:
+        raise ValueError(f"Unknown indicator '{field}'")
+    if operand not in FIELDS:
+        try:
+            operand = float(operand)
+        except ValueError:
+            raise ValueError(f"Unknown indicator '{operand}'") from None
+    return field, OPERATORS[symbol], operand
+
+
+async def update_states(db, keys) -> int:
+    """
+    Apply every stored daily close newer than each symbol's state, with one query.
+
+    Symbols seen for the first time are warmed up from WARMUP_DAYS of history.
+
+    Args:
+        db (Session): The database session.
+        keys (Iterable[tuple]): The (stock_ticker, trade_exchange) pairs to bring up to date.
+
+    Returns:
+        int: The number of bars applied.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return 0
+    warmup_start = date.today() - timedelta(days=WARMUP_DAYS)
+    since = min(states[key].last_date + timedelta(days=1) if key in states and states[key].last_date
+                else warmup_start for key in keys)
+
+    result = await db.execute(select(
+        models.DailyClose.stock_ticker, models.DailyClose.trade_exchange,
+        models.DailyClose.close_date, models.DailyClose.close
+    ).where(tuple_(models.DailyClose.stock_ticker, models.DailyClose.trade_exchange).in_(keys),
+            models.DailyClose.close_date >= since
+            ).order_by(models.DailyClose.close_date))
+
+    applied = 0
+    touched = set()
+    for stock_ticker, exchange, close_date, close in result:
+        key = (stock_ticker, exchange)
+        state = states.get(key)
+        if state is None:
+            state = states[key] = IndicatorState()
+        if close is None or (state.last_date is not None and close_date <= state.last_date):
+            continue
+        state.update(close_date, close)
+        touched.add(key)
+        applied += 1
+    for key in touched:
+        table.write(key, states[key])
+    return applied
+
+
+async def refresh(db, keys):
+    """
+    Sync stored daily closes from upstream and bring the indicators of keys up to date.
+    """
+    keys = list(dict.fromkeys(keys))
+    today = date.today()
+    await price_history.sync_closes(db, keys, today - timedelta(days=WARMUP_DAYS), today)
+    await update_states(db, keys)
+
+
+async def refresh_universe() -> int:
+    """
+    Bring the indicators of every NSE listed equity up to date.
+
+    Runs in the background, so screening the whole universe never syncs closes or
+    replays bars on the request path.
+
+    Returns:
+        int: The number of symbols in the universe.
+    """
+    stock_info = await fetch_stock_info.fetch_nse_stock_info()
+    keys = [(symbol, "NSE") for symbol in stock_info.column("SYMBOL")]
+    async with database.async_session() as db:
+        await refresh(db, keys)
+    universe["keys"] = keys
+    universe["as_of"] = date.today()
+    return len(keys)
+
+
+async def refresh_universe_loop(interval: int = UNIVERSE_REFRESH_INTERVAL):
+    """
+    Keep the indicators of the NSE equity list current for universe screens.
+    """
+    while True:
+        try:
+            count = await refresh_universe()
+            print(f"Refreshed the indicators of {count} NSE equities")
+        except Exception as e:
+            print(f"An error occurred while refreshing the indicators of the NSE equity list: {e}")
+        await asyncio.sleep(interval)
+
+
+def latest(key) -> dict:
+    """
+    Return the latest indicator values of a symbol, or None if it has no bars.
+    """
+    state = states.get(key)
+    if state is None or state.last_date is None:
+        return None
+    return {'as_of': state.last_date.isoformat(), **state.values()}
+
+
+async def series(db, key, points: int) -> list:
+    """
+    Return the indicators of the last `points` stored bars of a symbol.
+
+    The bars are replayed through a fresh state from WARMUP_DAYS before the first
+    returned bar; the shared state is left untouched.
+    """
+    result = await db.execute(select(models.DailyClose.close_date, models.DailyClose.close).where(
+        models.DailyClose.stock_ticker == key[0], models.DailyClose.trade_exchange == key[1],
+        models.DailyClose.close_date >= date.today() - timedelta(days=WARMUP_DAYS + points * 7 // 5)
+    ).order_by(models.DailyClose.close_date))
+    state = IndicatorState()
+    rows = deque(maxlen=points)
+    for bar_date, close in result:
+        if close is None:
+            continue
+        state.update(bar_date, close)
+        rows.append({'date': bar_date.isoformat(), **state.values()})
+    return list(rows)
+
+
+def screen(conditions, keys=None) -> list:
+    """
+    Screen the tracked symbols with parsed conditions.
+
+    Returns:
+        List[dict]: The matching symbols with their latest indicator values.
+    """
+    matches = []
+    for row in table.screen(conditions, keys):
+        key = table.keys[row]
+        matches.append({'stock_ticker': key[0], 'trade_exchange': key[1],
+                        **latest(key)})
+    return matches
@@ -0,0 +1,132 @@
+import time
+import numpy as np
+
+# Ticks kept per symbol; older ticks are overwritten
+RING_SIZE = 2048
+
+# Tick rings per (stock_ticker, exchange)
+rings = {}
+
+
+class TickRing:
+    """
+    A fixed-size ring of (timestamp, price) ticks stored in two preallocated arrays.
+
+    Timestamps are epoch milliseconds (int64) and prices float64, so a full ring of
+    one symbol takes 32 KB and recording a tick never allocates.
+    """
+    __slots__ = ("timestamps", "prices", "start", "count")
+
+    def __init__(self, size: int = RING_SIZE):
+        self.timestamps = np.zeros(size, dtype=np.int64)
+        self.prices = np.zeros(size, dtype=np.float64)
+        self.start = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp: int, price: float):
+        """
+        Record a tick, ignoring ticks that are not newer than the last one.
+        """
+        size = len(self.prices)
+        if self.count:
+            last = (self.start + self.count - 1) % size
+            if timestamp <= self.timestamps[last]:
+                return
+        if self.count < size:
+            index = (self.start + self.count) % size
+            self.count += 1
+        else:
+            index = self.start
+            self.start = (self.start + 1) % size
+        self.timestamps[index] = timestamp
+        self.prices[index] = price
+
+    def series(self, since: int = None):
+        """
+        Return (timestamps, prices) in time order, optionally only ticks at or after `since`.
+        """
+        order = (self.start + np.arange(self.count)) % len(self.prices)
+        timestamps, prices = self.timestamps[order], self.prices[order]
+        if since is not None:
+            first = np.searchsorted(timestamps, since, side='left')
+            timestamps, prices = timestamps[first:], prices[first:]
+        return timestamps, prices
+
+
+def record(stock_ticker: str, exchange: str, price: float, timestamp: int = None):
+    """
+    Record an observed price of a symbol.
+
+    Args:
+        stock_ticker (str): The stock ticker.
+        exchange (str): The exchange.
+        price (float): The observed price.
+        timestamp (int, optional): Epoch milliseconds. Defaults to now.
+    """
+    if price is None:
+        return
+    key = (stock_ticker.upper(), (exchange or "NSE").upper())
+    ring = rings.get(key)
+    if ring is None:
+        ring = rings[key] = TickRing()
+    ring.append(int(time.time() * 1000) if timestamp is None else timestamp, price)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int):
+    """
+    Downsample a series with Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last points and, from each of threshold - 2 equal buckets,
+    the point forming the largest triangle with the previously kept point and the
+    mean of the next bucket, which preserves the visual shape of the line.
+
+    Args:
+        x (np.ndarray): Ascending x values.
+        y (np.ndarray): The y values.
+        threshold (int): The number of points to keep.
+
+    Returns:
+        tuple: The downsampled (x, y) arrays.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    xf = x.astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        mean_x = xf[end:next_end].mean()
+        mean_y = y[end:next_end].mean()
+        areas = np.abs((xf[previous] - mean_x) * (y[start:end] - y[previous]) -
+                       (xf[previous] - xf[start:end]) * (mean_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return x[kept], y[kept]
+
+
+def sparkline(stock_ticker: str, exchange: str = "NSE", points: int = 100, since: int = None) -> dict:
+    """
+    Return the recorded intraday series of a symbol downsampled to at most `points` points.
+
+    Args:
+        stock_ticker (str): The stock ticker.
+        exchange (str, optional): The exchange. Defaults to "NSE".
+        points (int, optional): The maximum number of points. Defaults to 100.
+        since (int, optional): Only ticks at or after these epoch milliseconds.
+
+    Returns:
+        dict: Columnar "t" (epoch milliseconds) and "p" (price) lists.
+    """
+    ring = rings.get((stock_ticker.upper(), (exchange or "NSE").upper()))
+    if ring is None:
+        return {'t': [], 'p': []}
+    timestamps, prices = lttb(*ring.series(since), points)
+    return {'t': timestamps.tolist(), 'p': np.round(prices, 2).tolist()}
@@ -0,0 +1,247 @@
+import asyncio
+import heapq
+import time
+from datetime import date, timedelta
+from sqlalchemy import case, delete, func
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.future import select
+import models
+import database
+
+# Seconds for the activity of a ticker to halve when nobody trades it (7 days)
+ACTIVITY_HALF_LIFE = 7 * 24 * 60 * 60
+# Seconds the in-memory counters are served before they are reloaded from ticker_stats,
+# which picks up the changes committed by other workers
+RELOAD_INTERVAL = 60
+# Rankings: name -> the counters a ticker is ordered by, highest first
+RANKINGS = {
+    'holders': ('holder_count', 'held_quantity'),
+    'quantity': ('held_quantity', 'holder_count'),
+    'activity': ('activity', 'trade_count'),
+}
+STAT_FIELDS = ('holder_count', 'held_quantity', 'trade_count', 'activity', 'activity_at')
+COUNTER_FIELDS = ('holder_count', 'held_quantity', 'trade_count', 'activity')
+
+# In-memory mirror of ticker_stats: (stock_ticker, trade_exchange) -> (holder_count,
+# held_quantity, trade_count, activity, activity_at)
+stats = {}
+# Monotonic time stats was last loaded from ticker_stats
+state = {"loaded_at": None}
+
+
+def decayed_activity(activity: float, activity_at: float, now: float) -> float:
+    """
+    Return the activity of a ticker decayed from activity_at to now.
+    """
+    if not activity or activity_at is None:
+        return 0.0
+    return activity * 2 ** (-max(now - activity_at, 0.0) / ACTIVITY_HALF_LIFE)
+
+
+def _row_values(row: models.TickerStats) -> tuple:
+    return tuple(getattr(row, field) for field in STAT_FIELDS)
+
+
+def _increment_statement(dialect: str, key: tuple, counters: dict, now: float):
+    # INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT DO UPDATE on SQLite) adding the
+    # counters to the row, so concurrent first trades in a ticker never race to insert it.
+    # The stored activity is decayed to now before the new trades are added, so it stays
+    # a small count however long the ticker has been traded
+    module = mysql if dialect == "mysql" else sqlite
+    statement = module.insert(models.TickerStats).values(
+        stock_ticker=key[0], trade_exchange=key[1], activity_at=now, **counters)
+    new_values = statement.inserted if dialect == "mysql" else statement.excluded
+    table = models.TickerStats
+    elapsed = new_values.activity_at - func.coalesce(table.activity_at, new_values.activity_at)
+    # MySQL assigns in order and later assignments see the new values, so activity_at comes last
+    increments = [(field, func.coalesce(getattr(table, field), 0) + getattr(new_values, field))
+                  for field in ('holder_count', 'held_quantity', 'trade_count')]
+    increments.append(('activity', func.coalesce(table.activity, 0) * func.pow(2, -elapsed / ACTIVITY_HALF_LIFE)
+                       + new_values.activity))
+    increments.append(('activity_at', new_values.activity_at))
+    if dialect == "mysql":
+        return statement.on_duplicate_key_update(increments)
+    increments = dict(increments)
+    return statement.on_conflict_do_update(
+        index_elements=[models.TickerStats.stock_ticker, models.TickerStats.trade_exchange], set_=increments)
+
+
+async def apply_changes(db, holdings: dict, old_trades, new_trades) -> dict:
+    """
+    Add the counter deltas of a trade change to ticker_stats.
+
+    Must run in the same transaction as the change, after holdings_summary.apply_changes.
+    A user becomes a holder of a ticker when their net quantity turns positive and stops
+    being one when it drops back to zero; each newly created trade adds its weight to the
+    ticker's activity. Rows are upserted with relative increments instead of being read
+    first, in ticker order so concurrent transactions lock them in the same order.
+
+    Args:
+        db (Session): The database session.
+        holdings (dict): {(user_id, stock_ticker, trade_exchange): (old quantity, new quantity)}
+            as returned by holdings_summary.apply_changes.
+        old_trades (List[dict]): The trades as they were before the change.
+        new_trades (List[dict]): The trades as they are after the change.
+
+    Returns:
+        dict: {(stock_ticker, trade_exchange): counter deltas and the activity_at they were
+        applied at}, to be passed to apply_committed once the transaction commits.
+    """
+    deltas = {}
+
+    def delta(key):
+        return deltas.setdefault(key, dict.fromkeys(COUNTER_FIELDS, 0))
+
+    for (user_id, stock_ticker, exchange), (old_quantity, new_quantity) in holdings.items():
+        counters = delta((stock_ticker, exchange))
+        counters['holder_count'] += (new_quantity > 0) - (old_quantity > 0)
+        counters['held_quantity'] += max(new_quantity, 0) - max(old_quantity, 0)
+    old_ids = {trade['trade_id'] for trade in old_trades}
+    for sign, trades in ((-1, old_trades), (1, new_trades)):
+        for trade in trades:
+            delta((trade['stock_ticker'], trade['trade_exchange']))['trade_count'] += sign
+    for trade in new_trades:
+        if trade['trade_id'] not in old_ids:
+            delta((trade['stock_ticker'], trade['trade_exchange']))['activity'] += 1
+
+    dialect = db.bind.dialect.name
+    now = time.time()
+    committed = {}
+    for key in sorted(deltas):
+        counters = deltas[key]
+        if not any(counters.values()):
+            continue
+        await db.execute(_increment_statement(dialect, key, counters, now))
+        if counters['holder_count'] < 0 or counters['trade_count'] < 0:
+            await db.execute(delete(models.TickerStats).where(
+                models.TickerStats.stock_ticker == key[0], models.TickerStats.trade_exchange == key[1],
+                models.TickerStats.holder_count <= 0, models.TickerStats.trade_count <= 0))
+        committed[key] = {**counters, 'activity_at': now}
+    return committed
+
+
+def apply_committed(committed: dict):
+    """
+    Add the counter deltas of a committed trade change to the in-memory counters.
+    """
+    for key, counters in committed.items():
+        now = counters['activity_at']
+        holders, quantity, trades, activity, activity_at = stats.get(key, (0, 0, 0, 0.0, now))
+        row = (holders + counters['holder_count'], quantity + counters['held_quantity'],
+               trades + counters['trade_count'],
+               decayed_activity(activity, activity_at, now) + counters['activity'], now)
+        if row[0] <= 0 and row[2] <= 0:
+            stats.pop(key, None)
+        else:
+            stats[key] = row
+
+
+async def load(db, backfill: bool = False) -> int:
+    """
+    Load the in-memory counters from ticker_stats.
+
+    Args:
+        db (Session): The database session.
+        backfill (bool, optional): Rebuild the table from trade entries when it is found
+            empty while trades exist (e.g. right after the table was added). Only for
+            startup; request paths never aggregate trade entries. Defaults to False.
+
+    Returns:
+        int: The number of tickers loaded.
+    """
+    rows = (await db.execute(select(models.TickerStats))).scalars().all()
+    if backfill and not rows and \
+            (await db.execute(select(models.TradeEntry.trade_id).limit(1))).first() is not None:
+        return await rebuild_stats(db)
+    stats.clear()
+    for row in rows:
+        stats[(row.stock_ticker, row.trade_exchange)] = _row_values(row)
+    state["loaded_at"] = time.monotonic()
+    return len(stats)
+
+
+async def rebuild_stats(db) -> int:
+    """
+    Rebuild ticker_stats from the holdings summary and trade entries with aggregate queries.
+
+    Only for backfills and repairs; request paths use the incrementally maintained rows.
+    The activity is seeded with the trades entered in the last half-life.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        int: The number of ticker rows written.
+    """
+    held = await db.execute(select(
+        models.HoldingsSummary.stock_ticker, models.HoldingsSummary.trade_exchange,
+        func.count(), func.sum(models.HoldingsSummary.total_quantity)
+    ).where(models.HoldingsSummary.total_quantity > 0).group_by(
+        models.HoldingsSummary.stock_ticker, models.HoldingsSummary.trade_exchange))
+    recent = date.today() - timedelta(seconds=ACTIVITY_HALF_LIFE)
+    traded = await db.execute(select(
+        models.TradeEntry.stock_ticker, models.TradeEntry.trade_exchange, func.count(),
+        func.sum(case((models.TradeEntry.trade_entry_date >= recent, 1), else_=0))
+    ).group_by(models.TradeEntry.stock_ticker, models.TradeEntry.trade_exchange))
+
+    now = time.time()
+    rows = {}
+    for stock_ticker, exchange, holders, quantity in held:
+        rows[(stock_ticker, exchange)] = [holders, quantity or 0, 0, 0.0]
+    for stock_ticker, exchange, trades, recent_trades in traded:
+        row = rows.setdefault((stock_ticker, exchange), [0, 0, 0, 0.0])
+        row[2], row[3] = trades, float(recent_trades or 0)
+
+    await db.execute(delete(models.TickerStats))
+    for (stock_ticker, exchange), (holders, quantity, trades, activity) in rows.items():
+        db.add(models.TickerStats(stock_ticker=stock_ticker, trade_exchange=exchange, holder_count=holders,
+                                  held_quantity=quantity, trade_count=trades, activity=activity,
+                                  activity_at=now))
+    await db.commit()
+
+    stats.clear()
+    for key, (holders, quantity, trades, activity) in rows.items():
+        stats[key] = (holders, quantity, trades, activity, now)
+    state["loaded_at"] = time.monotonic()
+    return len(rows)
+
+
+async def top(db, rank_by: str = 'holders', limit: int = 20) -> list:
+    """
+    Rank tickers across the platform from the in-memory counters.
+
+    Args:
+        db (Session): The database session, used only to reload the counters when they are due.
+        rank_by (str, optional): One of RANKINGS. Defaults to 'holders'.
+        limit (int, optional): The number of tickers to return. Defaults to 20.
+
+    Raises:
+        KeyError: If rank_by is not one of RANKINGS.
+
+    Returns:
+        List[dict]: The top tickers with their counters, highest first.
+    """
+    fields = RANKINGS[rank_by]
+    if state["loaded_at"] is None or time.monotonic() - state["loaded_at"] >= RELOAD_INTERVAL:
+        await load(db)
+
+    now = time.time()
+    rows = []
+    for (stock_ticker, exchange), (holders, quantity, trades, activity, activity_at) in stats.items():
+        rows.append({'stock_ticker': stock_ticker, 'trade_exchange': exchange, 'holder_count': holders,
+                     'held_quantity': quantity, 'trade_count': trades,
+                     'activity': round(decayed_activity(activity, activity_at, now), 4)})
+    ranked = heapq.nlargest(limit, (row for row in rows if row[fields[0]] > 0),
+                            key=lambda row: tuple(row[field] for field in fields))
+    return [{'rank': rank, **row} for rank, row in enumerate(ranked, start=1)]
+
+
+async def _rebuild_all():
+    async with database.async_session() as db:
+        count = await rebuild_stats(db)
+    print(f"Rebuilt {count} ticker stats rows")
+
+
+if __name__ == '__main__':
+    # Rebuild the leaderboard counters: python -m utils.leaderboard
+    asyncio.run(_rebuild_all())
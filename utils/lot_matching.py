@@ -0,0 +1,293 @@
+import asyncio
+import json
+from collections import deque
+from sqlalchemy.future import select
+import models
+import database
+
+BUY = "BUY"
+SELL = "SELL"
+TRADE_SIDES = (BUY, SELL)
+
+FIFO = "FIFO"
+AVERAGE = "AVERAGE"
+COST_METHODS = (FIFO, AVERAGE)
+
+
+class LotMatchingError(ValueError):
+    """
+    Raised when a trade cannot be matched, e.g. a sell larger than the open quantity.
+    """
+
+
+def position_key(trade) -> tuple:
+    """
+    Return the (user_id, stock_ticker, trade_exchange) key a trade dictionary belongs to.
+    """
+    return (trade['user_id'], trade['stock_ticker'], trade['trade_exchange'])
+
+
+def _trade_order(trade) -> tuple:
+    # Trades are matched in entry-date order, ties broken by insertion order
+    return (trade['trade_entry_date'], trade['trade_id'])
+
+
+class PositionState:
+    """
+    Lot-matching state of one position.
+
+    FIFO keeps a queue of open [trade_id, quantity, price] lots and consumes the
+    oldest lots first on each sell. Average cost keeps the open quantity at the
+    running average price. Both are updated in O(1) amortised per trade.
+    """
+    __slots__ = ("quantity", "open_lots", "fifo_cost_basis", "fifo_realized_pnl",
+                 "avg_cost_basis", "avg_realized_pnl", "last_trade_date", "last_trade_id")
+
+    def __init__(self):
+        self.quantity = 0
+        self.open_lots = deque()
+        self.fifo_cost_basis = 0.0
+        self.fifo_realized_pnl = 0.0
+        self.avg_cost_basis = 0.0
+        self.avg_realized_pnl = 0.0
+        self.last_trade_date = None
+        self.last_trade_id = None
+
+    @classmethod
+    def from_position(cls, position: models.Position):
+        state = cls()
+        state.quantity = position.quantity or 0
+        state.open_lots = deque(json.loads(position.open_lots or "[]"))
+        state.fifo_cost_basis = position.fifo_cost_basis or 0.0
+        state.fifo_realized_pnl = position.fifo_realized_pnl or 0.0
+        state.avg_cost_basis = position.avg_cost_basis or 0.0
+        state.avg_realized_pnl = position.avg_realized_pnl or 0.0
+        state.last_trade_date = position.last_trade_date
+        state.last_trade_id = position.last_trade_id
+        return state
+
+    def follows(self, trade) -> bool:
+        """
+        Check whether a trade sorts after every trade already applied.
+        """
+        return self.last_trade_id is None or \
+            _trade_order(trade) > (self.last_trade_date, self.last_trade_id)
+
+    def apply(self, trade):
+        """
+        Apply a trade dictionary to the position.
+
+        Raises:
+            LotMatchingError: If the trade side is unknown or a sell exceeds the open quantity.
+        """
+        side = (trade.get('trade_side') or BUY).upper()
+        quantity = trade['quantity'] or 0
+        price = trade['price_per_stock'] or 0.0
+
+        if side == BUY:
+            self.open_lots.append([trade['trade_id'], quantity, price])
+            self.fifo_cost_basis += quantity * price
+            self.avg_cost_basis += quantity * price
+            self.quantity += quantity
+        elif side == SELL:
+            if quantity > self.quantity:
+                raise LotMatchingError(
+                    f"Cannot sell {quantity} {trade['stock_ticker']} on {trade['trade_entry_date']}: "
+                    f"only {self.quantity} held")
+            # Average cost: realise against the running average price
+            average_price = self.avg_cost_basis / self.quantity if self.quantity else 0.0
+            self.avg_realized_pnl += quantity * (price - average_price)
+            self.avg_cost_basis -= quantity * average_price
+            # FIFO: consume the oldest open lots first
+            remaining = quantity
+            while remaining:
+                lot = self.open_lots[0]
+                matched = min(remaining, lot[1])
+                self.fifo_realized_pnl += matched * (price - lot[2])
+                self.fifo_cost_basis -= matched * lot[2]
+                lot[1] -= matched
+                remaining -= matched
+                if lot[1] == 0:
+                    self.open_lots.popleft()
+            self.quantity -= quantity
+            if self.quantity == 0:
+                # Clear floating-point residue once the position is flat
+                self.fifo_cost_basis = 0.0
+                self.avg_cost_basis = 0.0
+        else:
+            raise LotMatchingError(f"Unknown trade side '{side}'")
+
+        self.last_trade_date = trade['trade_entry_date']
+        self.last_trade_id = trade['trade_id']
+
+    def write_to(self, position: models.Position):
+        position.quantity = self.quantity
+        position.open_lots = json.dumps(list(self.open_lots))
+        position.fifo_cost_basis = self.fifo_cost_basis
+        position.fifo_realized_pnl = self.fifo_realized_pnl
+        position.avg_cost_basis = self.avg_cost_basis
+        position.avg_realized_pnl = self.avg_realized_pnl
+        position.last_trade_date = self.last_trade_date
+        position.last_trade_id = self.last_trade_id
+
+
+def match_trades(trades) -> PositionState:
+    """
+    Replay trade dictionaries of one position in entry-date order.
+
+    Returns:
+        PositionState: The resulting position state.
+    """
+    state = PositionState()
+    for trade in sorted(trades, key=_trade_order):
+        state.apply(trade)
+    return state
+
+
+async def _load_position(db, key) -> models.Position:
+    user_id, stock_ticker, trade_exchange = key
+    result = await db.execute(select(models.Position).where(
+        models.Position.user_id == user_id,
+        models.Position.stock_ticker == stock_ticker,
+        models.Position.trade_exchange == trade_exchange))
+    return result.scalars().first()
+
+
+async def _replay_position(db, key) -> PositionState:
+    user_id, stock_ticker, trade_exchange = key
+    result = await db.execute(select(
+        models.TradeEntry.trade_id, models.TradeEntry.user_id, models.TradeEntry.stock_ticker,
+        models.TradeEntry.trade_exchange, models.TradeEntry.trade_entry_date,
+        models.TradeEntry.quantity, models.TradeEntry.price_per_stock, models.TradeEntry.trade_side
+    ).where(
+        models.TradeEntry.user_id == user_id,
+        models.TradeEntry.stock_ticker == stock_ticker,
+        models.TradeEntry.trade_exchange == trade_exchange))
+    return match_trades([row._asdict() for row in result])
+
+
+async def sync_positions(db, old_trades, new_trades):
+    """
+    Bring the positions touched by a trade change up to date.
+
+    Must run in the same transaction as the change, after it has been flushed. A new
+    trade that sorts after everything already applied to its position is applied
+    incrementally; any other change replays the trades of the affected position only.
+
+    Args:
+        db (Session): The database session.
+        old_trades (List[dict]): The trades as they were before the change.
+        new_trades (List[dict]): The trades as they are after the change.
+
+    Raises:
+        LotMatchingError: If the change leaves a position with an unmatched sell.
+
+    Returns:
+        dict: {(user_id, stock_ticker, trade_exchange): models.Position} for every position
+        the change touched, as written.
+    """
+    old_keys = {position_key(trade) for trade in old_trades}
+    new_by_key = {}
+    for trade in new_trades:
+        new_by_key.setdefault(position_key(trade), []).append(trade)
+
+    positions = {}
+    for key in old_keys | set(new_by_key):
+        position = await _load_position(db, key)
+        appended = new_by_key.get(key, []) if key not in old_keys else []
+
+        if position is not None and appended and \
+                all(trade['trade_id'] != position.last_trade_id for trade in appended):
+            state = PositionState.from_position(position)
+            appended.sort(key=_trade_order)
+            if state.follows(appended[0]):
+                for trade in appended:
+                    state.apply(trade)
+            else:
+                state = await _replay_position(db, key)
+        else:
+            state = await _replay_position(db, key)
+
+        if position is None:
+            position = models.Position(
+                user_id=key[0], stock_ticker=key[1], trade_exchange=key[2])
+            db.add(position)
+        state.write_to(position)
+        positions[key] = position
+    return positions
+
+
+async def rebuild_positions(db, user_id: int = None) -> int:
+    """
+    Rebuild positions from scratch by replaying every trade.
+
+    Args:
+        db (Session): The database session.
+        user_id (int, optional): Only rebuild the positions of this user.
+
+    Returns:
+        int: The number of positions written.
+    """
+    query = select(models.TradeEntry.trade_id, models.TradeEntry.user_id, models.TradeEntry.stock_ticker,
+                   models.TradeEntry.trade_exchange, models.TradeEntry.trade_entry_date,
+                   models.TradeEntry.quantity, models.TradeEntry.price_per_stock,
+                   models.TradeEntry.trade_side)
+    positions = select(models.Position)
+    if user_id is not None:
+        query = query.where(models.TradeEntry.user_id == user_id)
+        positions = positions.where(models.Position.user_id == user_id)
+
+    trades_by_key = {}
+    for row in await db.execute(query):
+        trade = row._asdict()
+        trades_by_key.setdefault(position_key(trade), []).append(trade)
+
+    for position in (await db.execute(positions)).scalars().all():
+        await db.delete(position)
+    await db.flush()
+
+    for key, trades in trades_by_key.items():
+        position = models.Position(
+            user_id=key[0], stock_ticker=key[1], trade_exchange=key[2])
+        match_trades(trades).write_to(position)
+        db.add(position)
+    await db.commit()
+    return len(trades_by_key)
+
+
+def position_view(position: models.Position, cost_method: str = FIFO, last_price: float = None) -> dict:
+    """
+    Summarise a position for the holdings endpoint using FIFO or average cost.
+    """
+    if cost_method == AVERAGE:
+        cost_basis, realized_pnl = position.avg_cost_basis, position.avg_realized_pnl
+    else:
+        cost_basis, realized_pnl = position.fifo_cost_basis, position.fifo_realized_pnl
+
+    view = {
+        'stock_ticker': position.stock_ticker,
+        'trade_exchange': position.trade_exchange,
+        'cost_method': cost_method,
+        'quantity': position.quantity,
+        'average_price': cost_basis / position.quantity if position.quantity else None,
+        'cost_basis': cost_basis,
+        'realized_pnl': realized_pnl,
+        'last_price': last_price,
+        'market_value': None,
+        'unrealized_pnl': None,
+    }
+    if last_price is not None:
+        view['market_value'] = position.quantity * last_price
+        view['unrealized_pnl'] = view['market_value'] - cost_basis
+    return view
+
+
+async def _rebuild_all():
+    async with database.async_session() as db:
+        count = await rebuild_positions(db)
+    print(f"Rebuilt {count} positions")
+
+
+if __name__ == '__main__':
+    # Rebuild every position from trade_entry: python -m utils.lot_matching
+    asyncio.run(_rebuild_all())
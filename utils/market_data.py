@@ -0,0 +1,103 @@
+import asyncio
+import importlib
+import threading
+
+# Market-data libraries that are only imported on first use (or by warmup).
+# Importing them eagerly costs seconds of worker boot time and hundreds of MB,
+# which auth-only traffic never needs.
+HEAVY_MODULES = (
+    "pandas",
+    "yfinance",
+    "nselib.capital_market",
+    "jugaad_data.nse",
+    "bs4",
+    "httpx",
+)
+
+_nse_live = None
+_nse_live_lock = threading.Lock()
+
+# Stand-ins registered with set_provider, served by load() instead of the real modules
+providers = {}
+
+
+def set_provider(module_name: str, provider):
+    """
+    Serve a stand-in instead of a market-data module, e.g. offline fakes for benchmarks.
+
+    Args:
+        module_name (str): The dotted module name the stand-in replaces.
+        provider: An object with the module's interface, or None to restore the real module.
+    """
+    global _nse_live
+    if provider is None:
+        providers.pop(module_name, None)
+    else:
+        providers[module_name] = provider
+    if module_name == "jugaad_data.nse":
+        # The NSE client is built from the module, so rebuild it from the new one
+        _nse_live = None
+
+
+def load(module_name: str):
+    """
+    Import a market-data module on first use.
+
+    Args:
+        module_name (str): The dotted module name, e.g. "nselib.capital_market".
+
+    Returns:
+        module: The registered stand-in, or the imported module.
+    """
+    provider = providers.get(module_name)
+    if provider is not None:
+        return provider
+    return importlib.import_module(module_name)
+
+
+def yfinance():
+    """
+    Return the yfinance module, importing it on first use.
+    """
+    return load("yfinance")
+
+
+def capital_market():
+    """
+    Return nselib's capital_market module, importing it on first use.
+    """
+    return load("nselib.capital_market")
+
+
+def nse_live():
+    """
+    Return the shared jugaad_data NSELive client, constructing it on first use.
+
+    NSELive opens a session against nseindia.com when it is constructed, so it is
+    built once per process and only when live NSE data is first requested.
+    """
+    global _nse_live
+    if _nse_live is None:
+        with _nse_live_lock:
+            if _nse_live is None:
+                _nse_live = load("jugaad_data.nse").NSELive()
+    return _nse_live
+
+
+def _warmup():
+    for module_name in HEAVY_MODULES:
+        load(module_name)
+    nse_live()
+
+
+async def warmup():
+    """
+    Import the market-data libraries and build the NSE client off the event loop.
+
+    Called from the startup event so the first market-data request does not pay
+    the import cost, without blocking workers from accepting traffic meanwhile.
+    """
+    try:
+        await asyncio.to_thread(_warmup)
+    except Exception as e:
+        print(f"Market data warmup failed: {e}")
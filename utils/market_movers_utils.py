@@ -1,9 +1,139 @@
-import aiohttp
 import asyncio
-from nselib import capital_market
+import numpy as np
 from fastapi import HTTPException
-import requests
-from bs4 import BeautifulSoup
+from utils import cache_registry, http_client, market_data, rate_governor
+
+# Index used for market-wide movers when none is requested
+DEFAULT_MOVERS_INDEX = "NIFTY 500"
+# Seconds an index constituent snapshot is served before it is refetched
+SNAPSHOT_TTL = 60
+
+# Cache of constituent snapshots per index name
+snapshot_cache = {}
+snapshot_locks = {}
+
+# Seconds the all-indices snapshot is served before it is refetched
+INDICES_TTL = 30
+# Category of the NSE all-indices payload that holds the sectoral indices
+SECTORAL_INDICES_KEY = "SECTORAL INDICES"
+# Columns of market_watch_all_indices() and the names they are served under
+INDEX_COLUMNS = {
+    'key': 'category',
+    'last': 'value',
+    'variation': 'change',
+    'percentChange': 'change_percent',
+    'open': 'open',
+    'high': 'high',
+    'low': 'low',
+    'previousClose': 'previous_close',
+    'yearHigh': 'year_high',
+    'yearLow': 'year_low',
+    'advances': 'advances',
+    'declines': 'declines',
+    'unchanged': 'unchanged',
+}
+
+# Cache of the all-indices snapshot shared by every index query
+indices_cache = {
+    "snapshot": None,
+    "fetched_at": None
+}
+indices_lock = asyncio.Lock()
+
+
+def indices_snapshot_from_frame(indices_data) -> dict:
+    """
+    Convert the market_watch_all_indices() DataFrame into {index name: index info}.
+
+    The conversion works column-wise on the whole frame (rename, NaN to None,
+    to_dict) instead of iterating rows.
+    """
+    columns = [column for column in INDEX_COLUMNS if column in indices_data.columns]
+    frame = indices_data.set_index('index')[columns].rename(columns=INDEX_COLUMNS)
+    frame = frame[~frame.index.duplicated()]
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict(orient='index')
+
+
+async def fetch_all_indices(force: bool = False):
+    """
+    Fetch every NSE index from one cached market_watch_all_indices() download.
+
+    Concurrent callers share a single upstream fetch, and every index query is served
+    from the same snapshot until it expires.
+
+    Parameters:
+    - force: Refetch even if the cached snapshot is still fresh.
+
+    Returns:
+    - A dictionary with the index name as the key and a dictionary of index info as the value.
+    """
+    loop = asyncio.get_running_loop()
+    if not force and indices_cache["snapshot"] is not None and loop.time() - indices_cache["fetched_at"] < INDICES_TTL:
+        cache_registry.hit("indices")
+        return indices_cache["snapshot"]
+
+    async with indices_lock:
+        if not force and indices_cache["snapshot"] is not None and loop.time() - indices_cache["fetched_at"] < INDICES_TTL:
+            cache_registry.hit("indices")
+            return indices_cache["snapshot"]
+        cache_registry.miss("indices")
+        try:
+            indices_data = await rate_governor.call(
+                rate_governor.NSE, lambda: market_data.capital_market().market_watch_all_indices())
+        except Exception as e:
+            if not force and indices_cache["snapshot"] is not None:
+                # Keep serving the last snapshot while NSE is failing or throttled
+                print(f"An error occurred while fetching market indices, serving the cached snapshot: {e}")
+                return indices_cache["snapshot"]
+            raise HTTPException(
+                status_code=500, detail="Failed to fetch market indices") from e
+        try:
+            snapshot = indices_snapshot_from_frame(indices_data)
+        except KeyError as e:
+            raise HTTPException(
+                status_code=500, detail=f"Invalid data format: {str(e)}") from e
+
+        indices_cache["snapshot"] = snapshot
+        indices_cache["fetched_at"] = loop.time()
+        return snapshot
+
+
+async def fetch_indices(names, fields=('value', 'change', 'change_percent')):
+    """
+    Return selected indices from the cached all-indices snapshot.
+
+    Args:
+        names (Iterable[str]): The index names; unknown names are skipped.
+        fields (Iterable[str], optional): The index info fields to return, or None for all.
+
+    Returns:
+        dict: {index name: index info} in the requested order.
+    """
+    snapshot = await fetch_all_indices()
+    indices_info = {}
+    for name in names:
+        info = snapshot.get(name.upper())
+        if info is not None:
+            indices_info[name.upper()] = info if fields is None else {
+                field: info.get(field) for field in fields}
+    return indices_info
+
+
+async def fetch_sector_heatmap():
+    """
+    Return the sectoral indices ordered from best to worst percentage change.
+
+    Returns:
+    - A list of dictionaries with the index name, value, change, change percent and breadth.
+    """
+    snapshot = await fetch_all_indices()
+    sectors = [{'index': name, 'value': info.get('value'), 'change': info.get('change'),
+                'change_percent': info.get('change_percent'), 'advances': info.get('advances'),
+                'declines': info.get('declines'), 'unchanged': info.get('unchanged')}
+               for name, info in snapshot.items() if info.get('category') == SECTORAL_INDICES_KEY]
+    sectors.sort(key=lambda sector: float(sector['change_percent'] or 0), reverse=True)
+    return sectors
 
 
 async def fetch_main_indices():
@@ -24,36 +154,10 @@ async def fetch_main_indices():
         "SENSEX": {"value": 58000.00, "change": -150.00, "change_percent": -0.26}
     }
     """
-    try:
-        # Fetch market indices data
-        indices_data = capital_market.market_watch_all_indices()
-    except Exception as e:
-        # If an exception occurs during fetching, raise an HTTPException
-        raise HTTPException(
-            status_code=500, detail="Failed to fetch market indices") from e
-
-    # Filter the data for the required indices
+    # Filter the cached all-indices snapshot for the required indices
     required_indices = ['NIFTY 50', 'NIFTY BANK']
     # required_indices = ['NIFTY 50', 'INDIA VIX', 'NIFTY BANK']
-    filtered_data = indices_data[indices_data['index'].isin(required_indices)]
-
-    indices_info = {}
-
-    try:
-        # Iterate over the filtered data
-        for _, row in filtered_data.iterrows():
-            # Create a dictionary of index info for each row
-            index_info = {
-                'value': row['last'],
-                'change': row['variation'],
-                'change_percent': row['percentChange']
-            }
-            # Add the index info to the indices_info dictionary with the index name as the key
-            indices_info[row['index']] = index_info
-    except KeyError as e:
-        # If a KeyError occurs during iteration, raise an HTTPException
-        raise HTTPException(
-            status_code=500, detail=f"Invalid data format: {str(e)}") from e
+    indices_info = await fetch_indices(required_indices)
 
     # Fetch SENSEX data from Yahoo Finance
     try:
@@ -62,9 +166,10 @@ async def fetch_main_indices():
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
 
-        response = requests.get(url, headers=headers)
+        response = await http_client.get(url, headers=headers)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = market_data.load("bs4").BeautifulSoup(
+                response.content, 'html.parser')
             sensex_value = soup.find(
                 'fin-streamer', {'data-field': 'regularMarketPrice'}).text
             sensex_change = soup.find(
@@ -86,3 +191,196 @@ async def fetch_main_indices():
 
     # Return the indices_info dictionary
     return indices_info
+
+
+class ConstituentSnapshot:
+    """
+    Columnar snapshot of the constituents of one index.
+
+    The per-symbol fields of the NSE live index payload are held in NumPy arrays so
+    every ranking is a partial selection over one array instead of a sort of dicts.
+    """
+    __slots__ = ("index", "timestamp", "fetched_at", "symbols", "last_price", "change",
+                 "change_percent", "volume", "year_high", "year_high_distance")
+
+    def __init__(self, index: str, payload: dict, fetched_at: float):
+        # The first row of the payload is the index itself, not a constituent
+        rows = [row for row in payload.get('data', [])
+                if row.get('symbol') != payload.get('name', index) and row.get('priority', 0) == 0]
+
+        def column(key):
+            return np.array([row.get(key) if row.get(key) is not None else np.nan
+                             for row in rows], dtype=np.float64)
+
+        self.index = index
+        self.timestamp = payload.get('timestamp')
+        self.fetched_at = fetched_at
+        self.symbols = np.array([row.get('symbol') for row in rows], dtype=object)
+        self.last_price = column('lastPrice')
+        self.change = column('change')
+        self.change_percent = column('pChange')
+        self.volume = column('totalTradedVolume')
+        self.year_high = column('yearHigh')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.year_high_distance = (
+                self.year_high - self.last_price) / self.year_high * 100
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def rank(self, values: np.ndarray, limit: int, largest: bool = True):
+        """
+        Select the rows with the largest (or smallest) values.
+
+        Uses argpartition to pick the top rows in O(n) and only sorts those rows.
+        Rows with missing values are ranked last.
+
+        Args:
+            values (np.ndarray): The column to rank by.
+            limit (int): The number of rows to return.
+            largest (bool): Rank descending if True, ascending otherwise.
+
+        Returns:
+            List[dict]: The selected rows in rank order.
+        """
+        limit = min(limit, len(values))
+        if limit <= 0:
+            return []
+        keys = -values if largest else values.copy()
+        keys[np.isnan(keys)] = np.inf
+        top = np.argpartition(keys, limit - 1)[:limit]
+        top = top[np.argsort(keys[top], kind='stable')]
+        return [self.row(i) for i in top]
+
+    def row(self, i: int) -> dict:
+        def value(column):
+            return None if np.isnan(column[i]) else float(column[i])
+
+        return {
+            'symbol': self.symbols[i],
+            'last_price': value(self.last_price),
+            'change': value(self.change),
+            'change_percent': value(self.change_percent),
+            'volume': value(self.volume),
+            'year_high': value(self.year_high),
+            'year_high_distance_percent': value(self.year_high_distance),
+        }
+
+
+async def fetch_index_snapshot(index: str = DEFAULT_MOVERS_INDEX, force: bool = False) -> ConstituentSnapshot:
+    """
+    Fetch the constituent snapshot of an index, served from cache while fresh.
+
+    Concurrent callers share a single upstream fetch per index.
+
+    Args:
+        index (str): The NSE index name, e.g. "NIFTY 50" or "NIFTY 500".
+        force (bool, optional): Refetch even if the cached snapshot is still fresh.
+
+    Returns:
+        ConstituentSnapshot: The cached snapshot of the index constituents.
+    """
+    index = index.upper()
+    loop = asyncio.get_running_loop()
+    cached = snapshot_cache.get(index)
+    if not force and cached is not None and loop.time() - cached.fetched_at < SNAPSHOT_TTL:
+        cache_registry.hit("index_snapshots")
+        return cached
+
+    lock = snapshot_locks.setdefault(index, asyncio.Lock())
+    async with lock:
+        cached = snapshot_cache.get(index)
+        if not force and cached is not None and loop.time() - cached.fetched_at < SNAPSHOT_TTL:
+            cache_registry.hit("index_snapshots")
+            return cached
+        cache_registry.miss("index_snapshots")
+        try:
+            payload = await rate_governor.call(
+                rate_governor.NSE, lambda: market_data.nse_live().live_index(index))
+        except Exception as e:
+            if not force and cached is not None:
+                # Keep serving the last snapshot while NSE is failing or throttled
+                print(f"An error occurred while fetching constituents of {index}, serving the cached snapshot: {e}")
+                return cached
+            raise HTTPException(
+                status_code=500, detail=f"Failed to fetch constituents of {index}") from e
+        if not payload or not payload.get('data'):
+            raise HTTPException(
+                status_code=404, detail=f"No constituents found for index {index}")
+
+        snapshot = ConstituentSnapshot(index, payload, loop.time())
+        snapshot_cache[index] = snapshot
+        return snapshot
+
+
+async def fetch_top_gainers(index: str = DEFAULT_MOVERS_INDEX, limit: int = 10):
+    """
+    Return the constituents with the highest percentage change.
+    """
+    snapshot = await fetch_index_snapshot(index)
+    return snapshot.rank(snapshot.change_percent, limit, largest=True)
+
+
+async def fetch_top_losers(index: str = DEFAULT_MOVERS_INDEX, limit: int = 10):
+    """
+    Return the constituents with the lowest percentage change.
+    """
+    snapshot = await fetch_index_snapshot(index)
+    return snapshot.rank(snapshot.change_percent, limit, largest=False)
+
+
+async def fetch_most_active(index: str = DEFAULT_MOVERS_INDEX, limit: int = 10):
+    """
+    Return the constituents with the highest traded volume.
+    """
+    snapshot = await fetch_index_snapshot(index)
+    return snapshot.rank(snapshot.volume, limit, largest=True)
+
+
+async def fetch_near_52_week_high(index: str = DEFAULT_MOVERS_INDEX, limit: int = 10):
+    """
+    Return the constituents trading closest to their 52-week high.
+    """
+    snapshot = await fetch_index_snapshot(index)
+    return snapshot.rank(snapshot.year_high_distance, limit, largest=False)
+
+
+def _indices_entries() -> dict:
+    if indices_cache["snapshot"] is None:
+        return {}
+    return {"snapshot": (len(indices_cache["snapshot"]),
+                         asyncio.get_event_loop().time() - indices_cache["fetched_at"])}
+
+
+def _evict_indices(key: str) -> bool:
+    if key != "snapshot" or indices_cache["snapshot"] is None:
+        return False
+    indices_cache.update(snapshot=None, fetched_at=None)
+    return True
+
+
+async def _refresh_indices(key: str):
+    if key != "snapshot":
+        raise KeyError(key)
+    await fetch_all_indices(force=True)
+
+
+def _snapshot_entries() -> dict:
+    now = asyncio.get_event_loop().time()
+    return {index: (len(snapshot.symbols), now - snapshot.fetched_at)
+            for index, snapshot in snapshot_cache.items()}
+
+
+def _evict_snapshot(key: str) -> bool:
+    return snapshot_cache.pop(key.upper(), None) is not None
+
+
+async def _refresh_snapshot(key: str):
+    await fetch_index_snapshot(key, force=True)
+
+
+# The all-indices snapshot behind main indices, index queries and the sector heatmap
+cache_registry.register("indices", _indices_entries, _evict_indices, _refresh_indices,
+                        warm=fetch_all_indices)
+# Constituent snapshots behind the market movers
+cache_registry.register("index_snapshots", _snapshot_entries, _evict_snapshot, _refresh_snapshot)
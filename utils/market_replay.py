@@ -0,0 +1,377 @@
+import argparse
+import bisect
+import gzip
+import json
+import os
+import threading
+import time
+from utils import market_data, quote_router
+
+# Fields a quote is recorded with, whether it came from Ticker(...).info or from a
+# batched quote download; the quote builders read nothing else
+QUOTE_FIELDS = ('currentPrice', 'previousClose')
+# Records buffered by the recorder before they are flushed to disk
+FLUSH_EVERY = 100
+
+# The active recorder or replay, so shutdown can close it
+active = {"recorder": None, "replay": None}
+
+
+class Recorder:
+    """
+    Append-only log of upstream responses.
+
+    Each line is {"t": seconds since recording started, "kind": "quote" | "indices" |
+    "equity_list", "key": the symbol or None, "d": upstream latency in seconds, "data": ...};
+    the first line holds the wall-clock start. Safe to call from worker threads.
+
+    Args:
+        path (str): The log file, gzip-compressed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.pending = 0
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+        self.file.write(json.dumps({"started_at": time.time(), "quote_fields": QUOTE_FIELDS}) + "\n")
+
+    def record(self, kind: str, key, data, latency: float, at: float):
+        line = json.dumps({"t": round(at - self.started, 3), "kind": kind, "key": key,
+                           "d": round(latency, 4), "data": data}, default=str, separators=(',', ':'))
+        with self.lock:
+            self.file.write(line + "\n")
+            self.pending += 1
+            if self.pending >= FLUSH_EVERY:
+                self.file.flush()
+                self.pending = 0
+
+    def timed(self, kind: str, key, fetch, encode):
+        # Call the upstream, record its encoded response and latency, and return the response
+        at = time.monotonic()
+        response = fetch()
+        self.record(kind, key, encode(response), time.monotonic() - at, at)
+        return response
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def _frame_to_split(df) -> dict:
+    return df.to_dict(orient='split', index=False)
+
+
+def _split_to_frame(data: dict):
+    return market_data.load("pandas").DataFrame(data['data'], columns=data['columns'])
+
+
+class _RecordingTicker:
+    def __init__(self, ticker, symbol: str, recorder: Recorder):
+        self._ticker = ticker
+        self._symbol = symbol
+        self._recorder = recorder
+
+    @property
+    def info(self):
+        return self._recorder.timed(
+            "quote", self._symbol, lambda: self._ticker.info,
+            lambda info: {field: info.get(field) for field in QUOTE_FIELDS})
+
+    def __getattr__(self, name):
+        return getattr(self._ticker, name)
+
+
+class RecordingYFinance:
+    """
+    yfinance stand-in that records every quote read through Ticker(...).info or a
+    batched quote download (one with a period, as quote_router sends), per symbol.
+    """
+
+    def __init__(self, module, recorder: Recorder):
+        self._module = module
+        self._recorder = recorder
+
+    def Ticker(self, symbol: str, *args, **kwargs):
+        return _RecordingTicker(self._module.Ticker(symbol, *args, **kwargs), symbol, self._recorder)
+
+    def download(self, tickers, *args, **kwargs):
+        if not kwargs.get('period'):
+            # Price history is not recorded
+            return self._module.download(tickers, *args, **kwargs)
+        at = time.monotonic()
+        data = self._module.download(tickers, *args, **kwargs)
+        latency = time.monotonic() - at
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        if data is not None and not data.empty:
+            for symbol, (current_price, previous_close) in quote_router.closes_from_frame(data, symbols).items():
+                self._recorder.record("quote", symbol, dict(zip(QUOTE_FIELDS, (current_price, previous_close))),
+                                      latency, at)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+class RecordingCapitalMarket:
+    """
+    nselib.capital_market stand-in that records the all-indices snapshot and the equity list.
+    """
+
+    def __init__(self, module, recorder: Recorder):
+        self._module = module
+        self._recorder = recorder
+
+    def market_watch_all_indices(self):
+        return self._recorder.timed("indices", None, self._module.market_watch_all_indices, _frame_to_split)
+
+    def equity_list(self):
+        return self._recorder.timed("equity_list", None, self._module.equity_list, _frame_to_split)
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+def start_recording(path: str) -> Recorder:
+    """
+    Record every quote, indices and equity list response the app fetches from now on.
+
+    Args:
+        path (str): The log file to create.
+
+    Returns:
+        Recorder: The recorder; close() it to finish the log.
+    """
+    recorder = Recorder(path)
+    market_data.set_provider("yfinance", RecordingYFinance(market_data.load("yfinance"), recorder))
+    market_data.set_provider("nselib.capital_market",
+                             RecordingCapitalMarket(market_data.load("nselib.capital_market"), recorder))
+    active["recorder"] = recorder
+    return recorder
+
+
+class Replay:
+    """
+    A recorded log served back on a replay clock.
+
+    Args:
+        path (str): The log written by Recorder.
+        speed (float, optional): Recorded seconds replayed per real second. Defaults to 1.
+        latency (bool, optional): Delay each call by its recorded upstream latency, scaled
+            by speed. Defaults to True.
+        offset (float, optional): Recorded second the replay starts from. Defaults to 0.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, latency: bool = True, offset: float = 0.0):
+        self.speed = speed
+        self.latency = latency
+        # (kind, key) -> (offsets, [(latency, data)]), both in recorded order
+        self.series = {}
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            self.header = json.loads(f.readline())
+            for line in f:
+                entry = json.loads(line)
+                offsets, responses = self.series.setdefault((entry['kind'], entry['key']), ([], []))
+                offsets.append(entry['t'])
+                responses.append((entry['d'], entry['data']))
+        self.duration = max((offsets[-1] for offsets, _ in self.series.values()), default=0.0)
+        self.started = time.monotonic() - offset / speed
+
+    def clock(self) -> float:
+        """
+        Return the recorded second currently being replayed.
+        """
+        return (time.monotonic() - self.started) * self.speed
+
+    def lookup(self, kind: str, key=None) -> tuple:
+        """
+        Return (recorded latency, response) of the latest response recorded at or before
+        the replay clock.
+
+        Before a series' first record the first response is served, after its last
+        record the last one.
+
+        Raises:
+            LookupError: If nothing of this kind and key was recorded.
+        """
+        series = self.series.get((kind, key))
+        if series is None:
+            raise LookupError(f"No {kind} response recorded for {key}")
+        offsets, responses = series
+        return responses[max(bisect.bisect_right(offsets, self.clock()) - 1, 0)]
+
+    def wait(self, latency: float):
+        """
+        Delay by a recorded upstream latency, scaled by the replay speed.
+        """
+        if self.latency and latency:
+            time.sleep(latency / self.speed)
+
+    def response(self, kind: str, key=None):
+        """
+        Return the response lookup() finds, after its recorded latency.
+
+        Raises:
+            LookupError: If nothing of this kind and key was recorded.
+        """
+        latency, data = self.lookup(kind, key)
+        self.wait(latency)
+        return data
+
+
+class _ReplayTicker:
+    def __init__(self, replay: Replay, symbol: str):
+        self._replay = replay
+        self._symbol = symbol
+
+    @property
+    def info(self):
+        return dict(self._replay.response("quote", self._symbol))
+
+
+class ReplayYFinance:
+    """
+    yfinance stand-in serving recorded quotes; other attributes come from the fallback.
+    """
+
+    def __init__(self, replay: Replay, fallback=None):
+        self._replay = replay
+        self._fallback = fallback
+
+    def Ticker(self, symbol: str, *args, **kwargs):
+        return _ReplayTicker(self._replay, symbol)
+
+    def download(self, tickers, *args, **kwargs):
+        if not kwargs.get('period'):
+            if self._fallback is None:
+                raise AttributeError("yfinance price history is not recorded")
+            return self._fallback.download(tickers, *args, **kwargs)
+        # A batched quote download: two daily bars per recorded symbol, the previous
+        # close and the current price, served after the slowest symbol's latency
+        pd = market_data.load("pandas")
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        closes, latency = {}, 0.0
+        for symbol in symbols:
+            try:
+                symbol_latency, quote = self._replay.lookup("quote", symbol)
+            except LookupError:
+                continue
+            if quote.get('currentPrice') is not None:
+                closes[symbol] = [quote.get('previousClose'), quote['currentPrice']]
+                latency = max(latency, symbol_latency)
+        self._replay.wait(latency)
+        index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=2)
+        return pd.DataFrame({('Close', symbol): [float('nan') if close is None else close for close in values]
+                             for symbol, values in closes.items()}, index=index)
+
+    def __getattr__(self, name):
+        if self._fallback is None:
+            raise AttributeError(f"yfinance.{name} is not recorded")
+        return getattr(self._fallback, name)
+
+
+class ReplayCapitalMarket:
+    """
+    nselib.capital_market stand-in serving recorded indices and equity lists.
+    """
+
+    def __init__(self, replay: Replay, fallback=None):
+        self._replay = replay
+        self._fallback = fallback
+
+    def market_watch_all_indices(self):
+        return _split_to_frame(self._replay.response("indices"))
+
+    def equity_list(self):
+        return _split_to_frame(self._replay.response("equity_list"))
+
+    def __getattr__(self, name):
+        if self._fallback is None:
+            raise AttributeError(f"capital_market.{name} is not recorded")
+        return getattr(self._fallback, name)
+
+
+def start_replay(path: str, speed: float = 1.0, latency: bool = True, offset: float = 0.0,
+                 fallback=None) -> Replay:
+    """
+    Serve quotes, indices and the equity list from a recorded log instead of the network.
+
+    Args:
+        path (str): The log written by Recorder.
+        speed (float, optional): Recorded seconds replayed per real second. Defaults to 1.
+        latency (bool, optional): Reproduce the recorded upstream latency. Defaults to True.
+        offset (float, optional): Recorded second the replay starts from. Defaults to 0.
+        fallback (optional): Serves what the log does not cover (e.g. price history),
+            such as benchmarks.fakes.FakeMarket. Defaults to none.
+
+    Returns:
+        Replay: The replay, whose clock() tells the recorded second being served.
+    """
+    replay = Replay(path, speed, latency, offset)
+    market_data.set_provider("yfinance", ReplayYFinance(replay, fallback))
+    market_data.set_provider("nselib.capital_market", ReplayCapitalMarket(replay, fallback))
+    active["replay"] = replay
+    return replay
+
+
+def install_from_env():
+    """
+    Start recording or replay as configured by the environment, e.g.
+
+        MARKET_DATA_RECORD=day.jsonl.gz  records while serving real traffic;
+        MARKET_DATA_REPLAY=day.jsonl.gz MARKET_DATA_REPLAY_SPEED=60  replays an hour per minute,
+        starting MARKET_DATA_REPLAY_OFFSET recorded seconds in.
+    """
+    if os.getenv("MARKET_DATA_REPLAY"):
+        replay = start_replay(os.environ["MARKET_DATA_REPLAY"],
+                              speed=float(os.getenv("MARKET_DATA_REPLAY_SPEED", "1")),
+                              offset=float(os.getenv("MARKET_DATA_REPLAY_OFFSET", "0")))
+        print(f"Replaying {replay.duration:.0f}s of market data from {os.environ['MARKET_DATA_REPLAY']}")
+    elif os.getenv("MARKET_DATA_RECORD"):
+        start_recording(os.environ["MARKET_DATA_RECORD"])
+        print(f"Recording market data to {os.environ['MARKET_DATA_RECORD']}")
+
+
+def close():
+    """
+    Finish the active recording, if any; called on application shutdown.
+    """
+    recorder = active["recorder"]
+    if recorder is not None:
+        recorder.close()
+        active["recorder"] = None
+
+
+def _record_watchlist(args):
+    # Poll quotes and indices like the app does, recording every response
+    start_recording(args.path)
+    capital_market = market_data.capital_market()
+    symbols = [quote_router.yahoo_symbol(symbol, args.exchange) for symbol in args.symbols]
+    try:
+        capital_market.equity_list()
+        deadline = time.monotonic() + args.duration
+        while time.monotonic() < deadline:
+            try:
+                quote_router.download_quotes(symbols)
+            except Exception as e:
+                print(f"An error occurred while recording quotes: {e}")
+            try:
+                capital_market.market_watch_all_indices()
+            except Exception as e:
+                print(f"An error occurred while recording the indices: {e}")
+            time.sleep(args.interval)
+    finally:
+        close()
+
+
+if __name__ == '__main__':
+    # Record a watchlist for a session: python -m utils.market_replay day.jsonl.gz --symbols INFY TCS
+    parser = argparse.ArgumentParser(description="Record quotes and indices for later replay")
+    parser.add_argument("path", help="The log file to write, e.g. day.jsonl.gz")
+    parser.add_argument("--symbols", nargs="+", required=True, help="Symbols to poll")
+    parser.add_argument("--exchange", default="NSE", help="The exchange the symbols are listed on")
+    parser.add_argument("--interval", type=float, default=15, help="Seconds between polls")
+    parser.add_argument("--duration", type=float, default=6.25 * 60 * 60,
+                        help="Seconds to record (default: one NSE session)")
+    _record_watchlist(parser.parse_args())
@@ -0,0 +1,138 @@
+import time
+from utils import cache_registry, quote_cache
+
+# Seconds a cached portfolio's trades are trusted before they are re-read from the
+# database, which picks up trades changed through other workers
+TRADES_TTL = 30
+# Users whose enriched portfolio is cached before the least recently used is evicted
+MAX_USERS = 1000
+
+# Enriched /stocks/all responses: user_id -> PortfolioEntry, least recently used first
+cache = {}
+# Trades version per user, bumped by every committed trade change of the user
+trade_versions = {}
+
+
+class PortfolioEntry:
+    """
+    The enriched portfolio of one user.
+
+    Holds the trades joined with their company info, which only change with the trades
+    or the equity list, separately from the quote-merged payload, which is rebuilt
+    whenever one of the portfolio's quotes changes.
+
+    Args:
+        trades_version (int): The user's trades version the rows were read at.
+        equity_version (str): The equity list version the company info was joined from.
+        rows (List[tuple]): (trade dict, quote key, company info) per trade.
+    """
+    __slots__ = ("trades_version", "equity_version", "loaded_at", "rows", "keys",
+                 "quote_version", "payload")
+
+    def __init__(self, trades_version: int, equity_version, rows: list):
+        self.trades_version = trades_version
+        self.equity_version = equity_version
+        self.loaded_at = time.monotonic()
+        self.rows = rows
+        self.keys = list(dict.fromkeys(key for _, key, _ in rows))
+        # Quote snapshot version the payload was merged at, see quote_cache.snapshot_version
+        self.quote_version = None
+        self.payload = None
+
+
+def trades_version(user_id: int) -> int:
+    """
+    Return the current trades version of a user.
+    """
+    return trade_versions.get(user_id, 0)
+
+
+def invalidate(user_id: int):
+    """
+    Drop the cached portfolio of a user, e.g. after one of their trades changed.
+
+    Bumping the version also keeps a rebuild that was already running from caching
+    the trades as they were before the change.
+    """
+    trade_versions[user_id] = trades_version(user_id) + 1
+    cache.pop(user_id, None)
+
+
+def get(user_id: int, equity_version) -> PortfolioEntry:
+    """
+    Return the cached portfolio of a user if its trades and company info are current.
+
+    Args:
+        user_id (int): The user.
+        equity_version (str): The version of the equity list currently cached.
+
+    Returns:
+        PortfolioEntry: The entry, or None when it must be rebuilt from the database.
+    """
+    entry = cache.get(user_id)
+    if entry is None:
+        return None
+    if entry.trades_version != trades_version(user_id) or entry.equity_version != equity_version or \
+            time.monotonic() - entry.loaded_at >= TRADES_TTL:
+        del cache[user_id]
+        return None
+    # Keep the most recently used users at the end
+    cache[user_id] = cache.pop(user_id)
+    return entry
+
+
+def store(user_id: int, entry: PortfolioEntry) -> PortfolioEntry:
+    """
+    Cache a rebuilt portfolio, unless the user's trades changed while it was being built.
+
+    Returns:
+        PortfolioEntry: The entry, cached or not.
+    """
+    if entry.trades_version == trades_version(user_id):
+        cache.pop(user_id, None)
+        if len(cache) >= MAX_USERS:
+            cache.pop(next(iter(cache)))
+        cache[user_id] = entry
+    return entry
+
+
+def cached_payload(entry: PortfolioEntry):
+    """
+    Return the payload of a portfolio if none of its quotes changed since it was merged
+    and all of them are still fresh. A symbol with no quote available counts as fresh
+    for as long as quote_cache trusts that it has none.
+
+    Returns:
+        http_cache.EncodedPayload: The payload, or None when the quotes must be merged again.
+    """
+    quote_version, fresh = quote_cache.snapshot_version(entry.keys)
+    if entry.payload is not None and fresh and quote_version == entry.quote_version:
+        cache_registry.hit("portfolios")
+        return entry.payload
+    cache_registry.miss("portfolios")
+    return None
+
+
+def set_payload(entry: PortfolioEntry, payload):
+    """
+    Keep a freshly merged payload, versioned by the quotes it was merged from.
+
+    Returns:
+        http_cache.EncodedPayload: The payload.
+    """
+    entry.payload = payload
+    entry.quote_version = quote_cache.snapshot_version(entry.keys)[0]
+    return payload
+
+
+def _cache_entries() -> dict:
+    now = time.monotonic()
+    return {str(user_id): (len(entry.rows), now - entry.loaded_at) for user_id, entry in cache.items()}
+
+
+def _evict(key: str) -> bool:
+    return cache.pop(int(key), None) is not None if key.isdigit() else False
+
+
+# Enriched /stocks/all responses per user
+cache_registry.register("portfolios", _cache_entries, _evict)
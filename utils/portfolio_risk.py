@@ -0,0 +1,226 @@
+import asyncio
+from datetime import date, timedelta
+import numpy as np
+from sqlalchemy.future import select
+import models
+from utils import price_history
+from utils.equity_curve import forward_fill
+
+# Trading sessions in a year, used to annualize daily figures
+TRADING_DAYS = 252
+# Index the portfolio beta is measured against
+BENCHMARK = ("NIFTY 50", price_history.INDEX_EXCHANGE)
+# Confidence levels reported for historical value at risk
+VAR_LEVELS = (0.95, 0.99)
+# Symbol sets whose return windows are kept before the oldest is evicted
+MAX_WINDOWS = 64
+
+# Rolling return windows: (symbol keys, window length) -> ReturnWindow
+windows = {}
+# Locks serializing the loads of each window: (symbol keys, window length) -> asyncio.Lock
+window_locks = {}
+
+
+class ReturnWindow:
+    """
+    The last `length` daily returns of a fixed set of symbols with running moment sums.
+
+    The column sums and the cross-product matrix (returns.T @ returns) are updated
+    with only the bars that enter and leave the window, so adding a day costs
+    O(symbols^2) instead of recomputing the covariance from the full history.
+    """
+    __slots__ = ("length", "dates", "returns", "last_close",
+                 "sums", "cross", "checked_on", "complete")
+
+    def __init__(self, length: int, size: int):
+        self.length = length
+        self.dates = np.array([], dtype='datetime64[D]')
+        self.returns = np.empty((0, size))
+        self.last_close = np.full(size, np.nan)
+        self.sums = np.zeros(size)
+        self.cross = np.zeros((size, size))
+        self.checked_on = None
+        # False when a close sync failed, so the window may hold gaps and is rebuilt
+        self.complete = True
+
+    def extend(self, dates: np.ndarray, closes: np.ndarray):
+        """
+        Append new daily closes (dates x symbols, NaN where missing) to the window.
+        """
+        if not len(dates):
+            return
+        filled = forward_fill(np.vstack([self.last_close, closes]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = filled[1:] / filled[:-1] - 1
+        # A symbol without a previous close (not listed yet) contributes a flat day
+        returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+        if not len(self.returns):
+            # The first bar of a new window only provides the base close
+            dates, returns = dates[1:], returns[1:]
+
+        self.sums += returns.sum(axis=0)
+        self.cross += returns.T @ returns
+        self.dates = np.concatenate([self.dates, dates])
+        self.returns = np.vstack([self.returns, returns])
+        self.last_close = filled[-1]
+
+        dropped = len(self.returns) - self.length
+        if dropped > 0:
+            leaving = self.returns[:dropped]
+            self.sums -= leaving.sum(axis=0)
+            self.cross -= leaving.T @ leaving
+            self.dates = self.dates[dropped:]
+            self.returns = self.returns[dropped:]
+
+    def covariance(self) -> np.ndarray:
+        """
+        Return the sample covariance matrix of daily returns in the window.
+        """
+        n = len(self.returns)
+        if n < 2:
+            return None
+        mean = self.sums / n
+        return (self.cross - n * np.outer(mean, mean)) / (n - 1)
+
+
+def risk_metrics(covariance: np.ndarray, returns: np.ndarray, weights: np.ndarray, value: float) -> dict:
+    """
+    Compute volatility, beta, correlation and historical VaR from a return window.
+
+    The benchmark is the last column of covariance and returns; weights cover the
+    holdings columns only.
+
+    Args:
+        covariance (np.ndarray): Covariance of daily returns, holdings then benchmark.
+        returns (np.ndarray): Daily returns (dates x columns), holdings then benchmark.
+        weights (np.ndarray): Market-value weight of each holding.
+        value (float): Market value of the portfolio.
+
+    Returns:
+        dict: Portfolio and per-holding figures plus the holdings correlation matrix.
+    """
+    holdings = covariance[:-1, :-1]
+    variances = np.diag(covariance)
+    volatility = np.sqrt(np.maximum(variances, 0) * TRADING_DAYS)
+    benchmark_variance = variances[-1]
+    betas = covariance[:-1, -1] / \
+        benchmark_variance if benchmark_variance > 0 else np.full(len(weights), np.nan)
+
+    std = np.sqrt(np.maximum(np.diag(holdings), 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = holdings / np.outer(std, std)
+    correlation[~np.isfinite(correlation)] = np.nan
+    np.fill_diagonal(correlation, np.where(std > 0, 1.0, np.nan))
+
+    portfolio_returns = returns[:, :-1] @ weights
+    value_at_risk = {}
+    for level in VAR_LEVELS:
+        loss = max(-float(np.percentile(portfolio_returns, (1 - level) * 100)), 0.0)
+        value_at_risk[f"{level:.0%}"] = {'return': round(loss, 6),
+                                         'amount': round(loss * value, 2)}
+
+    return {
+        'annualized_volatility': float(np.sqrt(max(weights @ holdings @ weights, 0) * TRADING_DAYS)),
+        'benchmark_volatility': float(volatility[-1]),
+        'beta': float(weights @ betas) if benchmark_variance > 0 else None,
+        'value_at_risk': value_at_risk,
+        'volatility': volatility[:-1],
+        'betas': betas,
+        'correlation': correlation,
+    }
+
+
+def _clean(values) -> list:
+    # Round an array for JSON, turning NaN into None
+    return [None if np.isnan(value) else round(float(value), 6) for value in np.ravel(values)]
+
+
+async def _load_window(db, keys: tuple, length: int) -> ReturnWindow:
+    # Return the cached window of these symbols, extended with any bars stored since
+    today = date.today()
+    window = windows.get((keys, length))
+    if window is not None and window.checked_on == today:
+        return window
+
+    # One load per window at a time, so concurrent requests never append the same bars twice
+    lock = window_locks.setdefault((keys, length), asyncio.Lock())
+    async with lock:
+        window = windows.get((keys, length))
+        if window is not None and window.checked_on == today:
+            return window
+
+        # Calendar days that comfortably cover `length` sessions plus holidays
+        start = today - timedelta(days=length * 7 // 5 + 30)
+        if window is not None and window.complete and len(window.dates):
+            start = window.dates[-1].item() + timedelta(days=1)
+        complete = await price_history.sync_closes(db, keys, start, today)
+        dates, closes = await price_history.load_closes(db, keys, start, today)
+
+        if window is None or not window.complete:
+            # Closes that were missing when an incomplete window was built are picked up by rebuilding it
+            windows.pop((keys, length), None)
+            if len(windows) >= MAX_WINDOWS:
+                evicted = next(iter(windows))
+                windows.pop(evicted)
+                window_locks.pop(evicted, None)
+            window = windows[(keys, length)] = ReturnWindow(length, len(keys))
+        window.extend(dates, closes)
+        window.complete = complete
+        window.checked_on = today if complete else None
+        return window
+
+
+async def get_portfolio_risk(db, user_id: int, length: int = TRADING_DAYS) -> dict:
+    """
+    Get volatility, beta against NIFTY 50, correlations and historical VaR of a user's holdings.
+
+    Args:
+        db (Session): The database session.
+        user_id (int): The user whose open holdings make up the portfolio.
+        length (int, optional): The number of daily returns in the window. Defaults to one year.
+
+    Returns:
+        dict: Portfolio figures, per-holding figures and the correlation matrix.
+    """
+    result = await db.execute(select(
+        models.HoldingsSummary.stock_ticker, models.HoldingsSummary.trade_exchange,
+        models.HoldingsSummary.total_quantity
+    ).where(models.HoldingsSummary.user_id == user_id, models.HoldingsSummary.total_quantity > 0))
+    quantities = {(row[0], row[1]): row[2] for row in result}
+
+    risk = {'as_of': None, 'observations': 0, 'window': length, 'benchmark': BENCHMARK[0],
+            'portfolio': None, 'holdings': [], 'correlation': {'symbols': [], 'matrix': []}}
+    if not quantities:
+        return risk
+
+    holdings = sorted(quantities)
+    window = await _load_window(db, tuple(holdings) + (BENCHMARK,), length)
+    covariance = window.covariance()
+    risk['observations'] = len(window.returns)
+    if covariance is None:
+        return risk
+
+    market_values = np.nan_to_num(
+        window.last_close[:-1]) * np.array([quantities[key] for key in holdings])
+    value = float(market_values.sum())
+    weights = market_values / value if value > 0 else np.zeros(len(holdings))
+    metrics = risk_metrics(covariance, window.returns, weights, value)
+
+    risk['as_of'] = str(window.dates[-1])
+    risk['portfolio'] = {
+        'market_value': round(value, 2),
+        'annualized_volatility': round(metrics['annualized_volatility'], 6),
+        'benchmark_volatility': round(metrics['benchmark_volatility'], 6),
+        'beta': None if metrics['beta'] is None or np.isnan(metrics['beta']) else round(metrics['beta'], 6),
+        'value_at_risk': metrics['value_at_risk'],
+    }
+    risk['holdings'] = [{
+        'stock_ticker': key[0], 'trade_exchange': key[1],
+        'weight': weight, 'annualized_volatility': volatility, 'beta': beta,
+    } for key, weight, volatility, beta in zip(
+        holdings, _clean(weights), _clean(metrics['volatility']), _clean(metrics['betas']))]
+    risk['correlation'] = {
+        'symbols': [key[0] for key in holdings],
+        'matrix': [_clean(row) for row in metrics['correlation']],
+    }
+    return risk
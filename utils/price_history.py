@@ -0,0 +1,178 @@
+from datetime import date, timedelta
+import numpy as np
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.future import select
+import models
+from utils import market_data, quote_router, rate_governor
+
+# (stock_ticker, trade_exchange) -> (day of the last sync, first date, last date covered),
+# so each symbol is checked against the upstream at most once a day per range
+synced = {}
+
+# Exchange name under which index closes are stored
+INDEX_EXCHANGE = quote_router.INDEX_EXCHANGE
+# Most symbols downloaded per batched history request; larger syncs are split
+BATCH_SIZE = quote_router.BATCH_SIZE
+
+
+def yahoo_symbol(stock_ticker: str, exchange: str = "NSE") -> str:
+    """
+    Return the Yahoo Finance symbol used for daily history of a stock or index.
+    """
+    return quote_router.yahoo_symbol(stock_ticker, exchange)
+
+
+def _insert_closes_statement(dialect: str):
+    # INSERT IGNORE (ON CONFLICT DO NOTHING on SQLite), so closes stored meanwhile by a
+    # concurrent sync of the same symbol are skipped instead of failing the whole sync
+    if dialect == "mysql":
+        return mysql.insert(models.DailyClose).prefix_with("IGNORE")
+    return sqlite.insert(models.DailyClose).on_conflict_do_nothing()
+
+
+def _is_synced(key, today: date, start: date, end: date) -> bool:
+    last_sync = synced.get(key)
+    return last_sync is not None and last_sync[0] == today and \
+        last_sync[1] <= start and last_sync[2] >= end
+
+
+def _fetch_start(stored_range, start: date) -> date:
+    # First date to download for a symbol given its stored (first, last) range
+    first, last = stored_range
+    if first is None or first > start:
+        return start
+    return last + timedelta(days=1)
+
+
+def _download_closes(keys, start: date, end: date) -> dict:
+    # One batched yfinance call for every symbol; returns {key: [(date, close), ...]}
+    symbols = {}
+    for key in keys:
+        try:
+            symbols[yahoo_symbol(*key)] = key
+        except KeyError:
+            print(f"No price history source for {key[0]} on {key[1]}")
+    if not symbols:
+        return {}
+    data = market_data.yfinance().download(
+        tickers=list(symbols), start=start.isoformat(), end=(end + timedelta(days=1)).isoformat(),
+        auto_adjust=False, progress=False, group_by='column', threads=True)
+    if data is None or data.empty:
+        return {}
+
+    closes = data['Close']
+    if getattr(closes, 'ndim', 2) == 1:
+        closes = closes.to_frame(name=next(iter(symbols)))
+
+    history = {}
+    for symbol, column in closes.items():
+        column = column.dropna()
+        history[symbols[symbol]] = [(timestamp.date(), float(close))
+                                    for timestamp, close in column.items()]
+    return history
+
+
+async def sync_closes(db, keys, start: date, end: date = None) -> bool:
+    """
+    Fetch and store any daily closes missing from the local price store.
+
+    Stored ranges are extended with batched upstream downloads of up to BATCH_SIZE
+    symbols each, covering every symbol that needs data. Only completed sessions
+    (before today) are stored; symbols of a failed batch are retried on the next sync.
+
+    Args:
+        db (Session): The database session.
+        keys (Iterable[tuple]): The (stock_ticker, trade_exchange) pairs to sync.
+        start (date): The first date that must be covered.
+        end (date, optional): The last date that must be covered. Defaults to yesterday.
+
+    Returns:
+        bool: False when a batch failed, so some stored ranges may still have gaps.
+    """
+    today = date.today()
+    end = min(end or today, today - timedelta(days=1))
+    keys = {key for key in keys if not _is_synced(key, today, start, end)}
+    if not keys or start > end:
+        return True
+
+    result = await db.execute(select(
+        models.DailyClose.stock_ticker, models.DailyClose.trade_exchange,
+        func.min(models.DailyClose.close_date), func.max(
+            models.DailyClose.close_date)
+    ).where(tuple_(models.DailyClose.stock_ticker, models.DailyClose.trade_exchange).in_(list(keys))
+            ).group_by(models.DailyClose.stock_ticker, models.DailyClose.trade_exchange))
+    stored = {(row[0], row[1]): (row[2], row[3]) for row in result}
+
+    missing = {}
+    for key in keys:
+        first, last = stored.get(key, (None, None))
+        if first is None or first > start or last < end:
+            missing[key] = (first, last)
+        else:
+            synced[key] = (today, start, end)
+    if not missing:
+        return True
+
+    # Symbols with the same fetch start share batches, so no batch downloads more history than needed
+    pending = sorted(missing, key=lambda key: _fetch_start(missing[key], start))
+    statement = _insert_closes_statement(db.bind.dialect.name)
+    fetched = []
+    complete = True
+    for offset in range(0, len(pending), BATCH_SIZE):
+        batch = pending[offset:offset + BATCH_SIZE]
+        fetch_start = min(_fetch_start(missing[key], start) for key in batch)
+        try:
+            history = await rate_governor.call(rate_governor.YAHOO, _download_closes, batch, fetch_start, end)
+        except Exception as e:
+            print(f"An error occurred while downloading daily closes: {e}")
+            complete = False
+            continue
+
+        rows = []
+        for key, closes in history.items():
+            first, last = missing[key]
+            rows.extend({'stock_ticker': key[0], 'trade_exchange': key[1], 'close_date': close_date, 'close': close}
+                        for close_date, close in closes
+                        if close_date <= end and (first is None or close_date < first or close_date > last))
+        if rows:
+            await db.execute(statement, rows)
+        fetched.extend(batch)
+    if not fetched:
+        return complete
+    await db.commit()
+    for key in fetched:
+        synced[key] = (today, start, end)
+    return complete
+
+
+async def load_closes(db, keys, start: date, end: date):
+    """
+    Load daily closes as a dense (dates x symbols) matrix.
+
+    Args:
+        db (Session): The database session.
+        keys (List[tuple]): The (stock_ticker, trade_exchange) pairs, in column order.
+        start (date): The first date to load.
+        end (date): The last date to load.
+
+    Returns:
+        tuple: (dates, closes) where dates is a datetime64[D] array of every date with
+        at least one close and closes is a float array with NaN where a symbol has no close.
+    """
+    columns = {key: i for i, key in enumerate(keys)}
+    result = await db.execute(select(
+        models.DailyClose.stock_ticker, models.DailyClose.trade_exchange,
+        models.DailyClose.close_date, models.DailyClose.close
+    ).where(tuple_(models.DailyClose.stock_ticker, models.DailyClose.trade_exchange).in_(list(keys)),
+            models.DailyClose.close_date >= start, models.DailyClose.close_date <= end))
+    rows = result.all()
+    if not rows:
+        return np.array([], dtype='datetime64[D]'), np.empty((0, len(keys)))
+
+    row_dates = np.array([row[2] for row in rows], dtype='datetime64[D]')
+    row_columns = np.array([columns[(row[0], row[1])] for row in rows])
+    dates, row_index = np.unique(row_dates, return_inverse=True)
+    closes = np.full((len(dates), len(keys)), np.nan)
+    closes[row_index, row_columns] = [row[3] for row in rows]
+    return dates, closes
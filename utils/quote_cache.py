@@ -0,0 +1,299 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import func
+from sqlalchemy.future import select
+import models
+from utils import cache_registry, quote_router
+
+# Seconds a fetched quote is served to every caller before it is refetched
+QUOTE_TTL = 15
+# Seconds between background refreshes of every subscribed symbol; 0 disables the loop
+REFRESH_INTERVAL = int(os.getenv("QUOTE_REFRESH_INTERVAL", "0"))
+
+# Latest quote per symbol: (stock_ticker, exchange) -> (fetched_at, quote, as_of), where
+# fetched_at is monotonic and as_of the UTC time of the fetch; expired quotes are kept
+# as the last known value for requests whose deadline passes
+quotes = {}
+# Symbols the last successful fetch returned no quote for: (stock_ticker, exchange) ->
+# fetched_at, dropped as soon as a quote comes back; the miss is trusted for QUOTE_TTL
+# like a quote, so unquotable symbols are not asked for on every request
+unavailable = {}
+# Upstream fetches in progress: (stock_ticker, exchange) -> the batch fetch covering it,
+# shared by every caller asking for the same symbol
+inflight = {}
+# Quote subscriptions: (stock_ticker, exchange) -> Counter({user_id: references}),
+# where each held trade and each watchlist entry of a user is one reference
+subscriptions = {}
+
+
+def quote_key(stock_ticker: str, exchange: str = "NSE") -> tuple:
+    """
+    Return the cache key of a symbol.
+    """
+    return (stock_ticker.upper(), (exchange or "NSE").upper())
+
+
+def subscribe(user_id: int, keys):
+    """
+    Add one reference from a user to each (stock_ticker, exchange) in keys.
+    """
+    for key in keys:
+        subscriptions.setdefault(quote_key(*key), Counter())[user_id] += 1
+
+
+def unsubscribe(user_id: int, keys):
+    """
+    Drop one reference from a user to each (stock_ticker, exchange) in keys.
+
+    A symbol leaves the subscription set once nobody references it.
+    """
+    for key in keys:
+        key = quote_key(*key)
+        subscribers = subscriptions.get(key)
+        if subscribers is None or subscribers[user_id] <= 0:
+            continue
+        subscribers[user_id] -= 1
+        if subscribers[user_id] <= 0:
+            del subscribers[user_id]
+        if not subscribers:
+            del subscriptions[key]
+
+
+def subscribed_keys() -> list:
+    """
+    Return every distinct symbol that at least one user holds or watches.
+    """
+    return list(subscriptions)
+
+
+def apply_trade_changes(old_trades, new_trades):
+    """
+    Move held-ticker subscriptions from the old to the new version of changed trades.
+    """
+    for trade in old_trades:
+        unsubscribe(trade['user_id'], [
+                    (trade['stock_ticker'], trade['trade_exchange'])])
+    for trade in new_trades:
+        subscribe(trade['user_id'], [
+                  (trade['stock_ticker'], trade['trade_exchange'])])
+
+
+async def _fetch(keys):
+    try:
+        fetched = await quote_router.fetch_quotes(keys)
+        fetched_at = time.monotonic()
+        as_of = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        for key, quote in fetched.items():
+            quotes[key] = (fetched_at, quote, as_of)
+        for key in keys:
+            if key in fetched:
+                unavailable.pop(key, None)
+            else:
+                unavailable[key] = fetched_at
+        return fetched
+    finally:
+        task = asyncio.current_task()
+        for key in keys:
+            if inflight.get(key) is task:
+                del inflight[key]
+
+
+def _fetch_tasks(keys) -> dict:
+    # The upstream fetch of each symbol, shared by every caller; symbols not being fetched
+    # yet are fetched together, in one batched request per exchange
+    tasks = {key: inflight[key] for key in keys if key in inflight}
+    missing = [key for key in keys if key not in tasks]
+    if missing:
+        task = asyncio.ensure_future(_fetch(missing))
+        # Callers that stopped waiting must not leave the failure unretrieved
+        task.add_done_callback(
+            lambda done: done.cancelled() or done.exception())
+        for key in missing:
+            inflight[key] = tasks[key] = task
+    return tasks
+
+
+def _tagged(entry, stale: bool) -> dict:
+    # A copy of a cached quote tagged with its freshness
+    fetched_at, quote, as_of = entry
+    return {**quote, 'stale': stale, 'as_of': as_of}
+
+
+def is_fresh(entry) -> bool:
+    return entry is not None and time.monotonic() - entry[0] < QUOTE_TTL
+
+
+def is_unavailable(key) -> bool:
+    # Whether a symbol was found to have no quote within the last QUOTE_TTL
+    missed_at = unavailable.get(key)
+    return missed_at is not None and time.monotonic() - missed_at < QUOTE_TTL
+
+
+def snapshot_version(keys) -> tuple:
+    """
+    Return the version of the cached quotes of some symbols, without fetching anything.
+
+    Args:
+        keys (Iterable[tuple]): Normalized (stock_ticker, exchange) keys.
+
+    Returns:
+        tuple: (the fetch time of each symbol's quote and of the last fetch that found no
+        quote for it, None when there is none; whether every symbol is fresh, i.e. has a
+        fresh quote or was found to have none within QUOTE_TTL). The first item changes
+        whenever one of the quotes does.
+    """
+    keys = list(keys)
+    version = tuple((entry[0] if entry is not None else None, unavailable.get(key))
+                    for key, entry in zip(keys, map(quotes.get, keys)))
+    return version, all(is_fresh(quotes.get(key)) or is_unavailable(key) for key in keys)
+
+
+async def get_quote(stock_ticker: str, exchange: str = "NSE", deadline=None):
+    """
+    Get the latest quote of a symbol, fetching it upstream at most once per TTL.
+
+    Callers that arrive while a fetch is in progress wait for that fetch instead of
+    starting their own.
+
+    Args:
+        stock_ticker (str): The stock ticker.
+        exchange (str, optional): The exchange. Defaults to "NSE".
+        deadline (request_budget.Deadline, optional): Answer from the last known quote
+            once this passes. Defaults to waiting for the fetch.
+
+    Returns:
+        dict: The quote built by quote_router.build_quote tagged with "stale" and "as_of",
+        or None when the fetch failed or missed the deadline and no quote is known.
+    """
+    return (await get_quotes([(stock_ticker, exchange)], deadline))[quote_key(stock_ticker, exchange)]
+
+
+async def get_quotes(keys, deadline=None) -> dict:
+    """
+    Get quotes for many symbols, fetching the stale ones in one batched upstream
+    request per exchange.
+
+    Fetches still running when the deadline passes keep running in the background
+    to refresh the cache, and their symbols are answered from the last known quote
+    tagged "stale": True.
+
+    Args:
+        keys (Iterable[tuple]): The (stock_ticker, exchange) pairs, duplicates allowed.
+        deadline (request_budget.Deadline, optional): The request's deadline. Defaults to
+            waiting for every fetch.
+
+    Returns:
+        dict: {(stock_ticker, exchange): quote tagged with "stale" and "as_of"}, with None
+        for symbols that have no quote at all.
+    """
+    fetched = {}
+    stale = []
+    for key in dict.fromkeys(quote_key(*key) for key in keys):
+        entry = quotes.get(key)
+        if is_fresh(entry):
+            cache_registry.hit("quotes")
+            fetched[key] = _tagged(entry, stale=False)
+        elif is_unavailable(key):
+            # Asked for within QUOTE_TTL and not quoted, so not asked for again yet
+            cache_registry.hit("quotes")
+            fetched[key] = _tagged(entry, stale=True) if entry is not None else None
+        else:
+            cache_registry.miss("quotes")
+            stale.append(key)
+    if not stale:
+        return fetched
+
+    pending = _fetch_tasks(stale)
+    timeout = None if deadline is None else deadline.remaining()
+    done, _ = await asyncio.wait(set(pending.values()), timeout=timeout)
+    for key, task in pending.items():
+        if task in done and not task.cancelled() and task.exception() is None and key in task.result():
+            fetched[key] = _tagged(quotes[key], stale=False)
+            continue
+        if task in done and (task.cancelled() or task.exception() is not None):
+            print(f"An error occurred while fetching the quote of {key[0]}: "
+                  f"{'cancelled' if task.cancelled() else task.exception()}")
+        entry = quotes.get(key)
+        fetched[key] = _tagged(entry, stale=True) if entry is not None else None
+    return fetched
+
+
+async def refresh_subscribed() -> int:
+    """
+    Refresh every subscribed symbol whose quote has expired, once per symbol.
+
+    Returns:
+        int: The number of subscribed symbols.
+    """
+    keys = subscribed_keys()
+    await get_quotes(keys)
+    return len(keys)
+
+
+async def refresh_loop(interval: int = REFRESH_INTERVAL):
+    """
+    Keep subscribed quotes warm so page loads are served from the cache.
+    """
+    while True:
+        try:
+            await refresh_subscribed()
+        except Exception as e:
+            print(f"An error occurred while refreshing subscribed quotes: {e}")
+        await asyncio.sleep(interval)
+
+
+async def load_subscriptions(db) -> int:
+    """
+    Build the subscription set from held trades and watchlist entries.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        int: The number of distinct subscribed symbols.
+    """
+    subscriptions.clear()
+    held = await db.execute(select(
+        models.TradeEntry.user_id, models.TradeEntry.stock_ticker, models.TradeEntry.trade_exchange,
+        func.count()
+    ).group_by(models.TradeEntry.user_id, models.TradeEntry.stock_ticker, models.TradeEntry.trade_exchange))
+    watched = await db.execute(select(
+        models.Watchlist.user_id, models.WatchlistSymbol.stock_ticker, models.WatchlistSymbol.trade_exchange,
+        func.count()
+    ).join(models.WatchlistSymbol, models.WatchlistSymbol.watchlist_id == models.Watchlist.watchlist_id
+           ).group_by(models.Watchlist.user_id, models.WatchlistSymbol.stock_ticker, models.WatchlistSymbol.trade_exchange))
+    for user_id, stock_ticker, exchange, references in list(held) + list(watched):
+        if stock_ticker:
+            subscriptions.setdefault(quote_key(stock_ticker, exchange), Counter())[
+                user_id] += references
+    return len(subscriptions)
+
+
+def _entry_key(key: str) -> tuple:
+    # "TICKER:EXCHANGE" as shown by the admin endpoints
+    stock_ticker, _, exchange = key.partition(":")
+    return quote_key(stock_ticker, exchange or "NSE")
+
+
+def _cache_entries() -> dict:
+    now = time.monotonic()
+    return {f"{key[0]}:{key[1]}": (1, now - entry[0]) for key, entry in quotes.items()}
+
+
+def _evict(key: str) -> bool:
+    unavailable.pop(_entry_key(key), None)
+    return quotes.pop(_entry_key(key), None) is not None
+
+
+async def _refresh(key: str):
+    key = _entry_key(key)
+    if key not in (await _fetch_tasks([key])[key]):
+        raise LookupError(f"No quote returned for {key[0]} on {key[1]}")
+
+
+# Quotes of every held and watched symbol
+cache_registry.register("quotes", _cache_entries, _evict, _refresh,
+                        warm=refresh_subscribed)
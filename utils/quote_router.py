@@ -0,0 +1,163 @@
+import asyncio
+from utils import intraday, market_data, rate_governor, target_alerts
+
+# Yahoo Finance suffix of the listings of each exchange
+EXCHANGE_SUFFIXES = {
+    "NSE": ".NS",
+    "BSE": ".BO",
+}
+# Exchange name under which indices are stored, and their Yahoo Finance symbols
+INDEX_EXCHANGE = "INDEX"
+INDEX_SYMBOLS = {
+    "NIFTY 50": "^NSEI",
+    "NIFTY BANK": "^NSEBANK",
+}
+# Most symbols in one batched quote request; larger groups are split
+BATCH_SIZE = 200
+# Daily bars downloaded per quote request: enough to find the previous close across
+# weekends and holidays
+QUOTE_PERIOD = "5d"
+
+
+def yahoo_symbol(stock_ticker: str, exchange: str = "NSE") -> str:
+    """
+    Return the Yahoo Finance symbol of a stock or index listed on an exchange.
+
+    Raises:
+        KeyError: If the exchange, or the index, has no Yahoo Finance symbol.
+    """
+    exchange = (exchange or "NSE").upper()
+    if exchange == INDEX_EXCHANGE:
+        return INDEX_SYMBOLS[stock_ticker]
+    return f"{stock_ticker}{EXCHANGE_SUFFIXES[exchange]}"
+
+
+def build_quote(stock_ticker: str, exchange: str, current_price, previous_close) -> dict:
+    """
+    Format a quote and feed its price to the target-price alerts and the intraday series.
+
+    Returns:
+        dict: The numeric last price and the formatted current price, change in price,
+        and percentage change (None when a price is missing).
+    """
+    if current_price is not None:
+        # Every observed price is a tick for the target-price alert engine and the intraday series
+        target_alerts.engine.dispatch(
+            target_alerts.engine.process_tick(stock_ticker, current_price))
+        intraday.record(stock_ticker, exchange, current_price)
+
+    if current_price is not None and previous_close is not None:
+        price_change = current_price - previous_close
+        percentage_change = (price_change / previous_close) * 100
+
+        current_price_str = f"₹{current_price:.2f}"
+        price_change_str = f"{'+' if price_change > 0 else ''}{price_change:.2f}"
+        percentage_change_str = f"{'+' if percentage_change > 0 else ''}{percentage_change:.2f}%"
+    else:
+        current_price_str = None
+        price_change_str = None
+        percentage_change_str = None
+
+    return {
+        'last_price': current_price,
+        'current_price': current_price_str,
+        'price_change': price_change_str,
+        'percentage_change': percentage_change_str
+    }
+
+
+def closes_from_frame(data, symbols) -> dict:
+    """
+    Return {symbol: (last close, previous close)} from a yfinance download of daily bars.
+
+    The last bar of a session in progress holds the live price. Symbols without any
+    bar are left out; the previous close is None when there is a single bar.
+    """
+    closes = data['Close']
+    if getattr(closes, 'ndim', 2) == 1:
+        closes = closes.to_frame(name=symbols[0])
+    latest = {}
+    for symbol, column in closes.items():
+        column = column.dropna()
+        if len(column):
+            latest[symbol] = (float(column.iloc[-1]), float(column.iloc[-2]) if len(column) > 1 else None)
+    return latest
+
+
+def download_quotes(symbols) -> dict:
+    """
+    Download the last and previous close of many Yahoo Finance symbols in one yfinance call.
+
+    Returns:
+        dict: {symbol: (last close, previous close)}, see closes_from_frame.
+    """
+    data = market_data.yfinance().download(
+        tickers=list(symbols), period=QUOTE_PERIOD, interval='1d',
+        auto_adjust=False, progress=False, group_by='column', threads=True)
+    if data is None or data.empty:
+        return {}
+    return closes_from_frame(data, list(symbols))
+
+
+def route(keys) -> list:
+    """
+    Group symbols into per-exchange batches of upstream symbols.
+
+    Args:
+        keys (Iterable[tuple]): The (stock_ticker, exchange) pairs.
+
+    Returns:
+        List[dict]: One {Yahoo Finance symbol: (stock_ticker, exchange)} per batch, each
+        holding at most BATCH_SIZE symbols of a single exchange. Symbols of exchanges
+        without a Yahoo Finance listing are left out.
+    """
+    exchanges = {}
+    for key in keys:
+        try:
+            symbol = yahoo_symbol(*key)
+        except KeyError:
+            print(f"No quote source for {key[0]} on {key[1]}")
+            continue
+        exchanges.setdefault((key[1] or "NSE").upper(), {})[symbol] = key
+    batches = []
+    for symbols in exchanges.values():
+        items = list(symbols.items())
+        for start in range(0, len(items), BATCH_SIZE):
+            batches.append(dict(items[start:start + BATCH_SIZE]))
+    return batches
+
+
+async def fetch_quotes(keys) -> dict:
+    """
+    Fetch quotes for many symbols with one batched upstream request per exchange.
+
+    A mixed NSE/BSE portfolio costs two upstream requests however many symbols it
+    holds (plus one per BATCH_SIZE symbols beyond the first batch).
+
+    Args:
+        keys (Iterable[tuple]): The (stock_ticker, exchange) pairs.
+
+    Raises:
+        Exception: The error of the first failed batch, if no batch succeeded.
+
+    Returns:
+        dict: {(stock_ticker, exchange): quote as built by build_quote}; symbols the
+        upstream returned nothing for are left out.
+    """
+    batches = route(keys)
+    results = await asyncio.gather(*[rate_governor.call(rate_governor.YAHOO, download_quotes, list(batch))
+                                     for batch in batches], return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors and len(errors) == len(batches):
+        raise errors[0]
+
+    quotes = {}
+    for batch, result in zip(batches, results):
+        if isinstance(result, BaseException):
+            print(f"An error occurred while fetching quotes of {', '.join(batch)}: {result}")
+            continue
+        for symbol, (current_price, previous_close) in result.items():
+            key = batch.get(symbol)
+            if key is not None:
+                quotes[key] = build_quote(key[0], key[1], current_price, previous_close)
+    return quotes
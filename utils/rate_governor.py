@@ -0,0 +1,250 @@
+import asyncio
+import time
+
+# Upstream hosts reached through market-data libraries rather than http_client
+YAHOO = "finance.yahoo.com"
+NSE = "www.nseindia.com"
+
+# Requests per second and burst allowed per upstream host before any throttling is seen
+UPSTREAM_LIMITS = {
+    YAHOO: (5.0, 10),
+    NSE: (2.0, 4),
+    "logo.clearbit.com": (100.0, 100),
+}
+DEFAULT_LIMIT = (10.0, 10)
+# The rate never adapts below this share of the host's limit
+MIN_RATE_RATIO = 0.05
+# Rate multipliers after a throttled (429) response and after any other failure
+THROTTLE_DECREASE = 0.5
+ERROR_DECREASE = 0.8
+# Successes needed to climb from the minimum back to the full rate
+RECOVERY_SUCCESSES = 20
+# Seconds a caller may queue for a token before it fails fast instead
+MAX_WAIT = 5.0
+# Consecutive failures that open the circuit, and seconds it stays open (doubling on
+# every failed probe, up to MAX_OPEN_SECONDS)
+FAILURE_THRESHOLD = 5
+OPEN_SECONDS = 30.0
+MAX_OPEN_SECONDS = 300.0
+
+# One governor per upstream host, created on first use
+governors = {}
+
+
+class UpstreamUnavailable(Exception):
+    """
+    Raised instead of calling an upstream whose circuit is open or whose queue is too long.
+    """
+
+
+def is_throttled(error: BaseException) -> bool:
+    """
+    Return whether an upstream library error reports rate limiting (HTTP 429).
+    """
+    text = f"{type(error).__name__} {error}".lower()
+    return "429" in text or "too many requests" in text or "ratelimit" in text or "rate limit" in text
+
+
+class Governor:
+    """
+    Token bucket with adaptive rate and a circuit breaker for one upstream host.
+
+    The rate halves on every throttled response, shrinks on other failures and climbs
+    back additively on successes. After FAILURE_THRESHOLD consecutive failures the
+    circuit opens and callers fail fast, so they answer from their caches; once the
+    open period ends a single probe request decides whether it closes again.
+
+    Args:
+        host (str): The upstream host.
+        rate (float): Requests per second when the upstream is healthy.
+        burst (int): Requests allowed back to back before the rate applies.
+    """
+
+    def __init__(self, host: str, rate: float, burst: int):
+        self.host = host
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        # Monotonic time before which no request is sent, e.g. from a Retry-After header
+        self.paused_until = 0.0
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.open_seconds = OPEN_SECONDS
+        self.probing = False
+        self.counters = dict.fromkeys(
+            ('requests', 'successes', 'failures', 'throttled', 'rejected', 'circuit_opened'), 0)
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def _admit(self, now: float) -> bool:
+        # Whether the circuit lets a request through, moving open -> half open when due
+        if self.state == "closed":
+            return True
+        if self.state == "open" and now - self.opened_at >= self.open_seconds:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    async def acquire(self, max_wait: float = MAX_WAIT):
+        """
+        Wait for a token to send one request.
+
+        Tokens are reserved on arrival, so callers are served in order and the wait is
+        known up front.
+
+        Args:
+            max_wait (float, optional): Seconds the caller may queue, or None to wait as long
+                as needed (bulk jobs). Defaults to MAX_WAIT.
+
+        Raises:
+            UpstreamUnavailable: If the circuit is open or the wait would exceed max_wait.
+        """
+        now = time.monotonic()
+        if not self._admit(now):
+            self.counters['rejected'] += 1
+            raise UpstreamUnavailable(f"{self.host} is unavailable (circuit {self.state})")
+        self._refill(now)
+        wait = max((1 - self.tokens) / self.rate, self.paused_until - now, 0.0)
+        if max_wait is not None and wait > max_wait:
+            self.probing = False
+            self.counters['rejected'] += 1
+            raise UpstreamUnavailable(f"{self.host} is throttled, next request in {wait:.1f}s")
+        self.tokens -= 1
+        self.counters['requests'] += 1
+        if wait > 0:
+            self.waited_seconds += wait
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.abandoned()
+                raise
+
+    def pause(self, seconds: float):
+        """
+        Send nothing to the upstream for the given seconds, e.g. as asked by Retry-After.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def succeeded(self):
+        """
+        Record a response from the upstream that was not a failure.
+        """
+        self.counters['successes'] += 1
+        self.failures = 0
+        self.rate = min(self.max_rate, self.rate + self.max_rate / RECOVERY_SUCCESSES)
+        if self.state != "closed":
+            print(f"Upstream {self.host} recovered, closing its circuit")
+        self.state, self.probing, self.open_seconds = "closed", False, OPEN_SECONDS
+
+    def failed(self, throttled: bool = False):
+        """
+        Record a failed request, slowing down and opening the circuit when failures persist.
+
+        Args:
+            throttled (bool, optional): The upstream rate limited the request. Defaults to False.
+        """
+        self._refill(time.monotonic())
+        self.counters['failures'] += 1
+        self.counters['throttled'] += throttled
+        self.failures += 1
+        self.rate = max(self.max_rate * MIN_RATE_RATIO,
+                        self.rate * (THROTTLE_DECREASE if throttled else ERROR_DECREASE))
+        if self.state == "half_open":
+            self.open_seconds = min(self.open_seconds * 2, MAX_OPEN_SECONDS)
+            self._open()
+        elif self.state == "closed" and self.failures >= FAILURE_THRESHOLD:
+            self._open()
+
+    def abandoned(self):
+        """
+        Record a request whose outcome is unknown (e.g. cancelled), freeing the probe slot.
+        """
+        self.probing = False
+
+    def _open(self):
+        print(f"Upstream {self.host} is failing, opening its circuit for {self.open_seconds:.0f}s")
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.probing = False
+        self.counters['circuit_opened'] += 1
+
+    def reset(self):
+        """
+        Close the circuit and restore the full rate.
+        """
+        self.rate = self.max_rate
+        self.failures = 0
+        self.paused_until = 0.0
+        self.state, self.probing, self.open_seconds = "closed", False, OPEN_SECONDS
+
+    def describe(self) -> dict:
+        """
+        Return the state and counters of the governor.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        retry_in = None
+        if self.state == "open":
+            retry_in = round(max(self.opened_at + self.open_seconds - now, 0.0), 3)
+        return {
+            'host': self.host,
+            'state': self.state,
+            'rate': round(self.rate, 3),
+            'max_rate': self.max_rate,
+            'burst': self.burst,
+            'tokens': round(self.tokens, 3),
+            'consecutive_failures': self.failures,
+            'retry_in_seconds': retry_in,
+            'paused_for_seconds': round(max(self.paused_until - now, 0.0), 3),
+            **self.counters,
+            'waited_seconds': round(self.waited_seconds, 3),
+        }
+
+
+def governor(host: str) -> Governor:
+    """
+    Return the governor of an upstream host, creating it on first use.
+    """
+    instance = governors.get(host)
+    if instance is None:
+        instance = governors[host] = Governor(host, *UPSTREAM_LIMITS.get(host, DEFAULT_LIMIT))
+    return instance
+
+
+async def call(host: str, fn, *args, max_wait: float = MAX_WAIT):
+    """
+    Run a blocking upstream call (a market-data library call) in a thread under the
+    host's governor.
+
+    Args:
+        host (str): The upstream host, e.g. YAHOO or NSE.
+        fn (Callable): The blocking call.
+        *args: Passed to fn.
+        max_wait (float, optional): See Governor.acquire. Defaults to MAX_WAIT.
+
+    Raises:
+        UpstreamUnavailable: If the circuit is open or the host is throttled beyond max_wait.
+
+    Returns:
+        The result of fn.
+    """
+    upstream = governor(host)
+    await upstream.acquire(max_wait)
+    try:
+        result = await asyncio.to_thread(fn, *args)
+    except asyncio.CancelledError:
+        upstream.abandoned()
+        raise
+    except Exception as e:
+        upstream.failed(throttled=is_throttled(e))
+        raise
+    upstream.succeeded()
+    return result
@@ -0,0 +1,46 @@
+import asyncio
+import os
+import time
+
+# Seconds a request may spend waiting on upstream market data before it answers
+# with the last known values instead
+DEFAULT_BUDGET = float(os.getenv("REQUEST_BUDGET_SECONDS", "2.5"))
+
+
+class Deadline:
+    """
+    The point in time by which a request must have its upstream data.
+
+    Created once per request and passed down to every upstream call, so the
+    request's latency is bounded by its budget rather than by the slowest upstream.
+    """
+    __slots__ = ("expires_at",)
+
+    def __init__(self, budget: float = DEFAULT_BUDGET):
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        """
+        Return the seconds left before the deadline, never negative.
+        """
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+
+async def within(deadline: Deadline, awaitable):
+    """
+    Await an upstream call, raising asyncio.TimeoutError once the deadline passes.
+
+    Args:
+        deadline (Deadline): The request's deadline, or None to wait indefinitely.
+        awaitable: The upstream call.
+
+    Returns:
+        Any: The result of the call.
+    """
+    if deadline is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, deadline.remaining())
@@ -0,0 +1,341 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime, timezone
+from typing import NamedTuple
+from sqlalchemy import or_, update
+from sqlalchemy.future import select
+import models
+import database
+from utils import email_service
+
+# Alert directions
+UPSIDE = "UP"
+DOWNSIDE = "DOWN"
+
+# Minimum number of lazily-deleted entries before a heap is rebuilt
+COMPACT_MIN_STALE = 64
+# Trade fields whose change re-arms a target that already fired
+TARGET_FIELDS = ('stock_ticker', 'target_price', 'price_per_stock', 'trade_side')
+
+
+class TargetAlert(NamedTuple):
+    """
+    A triggered target-price alert for a single trade.
+    """
+    trade_id: int
+    user_id: int
+    stock_ticker: str
+    direction: str
+    target_price: float
+    entry_price: float
+    triggered_price: float
+
+
+class _OpenTarget(NamedTuple):
+    symbol: str
+    seq: int
+    user_id: int
+    direction: str
+    target_price: float
+    entry_price: float
+
+
+class _SymbolTargets:
+    """
+    Upside and downside targets for one symbol.
+
+    Upside targets live in a min-heap of (target, seq, trade_id) and fire when the
+    price rises to or above the smallest target. Downside targets live in a max-heap
+    (stored negated) and fire when the price falls to or below the largest target.
+    Removed targets are deleted lazily and skipped when they reach the top.
+    """
+    __slots__ = ("upside", "downside", "stale_upside", "stale_downside")
+
+    def __init__(self):
+        self.upside = []
+        self.downside = []
+        self.stale_upside = 0
+        self.stale_downside = 0
+
+
+class TargetAlertEngine:
+    """
+    Index of open trade targets that evaluates price ticks in O(log n + hits).
+    """
+
+    def __init__(self):
+        self._books = {}
+        self._open = {}
+        self._seq = itertools.count()
+        self._hooks = []
+        self._pending = set()
+
+    def __len__(self):
+        return len(self._open)
+
+    def add_target(self, trade_id: int, user_id: int, stock_ticker: str, target_price, entry_price=None):
+        """
+        Index (or re-index) the target of a trade.
+
+        Args:
+            trade_id (int): The trade the target belongs to.
+            user_id (int): The owner of the trade.
+            stock_ticker (str): The stock ticker.
+            target_price (float): The target price. Trades without a target are ignored.
+            entry_price (float, optional): The entry price, used to decide the direction.
+        """
+        self.remove_target(trade_id)
+        if not stock_ticker or target_price is None or target_price <= 0:
+            return
+
+        symbol = stock_ticker.upper()
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = _SymbolTargets()
+
+        seq = next(self._seq)
+        if entry_price is None or target_price >= entry_price:
+            direction = UPSIDE
+            heapq.heappush(book.upside, (target_price, seq, trade_id))
+        else:
+            direction = DOWNSIDE
+            heapq.heappush(book.downside, (-target_price, seq, trade_id))
+
+        self._open[trade_id] = _OpenTarget(
+            symbol, seq, user_id, direction, target_price, entry_price)
+
+    def add_trade(self, trade):
+        """
+        Index the target of a TradeEntry model or trade dictionary. Sell trades and targets
+        that already fired have no open target.
+        """
+        if isinstance(trade, dict):
+            get = trade.get
+        else:
+            def get(key): return getattr(trade, key, None)
+        # Targets only apply to the lots a trade opens
+        if (get('trade_side') or 'BUY').upper() != 'BUY' or get('target_hit_at') is not None:
+            self.remove_target(get('trade_id'))
+            return
+        self.add_target(get('trade_id'), get('user_id'), get('stock_ticker'),
+                        get('target_price'), get('price_per_stock'))
+
+    def remove_target(self, trade_id: int) -> bool:
+        """
+        Stop tracking the target of a trade.
+
+        Returns:
+            bool: True if the trade had an open target.
+        """
+        target = self._open.pop(trade_id, None)
+        if target is None:
+            return False
+
+        book = self._books[target.symbol]
+        if target.direction == UPSIDE:
+            book.stale_upside += 1
+        else:
+            book.stale_downside += 1
+        self._compact(target.symbol, book)
+        return True
+
+    def _compact(self, symbol: str, book: _SymbolTargets):
+        # Drop lazily-deleted entries once they dominate a heap
+        if book.stale_upside > COMPACT_MIN_STALE and book.stale_upside * 2 > len(book.upside):
+            book.upside = [entry for entry in book.upside if self._is_live(entry)]
+            heapq.heapify(book.upside)
+            book.stale_upside = 0
+        if book.stale_downside > COMPACT_MIN_STALE and book.stale_downside * 2 > len(book.downside):
+            book.downside = [
+                entry for entry in book.downside if self._is_live(entry)]
+            heapq.heapify(book.downside)
+            book.stale_downside = 0
+        if not book.upside and not book.downside:
+            del self._books[symbol]
+
+    def _is_live(self, entry) -> bool:
+        target = self._open.get(entry[2])
+        return target is not None and target.seq == entry[1]
+
+    def process_tick(self, stock_ticker: str, price: float):
+        """
+        Evaluate one price tick against the open targets of a symbol.
+
+        Triggered targets are removed from the index, so each target fires once.
+
+        Args:
+            stock_ticker (str): The stock ticker.
+            price (float): The latest traded price.
+
+        Returns:
+            List[TargetAlert]: The alerts triggered by this tick.
+        """
+        if price is None:
+            return []
+        book = self._books.get(stock_ticker.upper())
+        if book is None:
+            return []
+
+        alerts = []
+        upside = book.upside
+        while upside and upside[0][0] <= price:
+            entry = heapq.heappop(upside)
+            if not self._is_live(entry):
+                book.stale_upside -= 1
+                continue
+            alerts.append(self._fire(entry[2], price))
+
+        downside = book.downside
+        while downside and -downside[0][0] >= price:
+            entry = heapq.heappop(downside)
+            if not self._is_live(entry):
+                book.stale_downside -= 1
+                continue
+            alerts.append(self._fire(entry[2], price))
+
+        if not upside and not downside:
+            self._books.pop(stock_ticker.upper(), None)
+        return alerts
+
+    def process_ticks(self, prices: dict):
+        """
+        Evaluate a tick cycle of {stock_ticker: price}.
+
+        Returns:
+            List[TargetAlert]: The alerts triggered by this cycle.
+        """
+        alerts = []
+        for stock_ticker, price in prices.items():
+            if stock_ticker.upper() in self._books:
+                alerts.extend(self.process_tick(stock_ticker, price))
+        return alerts
+
+    def _fire(self, trade_id: int, price: float) -> TargetAlert:
+        target = self._open.pop(trade_id)
+        return TargetAlert(trade_id, target.user_id, target.symbol, target.direction,
+                           target.target_price, target.entry_price, price)
+
+    def register_hook(self, hook):
+        """
+        Register a notification hook called with each batch of triggered alerts.
+
+        Hooks may be plain functions or coroutine functions taking a list of TargetAlert.
+        """
+        self._hooks.append(hook)
+        return hook
+
+    def dispatch(self, alerts):
+        """
+        Record triggered alerts as fired and send the ones this worker recorded to the
+        notification hooks, without blocking the caller.
+        """
+        if not alerts:
+            return
+        task = asyncio.get_running_loop().create_task(self._notify(list(alerts)))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _notify(self, alerts):
+        # Recorded before any hook runs, so a fired target is never indexed again on
+        # restart whichever hooks are registered or fail
+        try:
+            alerts = await record_hits(alerts)
+        except Exception as e:
+            print(f"Failed to record triggered targets: {e}")
+            return
+        if not alerts:
+            return
+        for hook in self._hooks:
+            try:
+                result = hook(alerts)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                print(f"Target alert hook {hook!r} failed: {e}")
+
+
+# Shared engine used by the routers and quote fetchers
+engine = TargetAlertEngine()
+
+
+def rearms(old_trade: dict, changes: dict) -> bool:
+    """
+    Check whether changes to a trade make its target a new one, to be armed again even
+    if the old target already fired.
+    """
+    return any(field in changes and changes[field] != old_trade.get(field) for field in TARGET_FIELDS)
+
+
+async def record_hits(alerts):
+    """
+    Record the time triggered targets fired, so they are not indexed again on restart.
+
+    A target is recorded once: when several workers see it fire, only the first one to
+    record it gets it back.
+
+    Args:
+        alerts (List[TargetAlert]): The triggered alerts.
+
+    Returns:
+        List[TargetAlert]: The alerts recorded by this call.
+    """
+    hit_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    recorded = []
+    async with database.async_session() as db:
+        for alert in alerts:
+            result = await db.execute(update(models.TradeEntry).where(
+                models.TradeEntry.trade_id == alert.trade_id,
+                models.TradeEntry.target_hit_at.is_(None)).values(target_hit_at=hit_at))
+            if result.rowcount:
+                recorded.append(alert)
+        await db.commit()
+    return recorded
+
+
+async def load_open_targets(db):
+    """
+    Index every trade whose target price has not fired yet.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        int: The number of open targets indexed.
+    """
+    result = await db.execute(select(
+        models.TradeEntry.trade_id, models.TradeEntry.user_id, models.TradeEntry.stock_ticker,
+        models.TradeEntry.target_price, models.TradeEntry.price_per_stock
+    ).where(models.TradeEntry.target_price.is_not(None), models.TradeEntry.target_hit_at.is_(None),
+            or_(models.TradeEntry.trade_side.is_(None), models.TradeEntry.trade_side == 'BUY')))
+    for row in result:
+        engine.add_target(row.trade_id, row.user_id, row.stock_ticker,
+                          row.target_price, row.price_per_stock)
+    return len(engine)
+
+
+@engine.register_hook
+def log_alerts(alerts):
+    """
+    Default notification hook that logs each triggered alert.
+    """
+    for alert in alerts:
+        print(f"Target {alert.direction} hit for trade {alert.trade_id} ({alert.stock_ticker}): "
+              f"target {alert.target_price}, price {alert.triggered_price}")
+
+
+@engine.register_hook
+async def email_alerts(alerts):
+    """
+    Notification hook that emails each trade owner about their triggered alerts.
+    """
+    user_ids = {alert.user_id for alert in alerts}
+    async with database.async_session() as db:
+        result = await db.execute(select(models.User).where(models.User.user_id.in_(user_ids)))
+        users = {user.user_id: user for user in result.scalars().all()}
+
+    for alert in alerts:
+        user = users.get(alert.user_id)
+        if user is not None:
+            await email_service.send_target_alert_email(user.email, user.username, alert)
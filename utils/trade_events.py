@@ -0,0 +1,72 @@
+from fastapi import HTTPException, status
+from utils import equity_curve, holdings_summary, leaderboard, lot_matching, object_as_dict, portfolio_cache, quote_cache, target_alerts
+
+
+def snapshot(trade) -> dict:
+    """
+    Convert a TradeEntry model into a plain dictionary that outlives the session.
+    """
+    return object_as_dict.object_as_dict(trade)
+
+
+async def before_commit(db, old_trades, new_trades) -> dict:
+    """
+    Maintain the derived tables of a trade change inside its transaction.
+
+    Call after the change has been flushed and before it is committed, so the
+    derived state commits or rolls back together with the trades.
+
+    Args:
+        db (Session): The database session.
+        old_trades (List[dict]): Snapshots of the affected trades before the change.
+        new_trades (List[dict]): Snapshots of the affected trades after the change.
+
+    Returns:
+        dict: The leaderboard rows written, to be passed to after_commit.
+    """
+    positions = await lot_matching.sync_positions(db, old_trades, new_trades)
+    holdings = await holdings_summary.apply_changes(db, positions)
+    return await leaderboard.apply_changes(db, holdings, old_trades, new_trades)
+
+
+def after_commit(old_trades, new_trades, leaderboard_rows: dict = None):
+    """
+    Update the in-memory indexes once a trade change has been committed.
+
+    Args:
+        old_trades (List[dict]): Snapshots of the affected trades before the change.
+        new_trades (List[dict]): Snapshots of the affected trades after the change.
+        leaderboard_rows (dict, optional): The leaderboard rows returned by before_commit.
+    """
+    for trade in old_trades:
+        target_alerts.engine.remove_target(trade['trade_id'])
+    for trade in new_trades:
+        target_alerts.engine.add_trade(trade)
+    quote_cache.apply_trade_changes(old_trades, new_trades)
+    for user_id in {trade['user_id'] for trade in old_trades + new_trades}:
+        equity_curve.invalidate(user_id)
+        portfolio_cache.invalidate(user_id)
+    if leaderboard_rows:
+        leaderboard.apply_committed(leaderboard_rows)
+
+
+async def commit(db, old_trades, new_trades):
+    """
+    Maintain derived state for a flushed trade change and commit it as one transaction.
+
+    Args:
+        db (Session): The database session.
+        old_trades (List[dict]): Snapshots of the affected trades before the change.
+        new_trades (List[dict]): Snapshots of the affected trades after the change.
+
+    Raises:
+        HTTPException: If the change leaves a position with an unmatched sell.
+    """
+    try:
+        leaderboard_rows = await before_commit(db, old_trades, new_trades)
+    except lot_matching.LotMatchingError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    await db.commit()
+    after_commit(old_trades, new_trades, leaderboard_rows)
@@ -0,0 +1,201 @@
+import asyncio
+import csv
+import importlib
+import io
+import tempfile
+from sqlalchemy import Date, DateTime, Float, Integer
+from sqlalchemy.future import select
+import models
+import database
+from utils import quote_cache
+
+# Rows fetched from the server-side cursor and written per chunk
+EXPORT_BATCH_SIZE = 1000
+# Quote fields appended to each row when exports are enriched with prices
+QUOTE_COLUMNS = ('last_price', 'current_price',
+                 'price_change', 'percentage_change')
+# Export formats: format -> (media type, module that must be importable)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", None),
+    "parquet": ("application/vnd.apache.parquet", "pyarrow.parquet"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "openpyxl"),
+}
+
+TRADE_COLUMNS = tuple(column.key for column in models.TradeEntry.__table__.columns)
+
+
+def export_columns(include_quotes: bool) -> tuple:
+    """
+    Return the column order of an export.
+    """
+    return TRADE_COLUMNS + QUOTE_COLUMNS if include_quotes else TRADE_COLUMNS
+
+
+def check_format(export_format: str):
+    """
+    Check that an export format is known and its optional dependency is installed.
+
+    Raises:
+        ValueError: If the format is unknown.
+        ImportError: If the library the format needs is not installed.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Invalid format '{export_format}', expected one of {', '.join(EXPORT_FORMATS)}")
+    module_name = EXPORT_FORMATS[export_format][1]
+    if module_name is not None:
+        importlib.import_module(module_name)
+
+
+async def trade_batches(user_id: int, include_quotes: bool):
+    """
+    Yield the trades of a user in batches read from a server-side cursor.
+
+    Opens its own session, because the response body is produced after the request's
+    dependencies have been closed.
+
+    Args:
+        user_id (int): The user whose trades are exported.
+        include_quotes (bool): Merge the latest cached quote of each stock into its rows.
+            Nothing is fetched upstream; stocks without a cached quote get empty columns.
+
+    Yields:
+        List[dict]: Up to EXPORT_BATCH_SIZE trade rows.
+    """
+    async with database.async_session() as db:
+        result = await db.stream(
+            select(*models.TradeEntry.__table__.columns)
+            .where(models.TradeEntry.user_id == user_id)
+            .order_by(models.TradeEntry.trade_id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.mappings().partitions():
+            rows = [dict(row) for row in partition]
+            if include_quotes:
+                for row in rows:
+                    entry = quote_cache.quotes.get(quote_cache.quote_key(
+                        row['stock_ticker'], row['trade_exchange']))
+                    quote = entry[1] if entry is not None else {}
+                    row.update({column: quote.get(column)
+                               for column in QUOTE_COLUMNS})
+            yield rows
+
+
+async def csv_chunks(batches, columns):
+    # One encoded CSV chunk per batch, header first
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in batches:
+        writer.writerows([[row.get(column) for column in columns]
+                         for row in rows])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    A write-only file that hands written bytes out in chunks while tracking its position.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _arrow_schema(pa, columns):
+    # Arrow types matching the SQLAlchemy column types of the export
+    table_columns = models.TradeEntry.__table__.columns
+    fields = []
+    for column in columns:
+        column_type = table_columns[column].type if column in table_columns else None
+        if column == 'last_price' or isinstance(column_type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column_type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column_type, DateTime):
+            arrow_type = pa.timestamp('us')
+        elif isinstance(column_type, Date):
+            arrow_type = pa.date32()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields)
+
+
+async def parquet_chunks(batches, columns):
+    # One row group per batch, streamed as soon as it is written
+    pa = importlib.import_module("pyarrow")
+    pq = importlib.import_module("pyarrow.parquet")
+    schema = _arrow_schema(pa, columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        async for rows in batches:
+            writer.write_table(pa.Table.from_pylist(
+                [{column: row.get(column) for column in columns} for row in rows], schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+async def xlsx_chunks(batches, columns, chunk_size: int = 64 * 1024):
+    # openpyxl's write-only mode spills rows to disk as they are appended; the zip
+    # container can only be assembled at the end, so the file is streamed from disk
+    openpyxl = importlib.import_module("openpyxl")
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("trades")
+    sheet.append(list(columns))
+    async for rows in batches:
+        for row in rows:
+            sheet.append([row.get(column) for column in columns])
+
+    with tempfile.TemporaryFile() as output:
+        await asyncio.to_thread(workbook.save, output)
+        output.seek(0)
+        while chunk := output.read(chunk_size):
+            yield chunk
+
+
+WRITERS = {
+    "csv": csv_chunks,
+    "parquet": parquet_chunks,
+    "xlsx": xlsx_chunks,
+}
+
+
+def export_trades(user_id: int, export_format: str, include_quotes: bool = False):
+    """
+    Return an async iterator over the encoded bytes of a user's trade export.
+
+    Args:
+        user_id (int): The user whose trades are exported.
+        export_format (str): "csv", "parquet" or "xlsx".
+        include_quotes (bool, optional): Merge the latest quote of each stock into its rows.
+
+    Returns:
+        AsyncIterator[bytes]: The export, chunk by chunk.
+    """
+    return WRITERS[export_format](trade_batches(user_id, include_quotes), export_columns(include_quotes))